@@ -0,0 +1,81 @@
+"""Benchmark of the COG compression profiles.
+
+Converts the sample files in ``tests/data-files`` with every compression
+profile and reports the encode time, the decode time and the file size.
+
+Usage: python benchmarks/compression.py [--output results.json]
+"""
+
+import argparse
+import glob
+import json
+import os
+import time
+from tempfile import TemporaryDirectory
+from typing import Any, Dict, List
+
+import rasterio
+
+from stactools.noaa_mrms_qpe import cog, constants
+
+DATA_FILES = os.path.join(os.path.dirname(__file__), "..", "tests", "data-files")
+
+
+def run(repeat: int = 3) -> List[Dict[str, Any]]:
+    results = []
+    files = sorted(glob.glob(os.path.join(DATA_FILES, "*", "*.grib2*")))
+    with TemporaryDirectory() as tmp_dir:
+        for file in files:
+            aoi = os.path.basename(os.path.dirname(file))
+            with cog.open_dataset(file) as src:
+                for profile in constants.COG_COMPRESSION_PROFILES:
+                    output = os.path.join(tmp_dir, f"{aoi}-{profile}.tif")
+
+                    encode = []
+                    for _ in range(repeat):
+                        start = time.perf_counter()
+                        cog.write_cog(src, output, compression=profile)
+                        encode.append(time.perf_counter() - start)
+
+                    decode = []
+                    for _ in range(repeat):
+                        start = time.perf_counter()
+                        with rasterio.open(output) as dataset:
+                            dataset.read(1)
+                        decode.append(time.perf_counter() - start)
+
+                    results.append(
+                        {
+                            "aoi": aoi,
+                            "file": os.path.basename(file),
+                            "profile": profile,
+                            "encode_s": min(encode),
+                            "decode_s": min(decode),
+                            "size_bytes": os.path.getsize(output),
+                        }
+                    )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="Path to store the results as JSON")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement")
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+
+    print(f"{'aoi':8} {'profile':16} {'encode s':>9} {'decode s':>9} {'size KB':>9}")
+    for r in results:
+        print(
+            f"{r['aoi']:8} {r['profile']:16} {r['encode_s']:9.3f} "
+            f"{r['decode_s']:9.3f} {r['size_bytes'] / 1024:9.0f}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Benchmark of the stages of the item creation.
+
+Times the stages of the item creation on the sample files in
+``tests/data-files`` and records their peak memory usage. Every stage runs
+in a fresh process, so that the peak resident set size (RSS) can be
+attributed to the stage.
+
+Usage: python benchmarks/stages.py [--output results.json] [--stage cogify]
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import resource
+import shutil
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from tempfile import TemporaryDirectory
+from typing import Any, Callable, Dict, List
+
+import rasterio
+
+import stactools.noaa_mrms_qpe
+from stactools.noaa_mrms_qpe import cog, constants, grib2, stac, statistics
+
+DATA_FILES = os.path.join(os.path.dirname(__file__), "..", "tests", "data-files")
+
+
+def parse_filename(src: str, aoi: constants.AOI, tmp_dir: str) -> None:
+    stac.parse_filename(src)
+
+
+def read_header(src: str, aoi: constants.AOI, tmp_dir: str) -> None:
+    grib2.read_message(src)
+
+
+def decompress(src: str, aoi: constants.AOI, tmp_dir: str) -> None:
+    if src.endswith(".gz"):
+        cog.decompress(src, os.path.join(tmp_dir, "decompressed.grib2"))
+
+
+def reproject(src: str, aoi: constants.AOI, tmp_dir: str) -> None:
+    cog.reproject(src, os.path.join(tmp_dir, "reprojected.tif"), "epsg:3857")
+
+
+def cogify(src: str, aoi: constants.AOI, tmp_dir: str) -> None:
+    cog.cogify(src, os.path.join(tmp_dir, "cog.tif"))
+
+
+def stats(src: str, aoi: constants.AOI, tmp_dir: str) -> None:
+    with cog.open_dataset(src) as dataset:
+        statistics.compute(
+            dataset, [c["value"] for c in constants.GRIB2_CLASSIFICATION]
+        )
+
+
+def create_item(src: str, aoi: constants.AOI, tmp_dir: str) -> None:
+    stac.create_item(src, aoi).to_dict()
+
+
+def create_item_metadata(src: str, aoi: constants.AOI, tmp_dir: str) -> None:
+    stac.create_item(src, aoi, nocog=True, nostats=True).to_dict()
+
+
+STAGES: Dict[str, Callable[[str, constants.AOI, str], None]] = {
+    "parse_filename": parse_filename,
+    "read_header": read_header,
+    "decompress": decompress,
+    "reproject": reproject,
+    "cogify": cogify,
+    "statistics": stats,
+    "create_item": create_item,
+    "create_item_metadata": create_item_metadata,
+}
+
+
+def measure(stage: str, file: str, repeat: int) -> Dict[str, Any]:
+    """Runs a stage for a file and measures it, to be run in a fresh process."""
+    aoi = constants.AOI[os.path.basename(os.path.dirname(file))]
+    baseline_rss = peak_rss()
+    durations = []
+    tracemalloc.start()
+    for _ in range(repeat):
+        with TemporaryDirectory() as tmp_dir:
+            # Work on a copy, some stages write next to the source file
+            src = os.path.join(tmp_dir, os.path.basename(file))
+            shutil.copyfile(file, src)
+
+            start = time.perf_counter()
+            STAGES[stage](src, aoi, tmp_dir)
+            durations.append(time.perf_counter() - start)
+    _, peak_python = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "stage": stage,
+        "aoi": aoi.value,
+        "file": os.path.basename(file),
+        "seconds_min": min(durations),
+        "seconds_mean": sum(durations) / len(durations),
+        "peak_python_bytes": peak_python,
+        "peak_rss_bytes": peak_rss(),
+        "baseline_rss_bytes": baseline_rss,
+    }
+
+
+def peak_rss() -> int:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def run(stages: List[str], repeat: int = 3) -> Dict[str, Any]:
+    files = sorted(glob.glob(os.path.join(DATA_FILES, "*", "*.grib2*")))
+    results = []
+    for stage in stages:
+        for file in files:
+            with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as executor:
+                results.append(executor.submit(measure, stage, file, repeat).result())
+
+    return {
+        "version": stactools.noaa_mrms_qpe.__version__,
+        "python": platform.python_version(),
+        "gdal": rasterio.__gdal_version__,
+        "rasterio": rasterio.__version__,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="Path to store the results as JSON")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement")
+    parser.add_argument(
+        "--stage",
+        action="append",
+        choices=list(STAGES),
+        help="The stage(s) to run, defaults to all stages",
+    )
+    args = parser.parse_args()
+
+    report = run(args.stage or list(STAGES), args.repeat)
+
+    print(
+        f"{'stage':20} {'aoi':8} {'min ms':>9} {'mean ms':>9} {'py MB':>8} {'rss MB':>8}"
+    )
+    for r in report["results"]:
+        rss = (r["peak_rss_bytes"] - r["baseline_rss_bytes"]) / 1024**2
+        print(
+            f"{r['stage']:20} {r['aoi']:8} {r['seconds_min'] * 1000:9.1f} "
+            f"{r['seconds_mean'] * 1000:9.1f} {r['peak_python_bytes'] / 1024**2:8.1f} "
+            f"{rss:8.1f}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
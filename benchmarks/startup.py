@@ -0,0 +1,96 @@
+"""Benchmark of the startup time of the package and the CLI plugin.
+
+Runs each scenario in a fresh Python interpreter and reports the wall time
+and whether the heavy dependencies (numpy, rasterio) have been loaded.
+
+Usage: python benchmarks/startup.py [--output results.json] [--repeat 10]
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from tempfile import TemporaryDirectory
+from typing import Any, Dict, List
+
+HEAVY_MODULES = ["numpy", "rasterio", "pystac", "stactools.core"]
+
+SCENARIOS = {
+    "import": "import stactools.noaa_mrms_qpe",
+    "import commands": "import stactools.noaa_mrms_qpe.commands",
+    "import stac": "import stactools.noaa_mrms_qpe.stac",
+    "cli --help": "from stactools.cli.cli import cli\n"
+    "cli(['noaa-mrms-qpe', '--help'], prog_name='stac', standalone_mode=False)",
+    "cli create-collection": "from stactools.cli.cli import cli\n"
+    "cli(['noaa-mrms-qpe', 'create-collection', '{tmp_dir}/collection.json'], "
+    "prog_name='stac', standalone_mode=False)",
+}
+
+REPORT = (
+    "\nimport sys, json\n"
+    "print(json.dumps({{m: m in sys.modules for m in {modules!r}}}))"
+)
+
+
+def measure(code: str, repeat: int) -> Dict[str, Any]:
+    seconds = []
+    loaded: Dict[str, bool] = {}
+    with TemporaryDirectory() as tmp_dir:
+        script = code.format(tmp_dir=tmp_dir) + REPORT.format(modules=HEAVY_MODULES)
+        for _ in range(repeat):
+            start = time.perf_counter()
+            output = subprocess.run(
+                [sys.executable, "-c", script],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            seconds.append(time.perf_counter() - start)
+            loaded = json.loads(output.strip().splitlines()[-1])
+
+    return {
+        "seconds_min": min(seconds),
+        "seconds_median": statistics.median(seconds),
+        "loaded": loaded,
+    }
+
+
+def run(repeat: int = 10) -> Dict[str, Any]:
+    # Baseline: startup of the interpreter itself
+    results: List[Dict[str, Any]] = [{"scenario": "python", **measure("pass", repeat)}]
+    for name, code in SCENARIOS.items():
+        results.append({"scenario": name, **measure(code, repeat)})
+
+    return {
+        "python": platform.python_version(),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="Path to store the results as JSON")
+    parser.add_argument("--repeat", type=int, default=10, help="Runs per measurement")
+    args = parser.parse_args()
+
+    report = run(args.repeat)
+
+    print(f"{'scenario':24} {'min ms':>9} {'median ms':>10}  loaded")
+    for r in report["results"]:
+        loaded = ", ".join(m for m, is_loaded in r["loaded"].items() if is_loaded)
+        print(
+            f"{r['scenario']:24} {r['seconds_min'] * 1000:9.1f} "
+            f"{r['seconds_median'] * 1000:10.1f}  {loaded or '-'}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
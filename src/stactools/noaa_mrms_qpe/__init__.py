@@ -1,14 +1,30 @@
-import stactools.core
-from stactools.cli.registry import Registry
+from typing import TYPE_CHECKING, Any
 
-from stactools.noaa_mrms_qpe.stac import create_collection, create_item
+if TYPE_CHECKING:
+    from stactools.cli.registry import Registry
+
+    from stactools.noaa_mrms_qpe.collection import create_collection
+    from stactools.noaa_mrms_qpe.stac import create_item
 
 __all__ = ["create_collection", "create_item"]
 
-stactools.core.use_fsspec()
+
+def __getattr__(name: str) -> Any:
+    # The functions are imported on first use so that importing the package
+    # (e.g. by the stac CLI to register the plugin) doesn't load numpy, rasterio
+    # and stactools.core. Creating a collection doesn't need them at all.
+    if name == "create_collection":
+        from stactools.noaa_mrms_qpe import collection
+
+        return collection.create_collection
+    if name in __all__:
+        from stactools.noaa_mrms_qpe import stac
+
+        return getattr(stac, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
-def register_plugin(registry: Registry) -> None:
+def register_plugin(registry: "Registry") -> None:
     from stactools.noaa_mrms_qpe import commands
 
     registry.register_subcommand(commands.create_noaa_mrms_qpe_command)
@@ -0,0 +1,219 @@
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Set
+from urllib.parse import urljoin
+
+from dateutil.parser import isoparse
+from pystac import Collection, SpatialExtent, TemporalExtent
+from pystac.extensions.item_assets import ItemAssetsExtension
+
+from . import constants
+
+
+@dataclass
+class Aggregate:
+    """Class to aggregate the metadata of Items for a Collection.
+
+    The Items are processed one by one (as dicts) and only counted, so the
+    size of an aggregate doesn't depend on the number of Items. Aggregates can
+    be stored and merged, so that a Collection can be updated with new Items
+    only. Items that are added more than once are counted more than once, so
+    duplicates must be skipped before, e.g. with a StateStore.
+
+    The statistics are kept per asset in the values as stored in the files,
+    together with the scale and offset to convert them to millimeters.
+    """
+
+    count: int = 0
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    regions: Set[str] = field(default_factory=set)
+    periods: Set[int] = field(default_factory=set)
+    passes: Set[int] = field(default_factory=set)
+    statistics: Dict[str, Dict[str, float]] = field(default_factory=dict)
+
+    def update(self, item: Dict[str, Any]) -> None:
+        """Adds an Item (as dict, e.g. parsed from JSON) to the aggregate."""
+        properties = item["properties"]
+        time = isoparse(properties["datetime"])
+        self.count += 1
+        self.start = time if self.start is None else min(self.start, time)
+        self.end = time if self.end is None else max(self.end, time)
+        if constants.EXT_REGION in properties:
+            self.regions.add(properties[constants.EXT_REGION])
+        if constants.EXT_PERIOD in properties:
+            self.periods.add(properties[constants.EXT_PERIOD])
+        if constants.EXT_PASS in properties:
+            self.passes.add(properties[constants.EXT_PASS])
+
+        for key, asset in item.get("assets", {}).items():
+            for band in asset.get("raster:bands", [])[:1]:
+                stats = band.get("statistics")
+                if stats is None or "minimum" not in stats or "maximum" not in stats:
+                    continue
+                self.update_statistics(
+                    key,
+                    {
+                        "minimum": stats["minimum"],
+                        "maximum": stats["maximum"],
+                        "scale": band.get("scale", 1),
+                        "offset": band.get("offset", 0),
+                    },
+                )
+
+    def update_statistics(self, key: str, stats: Dict[str, float]) -> None:
+        current = self.statistics.get(key)
+        if current is None:
+            self.statistics[key] = dict(stats)
+        elif (current["scale"], current["offset"]) != (stats["scale"], stats["offset"]):
+            raise ValueError(f"Asset {key} has different scales or offsets")
+        else:
+            current["minimum"] = min(current["minimum"], stats["minimum"])
+            current["maximum"] = max(current["maximum"], stats["maximum"])
+
+    def merge(self, other: "Aggregate") -> None:
+        """Merges another aggregate (e.g. of a previous run) into this aggregate."""
+        self.count += other.count
+        for time in [other.start, other.end]:
+            if time is not None:
+                self.start = time if self.start is None else min(self.start, time)
+                self.end = time if self.end is None else max(self.end, time)
+        self.regions |= other.regions
+        self.periods |= other.periods
+        self.passes |= other.passes
+        for key, stats in other.statistics.items():
+            self.update_statistics(key, stats)
+
+    def precipitation(self) -> Optional[List[float]]:
+        """Returns the minimum and maximum precipitation in mm over all assets."""
+        values = [
+            stats[name] * stats["scale"] + stats["offset"]
+            for stats in self.statistics.values()
+            for name in ["minimum", "maximum"]
+        ]
+        if len(values) == 0:
+            return None
+        return [min(values), max(values)]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "start": None if self.start is None else self.start.isoformat(),
+            "end": None if self.end is None else self.end.isoformat(),
+            "regions": sorted(self.regions),
+            "periods": sorted(self.periods),
+            "passes": sorted(self.passes),
+            "statistics": self.statistics,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Aggregate":
+        return cls(
+            count=data["count"],
+            start=None if data["start"] is None else isoparse(data["start"]),
+            end=None if data["end"] is None else isoparse(data["end"]),
+            regions=set(data["regions"]),
+            periods=set(data["periods"]),
+            passes=set(data["passes"]),
+            statistics=data["statistics"],
+        )
+
+    def save(self, path: str) -> None:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "Aggregate":
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def read_items(source: str) -> Iterator[Dict[str, Any]]:
+    """Reads Items one by one without loading them into pystac.
+
+    Args:
+        source (str): Either a newline-delimited JSON file (``.ndjson``),
+            a directory that is searched recursively for Item JSON files or a
+            Catalog / Collection JSON file whose item and child links are followed
+
+    Returns:
+        Iterator[dict]: The Items as dicts
+    """
+    if os.path.isdir(source):
+        for root, dirs, filenames in os.walk(source):
+            dirs.sort()
+            for filename in sorted(filenames):
+                if filename.endswith(".json"):
+                    with open(os.path.join(root, filename)) as f:
+                        data = json.load(f)
+                    if data.get("type") == "Feature":
+                        yield data
+    elif source.endswith(".ndjson") or source.endswith(".jsonl"):
+        with open(source) as f:
+            for line in f:
+                if len(line.strip()) > 0:
+                    yield json.loads(line)
+    else:
+        yield from read_catalog(source)
+
+
+def read_catalog(href: str) -> Iterator[Dict[str, Any]]:
+    """Reads the Items of a Catalog or Collection and its children recursively."""
+    with open(href) as f:
+        data = json.load(f)
+    if data.get("type") == "Feature":
+        yield data
+        return
+
+    for link in data.get("links", []):
+        if link["rel"] in ["item", "child"]:
+            link_href = urljoin(href, link["href"])
+            if link["rel"] == "child":
+                yield from read_catalog(link_href)
+            else:
+                with open(link_href) as f:
+                    yield json.load(f)
+
+
+def update_collection(collection: Collection, aggregate: Aggregate) -> None:
+    """Updates the extents, summaries and asset statistics of a Collection.
+
+    Args:
+        collection (Collection): The Collection to update
+        aggregate (Aggregate): The aggregate of the Items of the Collection
+    """
+    if aggregate.count == 0:
+        return
+
+    collection.extent.temporal = TemporalExtent([[aggregate.start, aggregate.end]])
+    # The first bbox must be the union of the other bboxes
+    bboxes = [
+        constants.EXTENTS[constants.AOI(region)] for region in sorted(aggregate.regions)
+    ]
+    union = [
+        min(b[0] for b in bboxes),
+        min(b[1] for b in bboxes),
+        max(b[2] for b in bboxes),
+        max(b[3] for b in bboxes),
+    ]
+    collection.extent.spatial = SpatialExtent([union] + bboxes)
+
+    collection.summaries.add(constants.EXT_REGION, sorted(aggregate.regions))
+    collection.summaries.add(constants.EXT_PERIOD, sorted(aggregate.periods))
+    collection.summaries.add(constants.EXT_PASS, sorted(aggregate.passes))
+
+    if ItemAssetsExtension.has_extension(collection):
+        item_assets = ItemAssetsExtension.ext(collection).item_assets
+        for key, stats in aggregate.statistics.items():
+            if key not in item_assets:
+                continue
+            bands = item_assets[key].properties.get("raster:bands", [])
+            if len(bands) > 0:
+                bands[0]["statistics"] = {
+                    "minimum": stats["minimum"],
+                    "maximum": stats["maximum"],
+                }
@@ -0,0 +1,77 @@
+import hashlib
+import io
+from typing import IO, Any, Optional
+
+# Multihash prefix of SHA2-256 digests: function code 0x12 and length 0x20
+MULTIHASH_SHA2_256 = "1220"
+CHUNK_SIZE = 1024 * 1024
+
+
+class Digest:
+    """Class to compute the checksum and size of a file while it's processed.
+
+    The digest is updated with the bytes of the file while they are read
+    (e.g. decompressed) or written anyway, so no extra pass over the file
+    is needed. The checksum is a SHA2-256 multihash as used by the
+    ``file:checksum`` field of the STAC file extension.
+    """
+
+    def __init__(self, checksum: Optional[str] = None, size: int = 0) -> None:
+        """
+        Args:
+            checksum (str): A checksum computed before (e.g. stored in a cache),
+                the digest is not updated then
+            size (int): The size of the file the checksum was computed for
+        """
+        self.sha256 = hashlib.sha256()
+        self.size = size
+        self.known_checksum = checksum
+
+    def update(self, data: Any) -> None:
+        """Adds the next bytes of the file (bytes or a buffer) to the digest."""
+        if self.known_checksum is not None:
+            return
+        self.sha256.update(data)
+        self.size += len(data)
+
+    @property
+    def checksum(self) -> str:
+        """The SHA2-256 multihash of the bytes, hex-encoded."""
+        if self.known_checksum is not None:
+            return self.known_checksum
+        return MULTIHASH_SHA2_256 + self.sha256.hexdigest()
+
+    @classmethod
+    def from_file(cls, path: str) -> "Digest":
+        """Computes the digest of a file by reading it."""
+        digest = cls()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest
+
+
+class DigestReader(io.RawIOBase):
+    """Wraps a binary file and adds all bytes read from it to a digest."""
+
+    def __init__(self, file: IO[bytes], digest: Digest) -> None:
+        self.file = file
+        self.digest = digest
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        data = self.file.read(len(buffer))
+        size = len(data)
+        buffer[:size] = data
+        self.digest.update(data)
+        return size
+
+
+def write_file(data: Any, path: str, digest: Optional[Digest] = None) -> None:
+    """Writes bytes (or a buffer) to a file and adds them to the digest, if given."""
+    with open(path, "wb") as f:
+        f.write(data)
+    if digest is not None:
+        digest.update(data)
@@ -2,69 +2,536 @@ import gzip
 import logging
 import os
 import shutil
-from tempfile import TemporaryDirectory
-from typing import Optional
+from contextlib import ExitStack, contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+from xml.sax.saxutils import escape
 
-from stactools.core.utils.subprocess import call
+import numpy as np
+import rasterio
+import rasterio.shutil
+from rasterio.dtypes import dtype_rev, typename_fwd
+from rasterio.io import DatasetReader, MemoryFile
+from rasterio.transform import Affine
+from rasterio.vrt import WarpedVRT
+from rasterio.windows import Window
 
-from . import constants
+from . import constants, instrumentation
+from .checksum import Digest, DigestReader, write_file
+from .gridcache import Grid
 
 logger = logging.getLogger(__name__)
 
 
-def convert(href: str, reproject_to: Optional[str] = None) -> str:
-    dir = os.path.dirname(href)
-    name = os.path.splitext(os.path.basename(href))[0] + ".tif"
+# Called for each strip with the source data and the data written to the COG
+BlockCallback = Callable[[Any, Any], None]
+
+# The sizes of the in-memory files opened by open_dataset, by dataset name
+MEMORY_FILE_SIZES: Dict[str, int] = {}
+
 
-    with TemporaryDirectory() as tmp_dir:
-        if reproject_to:
-            href = reproject(href, os.path.join(tmp_dir, name), reproject_to)
+def convert(
+    href: str,
+    reproject_to: Optional[str] = None,
+    resampling: str = constants.COG_RESAMPLING,
+    compression: str = constants.COG_COMPRESSION,
+    encoding: str = constants.COG_ENCODING,
+) -> str:
+    return cogify(href, cog_path(href), reproject_to, resampling, compression, encoding)
 
-        href = cogify(href, os.path.join(dir, name))
 
-    return href
+def cog_path(href: str) -> str:
+    """Returns the path of the COG for a (gzipped) GRIB2 file."""
+    dir = os.path.dirname(href)
+    name = os.path.basename(href)
+    if name.endswith(".gz"):
+        name = os.path.splitext(name)[0]
+    name = os.path.splitext(name)[0] + ".tif"
+    return os.path.join(dir, name)
+
 
+def decompress(
+    input_path: str, output_path: str, digest: Optional[Digest] = None
+) -> str:
+    """Decompresses a gzipped file.
 
-def decompress(input_path: str) -> str:
-    output_path = os.path.splitext(input_path)[0]
+    The item creation reads gzipped files from memory (see open_dataset), this
+    is only needed if a tool requires the decompressed file on disk.
 
-    print(f"unzipping {input_path} to {output_path}")
-    with gzip.open(input_path, "rb") as f_in:
-        with open(output_path, "wb") as f_out:
-            shutil.copyfileobj(f_in, f_out)
+    Args:
+        input_path (str): The path of the gzipped file
+        output_path (str): The path of the decompressed file
+        digest (Digest): If given, the checksum and size of the gzipped file
+            are computed while it's decompressed
+
+    Returns:
+        str: The path of the decompressed file
+    """
+    logger.info(f"unzipping {input_path} to {output_path}")
+    with instrumentation.stage("decompress") as event:
+        with open_gzip(input_path, digest) as f_in:
+            with open(output_path, "wb") as f_out:
+                shutil.copyfileobj(f_in, f_out)
+        event.bytes_read = instrumentation.file_size(input_path)
+        event.bytes_written = instrumentation.file_size(output_path)
 
     return output_path
 
 
+@contextmanager
+def open_gzip(path: str, digest: Optional[Digest] = None) -> Iterator[gzip.GzipFile]:
+    """Opens a gzipped file for reading the decompressed data.
+
+    If a digest is given, the compressed bytes are added to it while they
+    are read. The digest is complete once the file has been read and closed.
+    """
+    if digest is None:
+        with gzip.open(path, "rb") as f:
+            yield f
+        return
+
+    with open(path, "rb") as raw:
+        reader = DigestReader(raw, digest)
+        with gzip.GzipFile(fileobj=reader, mode="rb") as f:
+            yield f
+        # Include any bytes after the compressed stream
+        reader.read()
+
+
+@contextmanager
+def open_dataset(href: str, digest: Optional[Digest] = None) -> Iterator[DatasetReader]:
+    """Opens a raster file with rasterio.
+
+    Gzipped files (``.gz``) are decompressed into an in-memory file
+    (``/vsimem/``), so the decompressed data is never written to disk.
+
+    Args:
+        href (str): The path of the raster file, e.g. a (gzipped) GRIB2 file
+        digest (Digest): If given, the checksum and size of the file are
+            computed while it's read. Uncompressed files are then read into
+            an in-memory file, too.
+
+    Returns:
+        DatasetReader: The opened dataset, to be used as a context manager
+    """
+    with ExitStack() as stack:
+        with instrumentation.stage("open") as event:
+            if href.endswith(".gz"):
+                with instrumentation.stage("decompress") as decompress_event:
+                    with open_gzip(href, digest) as f:
+                        data = f.read()
+                    decompress_event.bytes_read = instrumentation.file_size(href)
+                    decompress_event.bytes_written = len(data)
+                memfile = stack.enter_context(MemoryFile(data, ext=".grib2"))
+                dataset = stack.enter_context(memfile.open())
+                MEMORY_FILE_SIZES[dataset.name] = len(data)
+                stack.callback(MEMORY_FILE_SIZES.pop, dataset.name, None)
+            elif digest is not None:
+                with open(href, "rb") as f:
+                    data = f.read()
+                digest.update(data)
+                ext = os.path.splitext(href)[1]
+                memfile = stack.enter_context(MemoryFile(data, ext=ext))
+                dataset = stack.enter_context(memfile.open())
+                MEMORY_FILE_SIZES[dataset.name] = len(data)
+                stack.callback(MEMORY_FILE_SIZES.pop, dataset.name, None)
+            else:
+                dataset = stack.enter_context(rasterio.open(href))
+            event.bytes_read = instrumentation.file_size(href)
+        yield dataset
+
+
+def source_size(dataset: DatasetReader) -> int:
+    """Returns the size of the file that a dataset reads from in bytes.
+
+    For the in-memory files of :func:`open_dataset` this is the size of the
+    (decompressed) GRIB2 file in memory, 0 if the size is unknown.
+    """
+    size = MEMORY_FILE_SIZES.get(dataset.name)
+    if size is not None:
+        return size
+    return instrumentation.file_size(dataset.name)
+
+
 def reproject(input_path: str, output_path: str, crs: str) -> str:
-    print(f"reprojecting {input_path} to {output_path}")
-    call(["gdalwarp", "-t_srs", crs, input_path, output_path])
+    logger.info(f"reprojecting {input_path} to {output_path}")
+    with open_dataset(input_path) as src:
+        with instrumentation.stage("reproject") as event:
+            with warp(src, crs) as vrt:
+                rasterio.shutil.copy(vrt, output_path, driver="GTiff")
+            event.bytes_written = instrumentation.file_size(output_path)
     return output_path
 
 
-def cogify(input_path: str, output_path: str) -> str:
-    print(f"cogifying {input_path} to {output_path}")
-    call(
-        [
-            "gdal_calc.py",
-            "-A",
-            input_path,
-            "--outfile",
+def cogify(
+    input_path: str,
+    output_path: str,
+    crs: Optional[str] = None,
+    resampling: str = constants.COG_RESAMPLING,
+    compression: str = constants.COG_COMPRESSION,
+    encoding: str = constants.COG_ENCODING,
+) -> str:
+    """Converts a raster file into a COG.
+
+    If a CRS is given, the source is read through a warped view and the
+    reprojected pixels are written to the COG directly, so no intermediate
+    file is needed.
+
+    Args:
+        input_path (str): The path of the source raster (e.g. a (gzipped) GRIB2 file)
+        output_path (str): The path to write the COG to
+        crs (str): The CRS to reproject to (e.g. 'epsg:3857'),
+            doesn't reproject by default
+        resampling (str): The resampling method for the overviews,
+            see ``constants.COG_RESAMPLING_METHODS``
+        compression (str): The name of the compression profile,
+            see ``constants.COG_COMPRESSION_PROFILES``
+        encoding (str): The name of the data encoding,
+            see ``constants.COG_ENCODINGS``
+
+    Returns:
+        str: The path of the COG
+    """
+    logger.info(f"cogifying {input_path} to {output_path}")
+    with open_dataset(input_path) as src:
+        cogify_dataset(
+            src,
             output_path,
-            "--overwrite",
-            "--calc",
-            f"maximum(A, {constants.COG_NODATA})",
-            "--NoDataValue",
-            str(constants.COG_NODATA),
-            "--format",
-            "GTIFF",  # COG
-            "--co",
-            "TILED=YES",
-            "--co",
-            "COPY_SRC_OVERVIEWS=YES",
-            "--co",
-            f"COMPRESS={constants.COG_COMPRESS}"
-            # "--co", f"TARGET_SRS={reproject_to}"
-        ]
-    )
+            crs,
+            resampling=resampling,
+            compression=compression,
+            encoding=encoding,
+        )
     return output_path
+
+
+def cogify_dataset(
+    src: DatasetReader,
+    output_path: str,
+    crs: Optional[str] = None,
+    callback: Optional[BlockCallback] = None,
+    resampling: str = constants.COG_RESAMPLING,
+    compression: str = constants.COG_COMPRESSION,
+    encoding: str = constants.COG_ENCODING,
+    digest: Optional[Digest] = None,
+    grid: Optional[Grid] = None,
+) -> None:
+    """Converts an opened dataset into a COG.
+
+    See :func:`cogify` for details. The given callback is called for each
+    strip that gets written, which allows to compute statistics without
+    decoding the source again. The reprojection is part of the ``cogify``
+    stage of the instrumentation.
+
+    Args:
+        src (DatasetReader): The opened source dataset
+        output_path (str): The path to write the COG to
+        crs (str): The CRS to reproject to (e.g. 'epsg:3857'),
+            doesn't reproject by default
+        callback (BlockCallback): Called with the source data (reprojected if a
+            CRS is given) and the data written to the COG for each strip
+        resampling (str): The resampling method for the overviews,
+            see ``constants.COG_RESAMPLING_METHODS``
+        compression (str): The name of the compression profile,
+            see ``constants.COG_COMPRESSION_PROFILES``
+        encoding (str): The name of the data encoding,
+            see ``constants.COG_ENCODINGS``
+        digest (Digest): If given, the checksum and size of the COG are
+            computed while it's written
+        grid (Grid): The grid of the reprojected COG (e.g. from a GridCache),
+            computed from the source and the CRS if not given
+    """
+    with instrumentation.stage("cogify") as event:
+
+        event.bytes_read = source_size(src)
+
+        def count(data: Any, clamped: Any) -> None:
+            event.bytes_decoded += data.nbytes
+            if callback:
+                callback(data, clamped)
+
+        options = (resampling, compression, encoding, digest)
+        if crs:
+            with warp(src, crs, grid) as vrt:
+                write_cog(vrt, output_path, count, *options)
+        else:
+            write_cog(src, output_path, count, *options)
+        event.bytes_written = instrumentation.file_size(output_path)
+
+
+def warp(src: DatasetReader, crs: str, grid: Optional[Grid] = None) -> WarpedVRT:
+    """Opens a warped view of a dataset in the given CRS.
+
+    Areas of the target grid not covered by the source are set to the COG
+    nodata value. If the target grid is given, GDAL doesn't need to compute
+    it from the source.
+    """
+    if grid is None:
+        return WarpedVRT(src, crs=crs, nodata=constants.COG_NODATA)
+    return WarpedVRT(
+        src,
+        crs=crs,
+        nodata=constants.COG_NODATA,
+        transform=Affine(*grid.transform),
+        width=grid.shape[0],
+        height=grid.shape[1],
+    )
+
+
+def write_cog(
+    src: Union[DatasetReader, WarpedVRT],
+    output_path: str,
+    callback: Optional[BlockCallback] = None,
+    resampling: str = constants.COG_RESAMPLING,
+    compression: str = constants.COG_COMPRESSION,
+    encoding: str = constants.COG_ENCODING,
+    digest: Optional[Digest] = None,
+) -> None:
+    """Writes the first band of a dataset as a COG with internal overviews.
+
+    All values below the COG nodata value are clamped to it, i.e. the
+    equivalent of ``maximum(A, COG_NODATA)``, and the data is converted to
+    the given encoding (see :func:`encode`). The source is read and encoded
+    in strips of one tile row, so the source data is never in memory as a
+    whole.
+
+    Tiles that only contain nodata values are not written (sparse file),
+    readers get the nodata value for them. Which tiles are empty is stored
+    in the metadata of the COG, see :func:`empty_tiles`.
+
+    The memory usage is not bounded by the strips though: The encoded data
+    is written to an in-memory (compressed) GeoTiff first, which is then
+    copied with GDAL's COG driver to get a valid COG layout. The overviews
+    for the 'max' resampling are in-memory GeoTiffs, too. If a digest is
+    given, the COG is created in memory as well and added to the digest
+    while it's written to the output path. So the peak memory usage is about
+    the compressed size of the COG (twice with a digest) plus the strips.
+
+    Args:
+        src (DatasetReader | WarpedVRT): The opened source dataset
+        output_path (str): The path to write the COG to
+        callback (BlockCallback): Called with the source and the encoded data
+            for each strip
+        resampling (str): The resampling method for the overviews, see
+            ``constants.COG_RESAMPLING_METHODS``. Nodata values are ignored.
+        compression (str): The name of the compression profile, see
+            ``constants.COG_COMPRESSION_PROFILES``
+        encoding (str): The name of the data encoding, see
+            ``constants.COG_ENCODINGS``
+        digest (Digest): If given, the checksum and size of the COG are
+            computed while it's written
+    """
+    if resampling not in constants.COG_RESAMPLING_METHODS:
+        raise ValueError(f"Resampling method is not supported: {resampling}")
+    if compression not in constants.COG_COMPRESSION_PROFILES:
+        raise ValueError(f"Compression profile is not supported: {compression}")
+    if encoding not in constants.COG_ENCODINGS:
+        raise ValueError(f"Encoding is not supported: {encoding}")
+    encoding_options = constants.COG_ENCODINGS[encoding]
+
+    profile = {
+        "driver": "GTiff",
+        "width": src.width,
+        "height": src.height,
+        "count": 1,
+        "dtype": encoding_options["dtype"],
+        "crs": src.crs,
+        "transform": src.transform,
+        "nodata": encoding_options["nodata"],
+        "tiled": True,
+        "blockxsize": constants.COG_BLOCKSIZE,
+        "blockysize": constants.COG_BLOCKSIZE,
+        "compress": constants.COG_COMPRESS,
+        "sparse_ok": True,
+    }
+    options = {
+        "BLOCKSIZE": constants.COG_BLOCKSIZE,
+        "SPARSE_OK": True,
+        **constants.COG_COMPRESSION_PROFILES[compression],
+    }
+    if np.issubdtype(encoding_options["dtype"], np.integer):
+        # Horizontal differencing improves the compression of integers
+        options["PREDICTOR"] = 2
+    with ExitStack() as stack:
+        target = output_path
+        if digest is not None:
+            cog_memfile = stack.enter_context(MemoryFile(ext=".tif"))
+            target = cog_memfile.name
+
+        memfile = stack.enter_context(MemoryFile(ext=".tif"))
+        with memfile.open(**profile) as dst:
+            empty = []
+            for window in strips(src.width, src.height, constants.COG_BLOCKSIZE):
+                data = src.read(1, window=window)
+                encoded = encode(data, encoding)
+                dst.write(encoded, 1, window=window)
+                empty.append(empty_tiles_in_strip(encoded, profile["nodata"]))
+                if callback:
+                    callback(data, encoded)
+            dst.update_tags(
+                **{constants.COG_EMPTY_TILES_TAG: encode_tiles(np.array(empty))}
+            )
+
+        if resampling == "max":
+            # GDAL doesn't support the maximum for overviews, so they are
+            # computed here and passed to the COG driver through a VRT
+            levels = [memfile]
+            size = max(src.width, src.height)
+            while size > constants.COG_BLOCKSIZE:
+                level = stack.enter_context(MemoryFile(ext=".tif"))
+                with levels[-1].open() as previous:
+                    downsample_max(previous, level, profile)
+                levels.append(level)
+                size = (size + 1) // 2
+
+            vrt = stack.enter_context(
+                MemoryFile(overview_vrt(levels).encode("utf-8"), ext=".vrt")
+            )
+            with vrt.open() as cog_src:
+                rasterio.shutil.copy(
+                    cog_src,
+                    target,
+                    driver="COG",
+                    OVERVIEWS="FORCE_USE_EXISTING",
+                    **options,
+                )
+        else:
+            with memfile.open() as cog_src:
+                rasterio.shutil.copy(
+                    cog_src,
+                    target,
+                    driver="COG",
+                    OVERVIEW_RESAMPLING=resampling.upper(),
+                    **options,
+                )
+
+        if digest is not None:
+            write_file(cog_memfile.getbuffer(), output_path, digest)
+
+
+def encode(data: Any, encoding: str = constants.COG_ENCODING) -> Any:
+    """Converts a block of source data (numpy array) to the given encoding.
+
+    Values below the COG nodata value and NaN (e.g. from a warped source)
+    are set to it. For the scaled integer encodings, the values are rounded
+    and negative values (nodata) are mapped to the nodata value of the
+    encoding.
+    """
+    options = constants.COG_ENCODINGS[encoding]
+    if np.issubdtype(data.dtype, np.floating):
+        # NaN would be cast to an arbitrary integer and isn't below nodata
+        data = np.where(np.isnan(data), constants.COG_NODATA, data)
+    if not np.issubdtype(options["dtype"], np.integer):
+        return np.maximum(data, constants.COG_NODATA).astype(options["dtype"])
+
+    scaled = np.clip(
+        np.round((data - options["offset"]) / options["scale"]), 0, options["max"]
+    )
+    return np.where(data < 0, options["nodata"], scaled).astype(options["dtype"])
+
+
+def empty_tiles_in_strip(data: Any, nodata: float) -> Any:
+    """Returns for each tile of a strip (numpy array) whether it's all nodata."""
+    size = constants.COG_BLOCKSIZE
+    columns = -(-data.shape[1] // size)
+    is_nodata = np.ones((data.shape[0], columns * size), dtype=bool)
+    is_nodata[:, : data.shape[1]] = data == nodata
+    return is_nodata.reshape(data.shape[0], columns, size).all(axis=(0, 2))
+
+
+def encode_tiles(tiles: Any) -> str:
+    """Encodes a 2D boolean array of tiles as rows, columns and a hex bitmap."""
+    rows, columns = tiles.shape
+    return f"{rows},{columns},{np.packbits(tiles.ravel()).tobytes().hex()}"
+
+
+def empty_tiles(dataset: DatasetReader) -> Optional[Any]:
+    """Returns which tiles of a COG contain only nodata values.
+
+    The tiles are not stored in the file and don't need to be requested.
+
+    Args:
+        dataset (DatasetReader): The opened COG
+
+    Returns:
+        numpy.ndarray: A boolean array with a value per tile (rows, columns)
+        of the full resolution image, None if the information is not available
+    """
+    value = dataset.tags().get(constants.COG_EMPTY_TILES_TAG)
+    if value is None:
+        return None
+    rows, columns, bitmap = value.split(",")
+    bits = np.unpackbits(np.frombuffer(bytes.fromhex(bitmap), dtype=np.uint8))
+    count = int(rows) * int(columns)
+    return bits[:count].astype(bool).reshape(int(rows), int(columns))
+
+
+def downsample_max(
+    src: DatasetReader, dst: MemoryFile, profile: Dict[str, Any]
+) -> None:
+    """Writes the maximum of each 2x2 pixel block of a dataset to a new file.
+
+    Nodata values are ignored unless all four pixels are nodata.
+    """
+    width = (src.width + 1) // 2
+    height = (src.height + 1) // 2
+    rows = constants.COG_BLOCKSIZE
+    nodata = profile["nodata"]
+    lowest: float = -np.inf
+    if np.issubdtype(profile["dtype"], np.integer):
+        lowest = np.iinfo(profile["dtype"]).min
+    with dst.open(**dict(profile, width=width, height=height)) as out:
+        for window in strips(width, height, rows):
+            data = src.read(
+                1,
+                window=Window(0, window.row_off * 2, src.width, window.height * 2),
+                boundless=True,
+                fill_value=nodata,
+            )
+            padded = np.full((window.height * 2, width * 2), nodata, dtype=data.dtype)
+            padded[: data.shape[0], : data.shape[1]] = data
+            blocks = padded.reshape(window.height, 2, width, 2)
+            valid = blocks != nodata
+            reduced = np.max(blocks, axis=(1, 3), where=valid, initial=lowest)
+            reduced = np.where(valid.any(axis=(1, 3)), reduced, nodata)
+            out.write(reduced.astype(data.dtype), 1, window=window)
+
+
+def overview_vrt(levels: List[MemoryFile]) -> str:
+    """Creates a VRT for the first file that uses the other files as overviews."""
+    with levels[0].open() as dataset:
+        width = dataset.width
+        height = dataset.height
+        data_type = typename_fwd[dtype_rev[dataset.dtypes[0]]]
+        nodata = dataset.nodata
+        metadata = "".join(
+            f'<MDI key="{escape(key)}">{escape(value)}</MDI>'
+            for key, value in dataset.tags().items()
+        )
+        srs = escape(dataset.crs.to_wkt()) if dataset.crs else ""
+        geotransform = ", ".join(repr(v) for v in dataset.transform.to_gdal())
+
+    def source(memfile: MemoryFile) -> str:
+        return (
+            f'<SourceFilename relativeToVRT="0">{memfile.name}</SourceFilename>'
+            "<SourceBand>1</SourceBand>"
+        )
+
+    overviews = "".join(f"<Overview>{source(level)}</Overview>" for level in levels[1:])
+    return (
+        f'<VRTDataset rasterXSize="{width}" rasterYSize="{height}">'
+        f"<SRS>{srs}</SRS>"
+        f"<Metadata>{metadata}</Metadata>"
+        f"<GeoTransform>{geotransform}</GeoTransform>"
+        f'<VRTRasterBand dataType="{data_type}" band="1">'
+        f"<NoDataValue>{nodata:g}</NoDataValue>"
+        f"<SimpleSource>{source(levels[0])}</SimpleSource>"
+        f"{overviews}"
+        "</VRTRasterBand>"
+        "</VRTDataset>"
+    )
+
+
+def strips(width: int, height: int, rows: int) -> Iterator[Window]:
+    """Yields full-width windows of the given number of rows over a grid."""
+    for row in range(0, height, rows):
+        yield Window(0, row, width, min(rows, height - row))
@@ -0,0 +1,219 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from . import constants
+
+logger = logging.getLogger(__name__)
+
+# Increase if the COGs written for the same options change, e.g. their layout
+VERSION = 1
+# Share of the maximum size that the cache is reduced to when it's full, so
+# that the directory isn't scanned for every new COG
+LOW_WATERMARK = 0.9
+
+
+class CogCache:
+    """Class to cache COGs by the content of their source and the conversion options.
+
+    The key of a COG is the SHA-256 hash of the source file's checksum and
+    all options that change the pixels or the layout of the COG (target CRS,
+    resampling, compression, encoding and nodata value). If a COG with the
+    same key has been created before, it's reused instead of converting the
+    source again, e.g. when items are regenerated for a new metadata schema.
+
+    The COGs are stored as ``<key>.tif`` in a local directory, together with
+    a ``<key>.json`` sidecar with the statistics and checksum of the COG, so
+    that the STAC metadata can be rebuilt without reading the pixels.
+    If a maximum size is given, the least recently used COGs are removed once
+    the cache is larger.
+    """
+
+    def __init__(self, directory: str, max_size: int = 0) -> None:
+        """
+        Args:
+            directory (str): The directory of the cache, created if it doesn't exist
+            max_size (int): The maximum size of the cache in bytes, unbounded if 0
+        """
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Estimated size of the cache, None if the directory hasn't been scanned
+        self.size: Optional[int] = None
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(
+        source_checksum: str,
+        crs: Optional[str] = None,
+        resampling: str = constants.COG_RESAMPLING,
+        compression: str = constants.COG_COMPRESSION,
+        encoding: str = constants.COG_ENCODING,
+    ) -> str:
+        """Returns the cache key for a source file and the conversion options.
+
+        Args:
+            source_checksum (str): The checksum of the source file, e.g. the
+                multihash of a :class:`checksum.Digest`
+            crs (str): The CRS the COG is reprojected to, None for the original grid
+            resampling (str): The resampling method for the overviews
+            compression (str): The compression profile
+            encoding (str): The data encoding
+
+        Returns:
+            str: The key
+        """
+        options = {
+            "version": VERSION,
+            "source": source_checksum,
+            "crs": crs,
+            "resampling": resampling,
+            "compression": compression,
+            "encoding": encoding,
+            "nodata": constants.COG_ENCODINGS[encoding]["nodata"],
+            "blocksize": constants.COG_BLOCKSIZE,
+        }
+        data = json.dumps(options, sort_keys=True).encode("utf-8")
+        return hashlib.sha256(data).hexdigest()
+
+    def paths(self, key: str) -> Tuple[str, str]:
+        """Returns the paths of the COG and its sidecar for a key."""
+        directory = os.path.join(self.directory, key[0:2])
+        return os.path.join(directory, f"{key}.tif"), os.path.join(
+            directory, f"{key}.json"
+        )
+
+    def get(
+        self, key: str, output_path: str, require: Sequence[str] = ()
+    ) -> Optional[Dict[str, Any]]:
+        """Provides the cached COG for a key at the output path, if cached.
+
+        A COG is only a hit if it's used, i.e. COGs whose metadata lacks a
+        required field count as misses and are not copied.
+
+        Args:
+            key (str): The cache key
+            output_path (str): The path the COG is needed at
+            require (Sequence[str]): The metadata fields that must be set,
+                e.g. ``cog_statistics`` if the statistics are needed
+
+        Returns:
+            Optional[Dict[str, Any]]: The metadata stored with the COG, None
+            if the COG is not cached
+        """
+        cog_path, metadata_path = self.paths(key)
+        try:
+            with open(metadata_path) as f:
+                metadata: Dict[str, Any] = json.load(f)
+            if any(metadata.get(field) is None for field in require):
+                self.misses += 1
+                return None
+            copy_file(cog_path, output_path)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.misses += 1
+            return None
+
+        # Mark as recently used
+        now = time.time()
+        for path in [cog_path, metadata_path]:
+            try:
+                os.utime(path, (now, now))
+            except FileNotFoundError:
+                pass
+        self.hits += 1
+        return metadata
+
+    def put(self, key: str, cog_path: str, metadata: Dict[str, Any]) -> None:
+        """Adds a COG to the cache and removes old COGs if the cache is full.
+
+        Args:
+            key (str): The cache key
+            cog_path (str): The path of the COG to add, it's copied
+            metadata (Dict[str, Any]): Metadata to store with the COG
+        """
+        target_cog, target_metadata = self.paths(key)
+        os.makedirs(os.path.dirname(target_cog), exist_ok=True)
+        # The sidecar is written last, so a COG is only used once it's complete
+        copy_file(cog_path, target_cog)
+        tmp_path = f"{target_metadata}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(metadata, f)
+        os.replace(tmp_path, target_metadata)
+
+        if self.max_size > 0:
+            if self.size is not None:
+                self.size += os.path.getsize(target_cog) + os.path.getsize(
+                    target_metadata
+                )
+            if self.size is None or self.size > self.max_size:
+                self.evict()
+
+    def entries(self) -> List[Tuple[float, int, str]]:
+        """Returns the last use, size and key of all cached COGs."""
+        entries = []
+        for root, _, filenames in os.walk(self.directory):
+            for filename in filenames:
+                if not filename.endswith(".json"):
+                    continue
+                key = filename[:-5]
+                size = 0
+                last_used = 0.0
+                try:
+                    for path in self.paths(key):
+                        stat = os.stat(path)
+                        size += stat.st_size
+                        last_used = max(last_used, stat.st_mtime)
+                except FileNotFoundError:
+                    continue
+                entries.append((last_used, size, key))
+        return entries
+
+    def evict(self) -> None:
+        """Removes the least recently used COGs until the cache is small enough.
+
+        If the cache is larger than the maximum size, it's reduced to the low
+        watermark (90 %) of the maximum size.
+        """
+        entries = sorted(self.entries())
+        self.size = sum(size for _, size, _ in entries)
+        if self.size <= self.max_size:
+            return
+
+        target = self.max_size * LOW_WATERMARK
+        for _, size, key in entries:
+            if self.size <= target:
+                break
+            for path in self.paths(key):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self.size -= size
+            self.evictions += 1
+            logger.info(f"Removed COG {key} from the cache")
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the number of hits, misses and evictions of this cache instance."""
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+def copy_file(src: str, dst: str) -> None:
+    """Copies a file atomically, i.e. the destination is never incomplete.
+
+    The file is copied instead of hard-linked, as the COGs at the output
+    paths may be overwritten in place later, which would change the cache.
+    """
+    tmp_path = f"{dst}.{uuid.uuid4().hex}.tmp"
+    try:
+        shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dst)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
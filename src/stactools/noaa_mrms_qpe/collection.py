@@ -0,0 +1,185 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from dateutil.parser import isoparse
+from pystac import (
+    Asset,
+    CatalogType,
+    Collection,
+    Extent,
+    MediaType,
+    SpatialExtent,
+    Summaries,
+    TemporalExtent,
+)
+from pystac.extensions.item_assets import AssetDefinition, ItemAssetsExtension
+from pystac.extensions.raster import DataType
+
+from . import constants
+
+# The collection only consists of metadata, so this module doesn't depend on
+# numpy, rasterio and stactools.core (see the module stac for the items).
+
+
+def create_collection(
+    period: int,
+    pass_no: int,
+    thumbnail: str = "",
+    nocog: bool = False,
+    nogrib: bool = False,
+    start_time: Optional[str] = None,
+    encoding: str = constants.COG_ENCODING,
+) -> Collection:
+    """Create a STAC Collection for NOAA MRMS QPE sub-products.
+
+    Args:
+        period (int): The time period the sub-product is for (either 1, 3, 6, 12, 24, 48, or 72)
+        pass_no (int): The pass number of the sub-product (either 1 or 2)
+        thumbnail (str): URL for the PNG or JPEG collection thumbnail asset (none if empty)
+        nocog (bool): If set to True, the collections does not include the COG-related metadata
+        nogrib (bool): If set to True, the collections does not include the GRIB2-related metadata
+        start_time (str): The start timestamp for the temporal extent, default to now.
+            Timestamps consist of a date and time in UTC and must follow RFC 3339, section 5.6.
+        encoding (str): The data encoding of the COGs, either 'float64' (default),
+            'float32', 'int16' or 'uint16'.
+
+    Returns:
+        Collection: STAC Collection object
+    """
+    # Time must be in UTC
+    if start_time is None:
+        start_datetime = datetime.now(tz=timezone.utc)
+    else:
+        start_datetime = isoparse(start_time)
+
+    spatial_extents = list(constants.EXTENTS.values())
+    extent = Extent(
+        SpatialExtent(spatial_extents),
+        TemporalExtent([[start_datetime, None]]),
+    )
+
+    keywords = [
+        "NOAA",
+        "MRMS",
+        "QPE",
+        "multi-radar",
+        "multi-sensor",
+        "precipitation",
+        "{t}-hour".format(t=period),
+    ]
+    if not nogrib:
+        keywords.append("GRIB2")
+    if not nocog:
+        keywords.append("COG")
+
+    description = (
+        "The Multi-Radar Multi-Sensor (MRMS) quantitative precipitation estimation "
+        "(QPE) product is generated fully automatically from multiple sources to generate "
+        "seamless, hourly 1 km mosaics over the US.\n\n"
+        "**Note:** The data for Guam and the Caribbean Islands are [not multi-sensor products]"
+        "(https://vlab.noaa.gov/documents/96675/666999/MS_DomainDiffernces.png) yet."
+    )
+    if pass_no == 1:
+        description += (
+            "\n\nThis is the {t}-hour pass 1 product with less latency (60 min), "
+            "but less gauges (60-65 %)."
+        )
+    elif pass_no == 2:
+        description += (
+            "\n\nThis is the {t}-hour pass 2 product with more latency (120 min), "
+            "but more gauges (99 %)."
+        )
+
+    summaries = Summaries({})
+    summaries.add(constants.EXT_PASS, [pass_no])
+    summaries.add(constants.EXT_PERIOD, [period])
+    summaries.add(constants.EXT_REGION, [e.value for e in constants.AOI])
+
+    collection = Collection(
+        stac_extensions=[constants.EXTENSION],
+        id="noaa-mrms-qpe-{t}h-pass{p}".format(t=period, p=pass_no),
+        title="NOAA MRMS QPE {t}-hour Pass {p}".format(t=period, p=pass_no),
+        description=description.format(t=period),
+        keywords=keywords,
+        license="proprietary",
+        providers=constants.PROVIDERS,
+        extent=extent,
+        summaries=summaries,
+        catalog_type=CatalogType.RELATIVE_PUBLISHED,
+    )
+
+    collection.add_link(constants.LINK_LICENSE)
+    collection.add_link(constants.LINK_MRMS_HOME)
+    collection.add_link(constants.LINK_MRMS_TECH_GUIDE)
+
+    if len(thumbnail) > 0:
+        if thumbnail.endswith(".png"):
+            media_type = MediaType.PNG
+        else:
+            media_type = MediaType.JPEG
+
+        collection.add_asset(
+            "thumbnail",
+            Asset(
+                href=thumbnail,
+                title="Preview",
+                roles=["thumbnail"],
+                media_type=media_type,
+            ),
+        )
+
+    item_assets = {}
+
+    # it seems the raster extension can't be added to an AssetDefintion
+    # via RasterExtension.ext(data_asset, add_if_missing=True).
+    # So RasterBand.create() etc. are not usable here
+    collection.stac_extensions.append(constants.RASTER_EXTENSION_V11)
+
+    def create_asset(
+        media_type: str, roles: List[str], title: str, band: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        asset: Dict[str, Any] = {
+            "roles": roles,
+            "type": media_type,
+            "raster:bands": [band],
+            "title": title,
+        }
+        return asset
+
+    if not nocog:
+        asset = create_asset(
+            MediaType.COG,
+            constants.COG_ROLES,
+            constants.ASSET_COG_TITLE,
+            create_band(encoding),
+        )
+        item_assets[constants.ASSET_COG_KEY] = AssetDefinition(asset)
+
+    if not nogrib:
+        asset = create_asset(
+            constants.GRIB2_MEDIATYPE,
+            constants.GRIB2_ROLES,
+            constants.ASSET_GRIB2_TITLE,
+            create_band(),
+        )
+        item_assets[constants.ASSET_GRIB2_KEY] = AssetDefinition(asset)
+
+    item_assets_attrs = ItemAssetsExtension.ext(collection, add_if_missing=True)
+    item_assets_attrs.item_assets = item_assets
+
+    return collection
+
+
+def create_band(encoding: Optional[str] = None) -> Dict[str, Any]:
+    """Creates the raster band, for the GRIB2 file or a COG with the given encoding."""
+    band: Dict[str, Any] = {}
+    band["spatial_resolution"] = constants.RESOLUTION_M
+    band["unit"] = constants.UNIT
+    band["data_type"] = DataType.FLOAT64
+    if encoding is not None:
+        options = constants.COG_ENCODINGS[encoding]
+        band["data_type"] = DataType(options["dtype"])
+        if options["scale"] != 1 or options["offset"] != 0:
+            band["scale"] = options["scale"]
+            band["offset"] = options["offset"]
+    return band
@@ -1,14 +1,146 @@
 import logging
-from typing import Optional
+import os
+import signal
+import time
+from contextlib import ExitStack, contextmanager
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
 
 import click
 from click import Command, Group
-from pystac import Collection
 
-from stactools.noaa_mrms_qpe import constants, stac
+from stactools.noaa_mrms_qpe import constants, instrumentation, writers
+
+if TYPE_CHECKING:
+    from pystac import Item
+
+    from stactools.noaa_mrms_qpe.cogcache import CogCache
+    from stactools.noaa_mrms_qpe.itemresult import ItemResult
+
+# The modules for the raster processing (and their dependencies such as numpy
+# and rasterio) are imported in the commands so that the plugin loads quickly.
 
 logger = logging.getLogger(__name__)
 
+F = TypeVar("F", bound=Callable[..., Any])
+
+aoi_option = click.option(
+    "--aoi",
+    type=click.Choice(constants.AOI),
+    help="The area of interest, either 'ALASKA', 'CONUS' (continental US), "
+    "'CARIB' (Caribbean islands), 'GUAM' or 'HAWAII'. "
+    "Detected from the grid definition of the files if not given.",
+)
+
+collection_option = click.option(
+    "--collection",
+    default="",
+    help="An HREF to the Collection JSON. "
+    "This adds the collection details to the items, "
+    "but doesn't add the items to the collection.",
+)
+
+# The options for the item creation that the commands
+# create-item, create-items, create-timestamp and watch share
+ITEM_OPTIONS = [
+    click.option(
+        "--nocog",
+        default=False,
+        help="Does not create COG files for the given GRIB2 files if set to `TRUE`.",
+    ),
+    click.option(
+        "--nogrib",
+        default=False,
+        help="Does not include the GRIB2 files in the created metadata if set to `TRUE`.",
+    ),
+    click.option(
+        "--epsg",
+        default=0,
+        help="Converts the COG files to the given EPSG Code (e.g. 3857), "
+        "doesn't reproject by default",
+    ),
+    click.option(
+        "--nostats",
+        default=False,
+        help="Does not compute statistics and classes for the assets if set to `TRUE`.",
+    ),
+    click.option(
+        "--grid_cache",
+        default="",
+        help="Path to a JSON file that caches the grid geometries. "
+        "With `--nocog TRUE` and `--nostats TRUE`, the GRIB2 files are not opened "
+        "if the grid is cached.",
+    ),
+    click.option(
+        "--resampling",
+        type=click.Choice(constants.COG_RESAMPLING_METHODS),
+        default=constants.COG_RESAMPLING,
+        help="The resampling method for the COG overviews, defaults to 'average'. "
+        "Nodata values are ignored.",
+    ),
+    click.option(
+        "--compression",
+        type=click.Choice(list(constants.COG_COMPRESSION_PROFILES)),
+        default=constants.COG_COMPRESSION,
+        help="The compression profile for the COG files, defaults to 'lzw'.",
+    ),
+    click.option(
+        "--encoding",
+        type=click.Choice(list(constants.COG_ENCODINGS)),
+        default=constants.COG_ENCODING,
+        help="The data encoding of the COG files, defaults to 'float64'. "
+        "'int16' and 'uint16' store the values in 0.1 mm with a scale of 0.1.",
+    ),
+    click.option(
+        "--checksum",
+        default=False,
+        help="Adds the checksum (SHA2-256 multihash) and size of the files to the "
+        "assets (`file:checksum` and `file:size`) if set to `TRUE`.",
+    ),
+    click.option(
+        "--cog_cache",
+        default="",
+        help="Path to a directory that caches the COGs by the content of the GRIB2 "
+        "files and the COG options. Cached COGs are reused instead of converting "
+        "the files again.",
+    ),
+    click.option(
+        "--cog_cache_size",
+        default=0,
+        help="The maximum size of the COG cache in MB, the least recently used COGs "
+        "are removed if it's exceeded. Unbounded by default.",
+    ),
+    click.option(
+        "--cube",
+        default="",
+        help="Path to a directory with time series cubes: The data is appended to "
+        "a Zarr store per region, period and pass, which is linked in the items. "
+        "Requires the optional dependency `zarr`.",
+    ),
+    click.option(
+        "--metrics",
+        default="",
+        help="Records the duration, bytes read and written and peak memory usage "
+        "of the processing stages: 'log' logs them, a path ending with '.prom' "
+        "writes a Prometheus textfile, any other path appends JSON lines.",
+    ),
+]
+
+
+def item_options(f: F) -> F:
+    """Adds the options for the item creation (see ITEM_OPTIONS) to a command."""
+    for option in reversed(ITEM_OPTIONS):
+        f = option(f)
+    return f
+
 
 def create_noaa_mrms_qpe_command(cli: Group) -> Command:
     """Creates the stactools-noaa-mrms-qpe command line utility."""
@@ -61,6 +193,12 @@ def create_noaa_mrms_qpe_command(cli: Group) -> Command:
         help="The start timestamp for the temporal extent, defaults to now. "
         "Timestamps consist of a date and time in UTC and must be follow RFC 3339, section 5.6.",
     )
+    @click.option(
+        "--encoding",
+        type=click.Choice(list(constants.COG_ENCODINGS)),
+        default=constants.COG_ENCODING,
+        help="The data encoding of the COG files, defaults to 'float64'.",
+    )
     def create_collection_command(
         destination: str,
         period: int = 1,
@@ -70,14 +208,17 @@ def create_noaa_mrms_qpe_command(cli: Group) -> Command:
         nocog: bool = False,
         nogrib: bool = False,
         start_time: Optional[str] = None,
+        encoding: str = constants.COG_ENCODING,
     ) -> None:
         """Creates a STAC Collection
 
         Args:
             destination (str): An HREF for the Collection JSON
         """
-        collection = stac.create_collection(
-            period, pass_no, thumbnail, nocog, nogrib, start_time
+        from stactools.noaa_mrms_qpe.collection import create_collection
+
+        collection = create_collection(
+            period, pass_no, thumbnail, nocog, nogrib, start_time, encoding
         )
         if len(id) > 0:
             collection.id = id
@@ -89,56 +230,565 @@ def create_noaa_mrms_qpe_command(cli: Group) -> Command:
     @noaa_mrms_qpe.command("create-item", short_help="Create a STAC item")
     @click.argument("source")
     @click.argument("destination")
+    @aoi_option
+    @collection_option
+    @item_options
+    def create_item_command(
+        source: str,
+        destination: str,
+        aoi: Optional[constants.AOI] = None,
+        collection: str = "",
+        nocog: bool = False,
+        nogrib: bool = False,
+        epsg: int = 0,
+        nostats: bool = False,
+        grid_cache: str = "",
+        resampling: str = constants.COG_RESAMPLING,
+        compression: str = constants.COG_COMPRESSION,
+        encoding: str = constants.COG_ENCODING,
+        checksum: bool = False,
+        cog_cache: str = "",
+        cog_cache_size: int = 0,
+        cube: str = "",
+        metrics: str = "",
+    ) -> None:
+        """Creates a STAC Item
+
+        Args:
+            source (str): HREF of the Asset associated with the Item
+            destination (str): An HREF for the STAC Item
+        """
+        from pystac import Collection
+
+        from stactools.noaa_mrms_qpe import grib2, stac
+        from stactools.noaa_mrms_qpe.gridcache import GridCache
+
+        stac_collection = None
+        if len(collection) > 0:
+            stac_collection = Collection.from_file(collection)
+
+        cache = GridCache(grid_cache) if len(grid_cache) > 0 else None
+        with metrics_sink(metrics):
+            if aoi is None:
+                aoi = grib2.detect_aoi(source)
+            item = stac.create_item(
+                source,
+                aoi,
+                stac_collection,
+                nocog,
+                nogrib,
+                epsg,
+                nostats,
+                cache,
+                resampling,
+                compression,
+                encoding,
+                checksum,
+                create_cog_cache(cog_cache, cog_cache_size),
+                cube if len(cube) > 0 else None,
+            )
+            save_item(item, destination, aoi, source)
+
+        return None
+
+    @noaa_mrms_qpe.command(
+        "create-items", short_help="Create STAC items for many files in parallel"
+    )
+    @click.argument("source")
+    @click.argument("destination")
+    @aoi_option
+    @collection_option
     @click.option(
-        "--aoi",
-        type=click.Choice(constants.AOI),  # type: ignore
-        help="The area of interest, either 'ALASKA', 'CONUS' (continental US), "
-        "'CARIB' (Caribbean islands), 'GUAM' or 'HAWAII'",
+        "--processes",
+        default=1,
+        help="The number of worker processes, defaults to 1",
     )
     @click.option(
-        "--collection",
+        "--state",
         default="",
-        help="An HREF to the Collection JSON. "
-        "This adds the collection details to the item, but doesn't add the item to the collection.",
+        help="Path to a SQLite database that keeps track of the processed files. "
+        "Files that have been processed with the same options before and "
+        "haven't changed since are skipped.",
     )
     @click.option(
-        "--nocog",
+        "--state_hash",
         default=False,
-        help="Does not create a COG file for the given GRIB2 file if set to `TRUE`.",
+        help="Detects changed files by their content hash instead of their "
+        "modification time if set to `TRUE`.",
     )
+    @item_options
     @click.option(
-        "--nogrib",
-        default=False,
-        help="Does not include the GRIB2 file in the created metadata if set to `TRUE`.",
+        "--format",
+        type=click.Choice(writers.FORMATS),
+        default="json",
+        help="The output format: 'json' (default) stores a file per item in the "
+        "destination folder, 'ndjson' streams the items to the destination file "
+        "(appends to it with `--state`), 'geoparquet' writes stac-geoparquet files "
+        "partitioned by region, period and pass to the destination folder "
+        "(requires stac-geoparquet).",
     )
+    def create_items_command(
+        source: str,
+        destination: str,
+        aoi: Optional[constants.AOI] = None,
+        collection: str = "",
+        nocog: bool = False,
+        nogrib: bool = False,
+        epsg: int = 0,
+        processes: int = 1,
+        state: str = "",
+        state_hash: bool = False,
+        nostats: bool = False,
+        grid_cache: str = "",
+        resampling: str = constants.COG_RESAMPLING,
+        compression: str = constants.COG_COMPRESSION,
+        encoding: str = constants.COG_ENCODING,
+        checksum: bool = False,
+        cog_cache: str = "",
+        cog_cache_size: int = 0,
+        cube: str = "",
+        metrics: str = "",
+        format: str = "json",
+    ) -> None:
+        """Creates STAC Items for many files
+
+        Args:
+            source (str): A directory, a glob pattern or a manifest file that
+                lists one HREF per line
+            destination (str): A directory for the STAC Items, or the file for
+                the format 'ndjson'
+        """
+        from pystac import Collection
+
+        from stactools.noaa_mrms_qpe import stac
+        from stactools.noaa_mrms_qpe.gridcache import GridCache
+        from stactools.noaa_mrms_qpe.state import StateStore
+
+        stac_collection = None
+        if len(collection) > 0:
+            stac_collection = Collection.from_file(collection)
+
+        hrefs = stac.find_files(source)
+
+        start = time.perf_counter()
+        failed = 0
+        skipped = 0
+        with ExitStack() as stack:
+            stack.enter_context(metrics_sink(metrics))
+            # Skipped files are not written again, so their items must be kept
+            writer = stack.enter_context(
+                writers.create_writer(format, destination, append=len(state) > 0)
+            )
+            state_store = None
+            if len(state) > 0:
+                state_store = stack.enter_context(StateStore(state, state_hash))
+
+            for result in stac.create_items(
+                hrefs,
+                aoi,
+                stac_collection,
+                nocog,
+                nogrib,
+                epsg,
+                processes,
+                state_store,
+                nostats,
+                GridCache(grid_cache) if len(grid_cache) > 0 else None,
+                resampling,
+                compression,
+                encoding,
+                checksum,
+                create_cog_cache(cog_cache, cog_cache_size),
+                cube if len(cube) > 0 else None,
+            ):
+                if result.skipped:
+                    skipped += 1
+                elif result.item is not None:
+                    with instrumentation.stage(
+                        "serialize",
+                        aoi=result.item.properties[constants.EXT_REGION],
+                        href=result.href,
+                    ) as event:
+                        event.bytes_written = writer.write(result.item)
+                else:
+                    failed += 1
+                    click.echo(f"Failed: {result.href}: {result.error}", err=True)
+        elapsed = time.perf_counter() - start
+
+        count = len(hrefs)
+        # Skipped files take no time, so they are not part of the throughput
+        rate = (count - skipped) / elapsed if elapsed > 0 else 0
+        click.echo(
+            f"Processed {count} files ({failed} failed, {skipped} skipped) "
+            f"in {elapsed:.1f} s ({rate:.2f} files/s)"
+        )
+        if failed > 0:
+            raise click.ClickException(f"{failed} of {count} files failed")
+
+        return None
+
+    @noaa_mrms_qpe.command(
+        "create-timestamp",
+        short_help="Create STAC items for all regions of one timestamp concurrently",
+    )
+    @click.argument("destination")
     @click.option(
-        "--epsg",
+        "--source",
+        "sources",
+        type=(click.Choice(constants.AOI), str),
+        multiple=True,
+        required=True,
+        help="The area of interest and the HREF of its file, "
+        "e.g. `--source CONUS conus.grib2.gz`. Repeat for each region, "
+        "all files must be of the same product and timestamp.",
+    )
+    @collection_option
+    @click.option(
+        "--processes",
         default=0,
-        help="Converts the COG files to the given EPSG Code (e.g. 3857), "
-        "doesn't reproject by default",
+        help="The number of worker processes, defaults to one per region",
     )
-    def create_item_command(
-        source: str,
+    @item_options
+    @click.option(
+        "--format",
+        type=click.Choice(writers.FORMATS),
+        default="json",
+        help="The output format: 'json' (default) stores a file per item in the "
+        "destination folder, 'ndjson' streams the items to the destination file, "
+        "'geoparquet' writes stac-geoparquet files partitioned by region, period "
+        "and pass to the destination folder (requires stac-geoparquet).",
+    )
+    def create_timestamp_command(
         destination: str,
-        aoi: constants.AOI,
+        sources: List[Tuple[constants.AOI, str]],
         collection: str = "",
         nocog: bool = False,
         nogrib: bool = False,
         epsg: int = 0,
+        processes: int = 0,
+        nostats: bool = False,
+        grid_cache: str = "",
+        resampling: str = constants.COG_RESAMPLING,
+        compression: str = constants.COG_COMPRESSION,
+        encoding: str = constants.COG_ENCODING,
+        checksum: bool = False,
+        cog_cache: str = "",
+        cog_cache_size: int = 0,
+        cube: str = "",
+        metrics: str = "",
+        format: str = "json",
     ) -> None:
-        """Creates a STAC Item
+        """Creates STAC Items for the files of all regions of one timestamp
 
         Args:
-            source (str): HREF of the Asset associated with the Item
-            destination (str): An HREF for the STAC Item
+            destination (str): A directory for the STAC Items, or the file for
+                the format 'ndjson'
         """
+        from pystac import Collection
+
+        from stactools.noaa_mrms_qpe import stac
+        from stactools.noaa_mrms_qpe.gridcache import GridCache
+
+        hrefs = dict(sources)
+        if len(hrefs) < len(sources):
+            raise click.BadParameter("Each region can only be given once")
+
         stac_collection = None
         if len(collection) > 0:
             stac_collection = Collection.from_file(collection)
 
-        item = stac.create_item(source, aoi, stac_collection, nocog, nogrib, epsg)
-        item.save_object(dest_href=destination)
+        with ExitStack() as stack:
+            stack.enter_context(metrics_sink(metrics))
+            writer = stack.enter_context(writers.create_writer(format, destination))
+
+            def store(aoi: constants.AOI, result: "ItemResult") -> None:
+                if result.item is None:
+                    click.echo(f"Failed: {result.href}: {result.error}", err=True)
+                    return
+                with instrumentation.stage(
+                    "serialize", aoi=aoi.value, href=result.href
+                ) as event:
+                    event.bytes_written = writer.write(result.item)
+                click.echo(f"{aoi.value} done in {result.duration:.1f} s")
+
+            timestamp = stac.create_timestamp_items(
+                hrefs,
+                stac_collection,
+                nocog,
+                nogrib,
+                epsg,
+                processes,
+                nostats,
+                GridCache(grid_cache) if len(grid_cache) > 0 else None,
+                resampling,
+                compression,
+                encoding,
+                checksum,
+                create_cog_cache(cog_cache, cog_cache_size),
+                cube if len(cube) > 0 else None,
+                callback=store,
+            )
+
+        failed = len(timestamp.results) - len(timestamp.items)
+        click.echo(
+            f"Processed {timestamp.id} for {len(timestamp.results)} regions "
+            f"({failed} failed) in {timestamp.duration:.1f} s"
+        )
+        if failed > 0:
+            raise click.ClickException(
+                f"{failed} of {len(timestamp.results)} regions failed"
+            )
+
+        return None
+
+    @noaa_mrms_qpe.command(
+        "update-collection",
+        short_help="Updates the extents and summaries of a collection from its items",
+    )
+    @click.argument("collection")
+    @click.argument("source")
+    @click.option(
+        "--aggregate",
+        default="",
+        help="Path to a JSON file with the aggregate of the items processed before. "
+        "The new items are merged into it and it's updated, so that only new items "
+        "need to be read in the next run.",
+    )
+    def update_collection_command(
+        collection: str, source: str, aggregate: str = ""
+    ) -> None:
+        """Updates the temporal and spatial extents, the summaries and the
+        statistics of the item assets of a STAC Collection from its items
+
+        Args:
+            collection (str): An HREF for the Collection JSON
+            source (str): A newline-delimited JSON file, a directory with item
+                JSON files or a catalog / collection JSON file with the items
+        """
+        from pystac import Collection
+
+        from stactools.noaa_mrms_qpe.aggregate import (
+            Aggregate,
+            read_items,
+            update_collection,
+        )
+
+        result = Aggregate()
+        for item in read_items(source):
+            result.update(item)
+        click.echo(f"Read {result.count} items")
+
+        if len(aggregate) > 0:
+            if os.path.exists(aggregate):
+                result.merge(Aggregate.load(aggregate))
+            result.save(aggregate)
+
+        precipitation = result.precipitation()
+        if precipitation is not None:
+            click.echo(
+                f"{result.count} items from {result.start} to {result.end}, "
+                f"precipitation from {precipitation[0]} to {precipitation[1]} mm"
+            )
+
+        stac_collection = Collection.from_file(collection)
+        update_collection(stac_collection, result)
+        stac_collection.save_object(dest_href=collection)
+
+        return None
+
+    @noaa_mrms_qpe.command(
+        "extract",
+        short_help="Extracts time series for points and polygons from items",
+    )
+    @click.argument("source")
+    @click.argument("geometries")
+    @click.argument("destination")
+    @click.option(
+        "--asset",
+        default=constants.ASSET_COG_KEY,
+        help="The key of the asset to read, defaults to 'cog'.",
+    )
+    @click.option(
+        "--threads",
+        default=8,
+        help="The number of files that are read at the same time, defaults to 8.",
+    )
+    @click.option(
+        "--metrics",
+        default="",
+        help="Records the duration and bytes read per item: 'log' logs them, "
+        "a path ending with '.prom' writes a Prometheus textfile, any other path "
+        "appends JSON lines.",
+    )
+    def extract_command(
+        source: str,
+        geometries: str,
+        destination: str,
+        asset: str = constants.ASSET_COG_KEY,
+        threads: int = 8,
+        metrics: str = "",
+    ) -> None:
+        """Extracts the values at points and the statistics of polygons from
+        the assets of STAC Items and writes them to a CSV file
+
+        Args:
+            source (str): A newline-delimited JSON file, a directory with item
+                JSON files or a catalog / collection JSON file with the items
+            geometries (str): A GeoJSON file with points and polygons (WGS 84)
+            destination (str): The path of the CSV file, `-` for stdout
+        """
+        from stactools.noaa_mrms_qpe.aggregate import read_items
+        from stactools.noaa_mrms_qpe.extract import (
+            Extractor,
+            read_geometries,
+            write_csv,
+        )
+
+        extractor = Extractor(read_geometries(geometries), asset, threads)
+        with metrics_sink(metrics), click.open_file(destination, "w") as f:
+            start = time.perf_counter()
+            count = write_csv(extractor.extract(read_items(source)), f)
+        click.echo(
+            f"Extracted {count} rows in {time.perf_counter() - start:.1f} s", err=True
+        )
+
+        return None
+
+    @noaa_mrms_qpe.command(
+        "watch", short_help="Create STAC items for new files in directories"
+    )
+    @click.argument("sources", nargs=-1, required=True)
+    @click.argument("destination")
+    @aoi_option
+    @click.option(
+        "--interval",
+        default=1.0,
+        help="The number of seconds between two scans of the directories, defaults to 1",
+    )
+    @click.option(
+        "--settle",
+        default=1.0,
+        help="The number of seconds a file must not have changed before it's processed, "
+        "defaults to 1",
+    )
+    @click.option(
+        "--processes",
+        default=1,
+        help="The maximum number of files that are processed at the same time, "
+        "defaults to 1",
+    )
+    @click.option(
+        "--state",
+        default="",
+        help="Path to a SQLite database that keeps track of the processed files, "
+        "so that files are not processed again after a restart.",
+    )
+    @click.option(
+        "--catalog_interval",
+        default=0.0,
+        help="The minimum number of seconds between two writes of the catalog, "
+        "defaults to 0 (after each scan with new items)",
+    )
+    @item_options
+    def watch_command(
+        sources: List[str],
+        destination: str,
+        aoi: Optional[constants.AOI] = None,
+        interval: float = 1.0,
+        settle: float = 1.0,
+        nocog: bool = False,
+        nogrib: bool = False,
+        epsg: int = 0,
+        processes: int = 1,
+        state: str = "",
+        catalog_interval: float = 0.0,
+        nostats: bool = False,
+        grid_cache: str = "",
+        resampling: str = constants.COG_RESAMPLING,
+        compression: str = constants.COG_COMPRESSION,
+        encoding: str = constants.COG_ENCODING,
+        checksum: bool = False,
+        cog_cache: str = "",
+        cog_cache_size: int = 0,
+        cube: str = "",
+        metrics: str = "",
+    ) -> None:
+        """Watches directories and creates STAC Items for new files
+
+        Runs until it's interrupted (Ctrl+C or SIGTERM).
+
+        Args:
+            sources (List[str]): The directories to watch (recursively)
+            destination (str): An HREF for the Catalog or Collection JSON that
+                the Items are added to, a Catalog is created if it doesn't exist
+        """
+        from stactools.noaa_mrms_qpe.gridcache import GridCache
+        from stactools.noaa_mrms_qpe.state import StateStore
+        from stactools.noaa_mrms_qpe.watch import Watcher
+
+        with ExitStack() as stack:
+            stack.enter_context(metrics_sink(metrics))
+            state_store = None
+            if len(state) > 0:
+                state_store = stack.enter_context(StateStore(state))
+
+            watcher = Watcher(
+                list(sources),
+                aoi,
+                destination,
+                processes,
+                settle,
+                state_store,
+                GridCache(grid_cache) if len(grid_cache) > 0 else None,
+                create_cog_cache(cog_cache, cog_cache_size),
+                catalog_interval,
+                nocog=nocog,
+                nogrib=nogrib,
+                epsg=epsg,
+                nostats=nostats,
+                resampling=resampling,
+                compression=compression,
+                encoding=encoding,
+                checksum=checksum,
+                cube=cube if len(cube) > 0 else None,
+            )
+            signal.signal(signal.SIGTERM, lambda signum, frame: watcher.stop())
+            click.echo(f"Watching {', '.join(sources)}")
+            try:
+                watcher.run(interval)
+            except KeyboardInterrupt:
+                watcher.stop()
 
         return None
 
     return noaa_mrms_qpe
+
+
+@contextmanager
+def metrics_sink(spec: str) -> Iterator[None]:
+    """Sets the instrumentation sink for the given specification, if any."""
+    if len(spec) == 0:
+        yield
+        return
+    sink = instrumentation.create_sink(spec)
+    previous = instrumentation.set_sink(sink)
+    try:
+        yield
+    finally:
+        instrumentation.set_sink(previous)
+        sink.close()
+
+
+def save_item(item: "Item", dest_href: str, aoi: constants.AOI, href: str) -> None:
+    with instrumentation.stage("serialize", aoi=aoi.value, href=href) as event:
+        item.save_object(dest_href=dest_href)
+        event.bytes_written = instrumentation.file_size(dest_href)
+
+
+def create_cog_cache(path: str, size: int) -> Optional["CogCache"]:
+    """Creates the COG cache for the options `--cog_cache` and `--cog_cache_size`."""
+    if len(path) == 0:
+        return None
+    from stactools.noaa_mrms_qpe.cogcache import CogCache
+
+    return CogCache(path, size * 1024 * 1024)
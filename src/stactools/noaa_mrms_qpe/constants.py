@@ -1,6 +1,7 @@
 import enum
 import re
-from typing import Any, Dict
+from datetime import datetime, timezone
+from typing import Any, Dict, List
 
 from pystac import Link, Provider, ProviderRole, RelType
 
@@ -59,6 +60,28 @@ LINK_MRMS_TECH_GUIDE = Link(
     title="MRMS QPE Technical Product Guide",
 )
 
+# The grids of the AOIs as defined in the GRIB2 files (grid definition template 3.0):
+# Number of columns and rows and longitude and latitude of the center of the
+# first (upper left) cell
+GRIDS = {
+    AOI.CONUS: (7000, 3500, -129.995, 54.995),
+    AOI.HAWAII: (2600, 2200, -163.998, 25.998),
+    AOI.GUAM: (2000, 1800, 140.003, 17.998),
+    AOI.ALASKA: (5000, 2200, -175.995, 71.995),
+    AOI.CARIB: (3000, 1500, -89.995, 24.995),
+}
+# Tolerance in degrees for the comparison of the first cell with the AOI grids
+GRID_TOLERANCE = 0.001
+
+# The MultiSensor QPE products in the local GRIB2 parameter table of MRMS
+# (discipline 209, category 6): Accumulation period in hours and pass
+QPE_PERIODS = [1, 3, 6, 12, 24, 48, 72]
+GRIB2_PARAMETERS = {
+    (209, 6, first + index): (period, pass_no)
+    for pass_no, first in [(1, 30), (2, 37)]
+    for index, period in enumerate(QPE_PERIODS)
+}
+
 FILENAME_PATTERN = re.compile(
     r"^(MRMS_MultiSensor_QPE_(\d{2})H_Pass(\d)_\d+\.\d+_(\d{4})(\d{2})(\d{2})-(\d{2})(\d{2})(\d{2}))\.grib2(\.gz)?$"  # noqa: E501
 )
@@ -104,8 +127,10 @@ ASSET_GRIB2_KEY = "grib2"
 ASSET_GRIB2_TITLE = "Original GRIB2 file"
 GRIB2_NODATA = [-1, -3]
 GRIB2_MEDIATYPE = "application/wmo-GRIB2"
+# Gzipped GRIB2 files are referenced as they are, so clients need to decompress them
+GRIB2_GZIP_MEDIATYPE = "application/gzip"
 GRIB2_ROLES = ["data", "source"]
-GRIB2_CLASSIFICATION = [
+GRIB2_CLASSIFICATION: List[Dict[str, Any]] = [
     {
         "value": -1,
         "name": "missing-value",
@@ -133,9 +158,63 @@ GRIB2_CLASSIFICATION = [
 ASSET_COG_KEY = "cog"
 ASSET_COG_TITLE = "Processed Cloud-Optimized GeoTiff file"
 COG_COMPRESS = "LZW"
+# Creation options for the COG driver. The data is stored as float64, but
+# originates from float32 values, so the trailing zero bytes compress better
+# without the floating-point predictor.
+COG_COMPRESSION_PROFILES: Dict[str, Dict[str, Any]] = {
+    "lzw": {"COMPRESS": "LZW"},
+    "fast-write": {"COMPRESS": "ZSTD", "LEVEL": 1},
+    "balanced": {"COMPRESS": "ZSTD", "LEVEL": 9},
+    "max-compression": {"COMPRESS": "ZSTD", "LEVEL": 19},
+}
+COG_COMPRESSION = "lzw"
+# Metadata item of the COGs that lists the tiles that contain only nodata
+# values and are therefore not stored in the file (sparse file)
+COG_EMPTY_TILES_TAG = "EMPTY_TILES"
+COG_BLOCKSIZE = 256
+# Resampling methods for the overviews, "max" is computed by this package
+COG_RESAMPLING_METHODS = ["average", "max", "mode", "nearest"]
+COG_RESAMPLING = "average"
 COG_NODATA = -1
+# Encodings for the COG data: The stored values are converted to millimeters
+# with `value * scale + offset`. MRMS QPE has a precision of 0.1 mm, so the
+# scaled integers are lossless. Larger values are clipped to the largest
+# valid value of the data type.
+COG_ENCODINGS: Dict[str, Dict[str, Any]] = {
+    "float64": {"dtype": "float64", "scale": 1, "offset": 0, "nodata": COG_NODATA},
+    "float32": {"dtype": "float32", "scale": 1, "offset": 0, "nodata": COG_NODATA},
+    "int16": {
+        "dtype": "int16",
+        "scale": 0.1,
+        "offset": 0,
+        "nodata": COG_NODATA,
+        "max": 32767,
+    },
+    "uint16": {
+        "dtype": "uint16",
+        "scale": 0.1,
+        "offset": 0,
+        "nodata": 65535,
+        "max": 65534,
+    },
+}
+COG_ENCODING = "float64"
 COG_ROLES = ["data", "cloud-optimized"]
-COG_CLASSIFICATION = {
+
+ASSET_CUBE_KEY = "cube"
+ASSET_CUBE_TITLE = "Time series of the region, period and pass (Zarr)"
+CUBE_MEDIATYPE = "application/vnd+zarr"
+CUBE_ROLES = ["data", "time-series"]
+XARRAY_EXTENSION = "https://stac-extensions.github.io/xarray-assets/v1.0.0/schema.json"
+CUBE_VARIABLE = "precipitation"
+# The time index of a file is the number of hours since the epoch, so that
+# files can be appended in any order
+CUBE_EPOCH = datetime(2000, 1, 1, tzinfo=timezone.utc)
+# Chunks of (time, y, x) for time series: A chunk contains a day of a
+# 128 x 128 km area, which is small enough to read a point over weeks
+# quickly and large enough to keep the number of chunks per time step low
+CUBE_CHUNKS = (24, 128, 128)
+COG_CLASSIFICATION: Dict[str, Any] = {
     "value": -1,
     "name": "no-data",
     "description": "No coverage or missing value (no-data)",
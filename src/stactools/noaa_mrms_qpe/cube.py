@@ -0,0 +1,221 @@
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, List, cast
+
+import numpy as np
+from rasterio.io import DatasetReader
+
+from . import constants, instrumentation
+from .cog import source_size, strips
+from .fileinfo import FileInfo
+from .filelock import lock
+from .gridcache import Grid
+
+if TYPE_CHECKING:
+    import zarr
+
+logger = logging.getLogger(__name__)
+
+# Chunk size of the time coordinate, a year of hourly time steps
+TIME_COORDINATE_CHUNK = 8760
+
+
+def cube_path(directory: str, aoi: constants.AOI, info: FileInfo) -> str:
+    """Returns the path of the Zarr store for the region, period and pass of a file."""
+    name = "{a}_{t:02d}H_Pass{p}.zarr".format(
+        a=aoi.value, t=info.period, p=info.pass_no
+    )
+    return os.path.join(directory, name)
+
+
+def time_value(time: datetime) -> int:
+    """Returns the value of a timestamp in the time coordinate of the cubes.
+
+    The value is the number of hours since the epoch. Timestamps are snapped
+    to the nearest full hour, the hourly slot of the product, as some files
+    are not stamped on the full hour (e.g. 01:58 for the 02:00 slot).
+    """
+    index = (time - constants.CUBE_EPOCH + timedelta(minutes=30)) // timedelta(hours=1)
+    if index < 0:
+        raise ValueError(f"Timestamp must be after {constants.CUBE_EPOCH}: {time}")
+    return int(index)
+
+
+def open_cube(
+    path: str, aoi: constants.AOI, info: FileInfo, grid: Grid
+) -> "zarr.Group":
+    """Opens the Zarr store of a region, period and pass, creates it if needed.
+
+    The store contains the precipitation in mm (float32, NaN for missing
+    values and no coverage) with the dimensions time, y and x and the
+    coordinates of the dimensions (cell centres), so it can be opened with
+    xarray. The time dimension starts at the time step of the file the store
+    is created for, which is stored as the attribute ``time_origin``.
+    The store is not locked, see :func:`filelock.lock`.
+
+    Requires the optional dependency ``zarr``, install it with
+    ``pip install stactools-noaa-mrms-qpe[zarr]``.
+
+    Args:
+        path (str): The path of the store
+        aoi (AOI): The region
+        info (FileInfo): The period and pass of a file
+        grid (Grid): The grid of the files
+
+    Returns:
+        zarr.Group: The store
+    """
+    try:
+        import zarr
+        from zarr.codecs import ZstdCodec
+    except ImportError as e:
+        raise ImportError(
+            "The time series cube requires zarr, install it with "
+            "`pip install stactools-noaa-mrms-qpe[zarr]`"
+        ) from e
+
+    group = zarr.open_group(path, mode="a")
+    if constants.CUBE_VARIABLE in group:
+        transform = cast(List[float], group.attrs["transform"])
+        if group.attrs["shape"] != grid.shape or not np.allclose(
+            transform, grid.transform, atol=constants.GRID_TOLERANCE
+        ):
+            raise ValueError(f"The grid of the file doesn't match the cube {path}")
+        return group
+
+    width, height = grid.shape
+    transform = grid.transform
+    group.attrs.update(
+        {
+            constants.EXT_REGION: aoi.value,
+            constants.EXT_PERIOD: info.period,
+            constants.EXT_PASS: info.pass_no,
+            "shape": grid.shape,
+            "transform": transform,
+            "proj:projjson": constants.PROJJSON,
+            "time_origin": time_value(info.datetime),
+        }
+    )
+    group.create_array(
+        "x",
+        data=transform[2] + (np.arange(width) + 0.5) * transform[0],
+        dimension_names=["x"],
+        attributes={"standard_name": "longitude", "units": "degrees_east"},
+    )
+    group.create_array(
+        "y",
+        data=transform[5] + (np.arange(height) + 0.5) * transform[4],
+        dimension_names=["y"],
+        attributes={"standard_name": "latitude", "units": "degrees_north"},
+    )
+    epoch = constants.CUBE_EPOCH.strftime("%Y-%m-%d %H:%M:%S")
+    group.create_array(
+        "time",
+        shape=(0,),
+        dtype="int64",
+        chunks=(TIME_COORDINATE_CHUNK,),
+        dimension_names=["time"],
+        attributes={
+            "standard_name": "time",
+            "units": f"hours since {epoch}",
+            "calendar": "proleptic_gregorian",
+        },
+    )
+    group.create_array(
+        constants.CUBE_VARIABLE,
+        shape=(0, height, width),
+        dtype="float32",
+        chunks=constants.CUBE_CHUNKS,
+        compressors=ZstdCodec(level=3),
+        fill_value=np.nan,
+        dimension_names=["time", "y", "x"],
+        attributes={
+            "long_name": "Multi-sensor accumulation "
+            f"{info.period}-hour ({info.pass_no}-hour latency)",
+            "units": constants.UNIT,
+        },
+    )
+    logger.info(f"Created cube {path}")
+    return group
+
+
+def append_to_cube(
+    path: str,
+    dataset: DatasetReader,
+    aoi: constants.AOI,
+    info: FileInfo,
+    grid: Grid,
+) -> int:
+    """Writes the data of a file to its time step in the cube.
+
+    The time step is derived from the timestamp of the file (see
+    :func:`time_value`) and the time origin of the store, so files can be
+    appended in any order and appending a file again overwrites its time
+    step. Files that are older than the time origin are prepended, which
+    rewrites the whole store (see :func:`prepend_time_steps`).
+    The store is locked while writing, so that several processes can append
+    to the same store. The data is written in strips of a chunk row.
+
+    Args:
+        path (str): The path of the store, see :func:`cube_path`
+        dataset (DatasetReader): The opened GRIB2 file
+        aoi (AOI): The region of the file
+        info (FileInfo): The information from the file name
+        grid (Grid): The grid of the file
+
+    Returns:
+        int: The index of the time step in the store
+    """
+    value = time_value(info.datetime)
+    with instrumentation.stage("cube") as event, lock(path):
+        event.bytes_read = source_size(dataset)
+        group = open_cube(path, aoi, info, grid)
+        origin = cast(int, group.attrs["time_origin"])
+        if value < origin:
+            logger.info(f"Prepending {origin - value} time steps to the cube {path}")
+            prepend_time_steps(group, origin - value)
+            origin = value
+        data_array = cast("zarr.Array[Any]", group[constants.CUBE_VARIABLE])
+        time_array = cast("zarr.Array[Any]", group["time"])
+        index = value - origin
+        size = data_array.shape[0]
+        if index >= size:
+            data_array.resize((index + 1,) + data_array.shape[1:])
+            time_array.resize((index + 1,))
+            time_array[slice(size, index + 1)] = np.arange(
+                origin + size, origin + index + 1
+            )
+
+        for window in strips(dataset.width, dataset.height, constants.CUBE_CHUNKS[1]):
+            data = dataset.read(1, window=window).astype("float32")
+            event.bytes_decoded += data.nbytes
+            data[data < 0] = np.nan
+            rows = slice(window.row_off, window.row_off + window.height)
+            data_array[index, rows, :] = data
+    return index
+
+
+def prepend_time_steps(group: "zarr.Group", steps: int) -> None:
+    """Inserts empty time steps at the start of a cube and moves its time origin.
+
+    The existing time steps are moved one by one, from the last to the first,
+    so this rewrites the whole store. It's only needed for files that are
+    older than all files in the cube, e.g. when the history is backfilled.
+
+    Args:
+        group (zarr.Group): The store, see :func:`open_cube`
+        steps (int): The number of time steps to insert
+    """
+    data_array = cast("zarr.Array[Any]", group[constants.CUBE_VARIABLE])
+    time_array = cast("zarr.Array[Any]", group["time"])
+    size = data_array.shape[0]
+    origin = cast(int, group.attrs["time_origin"]) - steps
+    data_array.resize((size + steps,) + data_array.shape[1:])
+    for index in reversed(range(size)):
+        data_array[index + steps] = data_array[index]
+    for index in range(min(steps, size)):
+        data_array[index] = np.nan
+    time_array.resize((size + steps,))
+    time_array[:] = np.arange(origin, origin + size + steps)
+    group.attrs["time_origin"] = origin
@@ -0,0 +1,332 @@
+import csv
+import json
+import logging
+import math
+import os
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import IO, Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import rasterio
+from affine import Affine
+from rasterio.crs import CRS
+from rasterio.features import geometry_mask
+from rasterio.transform import rowcol
+from rasterio.warp import transform_geom
+from rasterio.windows import Window, from_bounds
+from rasterio.windows import transform as window_transform
+
+from . import constants, instrumentation
+from .gridcache import Grid
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = [
+    "geometry",
+    "item",
+    "datetime",
+    "region",
+    "period",
+    "pass",
+    "count",
+    "mean",
+    "minimum",
+    "maximum",
+]
+
+
+@dataclass
+class Target:
+    """Class to represent the cells of a geometry in a grid."""
+
+    id: str
+    window: Window
+    # The cells of the window that are covered by a polygon, None for points
+    mask: Optional[Any] = None
+
+
+class Extractor:
+    """Class to extract time series for points and polygons from the Items.
+
+    The cells of the geometries are computed once per grid (from the
+    ``proj:transform`` and ``proj:shape`` of the assets and the CRS of the
+    files) and cached, so that the files only need to be opened to read the
+    windows of the geometries. The CRS is read from the files, as the
+    projection metadata of the Items may only describe the GRIB2 file, and
+    only taken from the metadata (``proj:epsg``, ``proj:wkt2`` or
+    ``proj:projjson``) if a file doesn't have one.
+    Only the blocks (tiles) of the COGs that intersect the windows are read.
+    The files are read by a pool of threads.
+
+    For points, the value of the cell that contains the point is extracted.
+    For polygons, the mean, minimum and maximum of the cells whose centres
+    are in the polygon are computed. Missing values and cells without
+    coverage are ignored.
+    """
+
+    def __init__(
+        self,
+        geometries: Dict[str, Dict[str, Any]],
+        asset: str = constants.ASSET_COG_KEY,
+        threads: int = 8,
+    ) -> None:
+        """
+        Args:
+            geometries (Dict[str, Dict[str, Any]]): The GeoJSON geometries
+                (points or polygons in WGS 84) by id
+            asset (str): The key of the asset to read, defaults to the COG
+            threads (int): The number of files read at the same time
+        """
+        self.geometries = geometries
+        self.asset = asset
+        self.threads = threads
+        self.targets: Dict[Tuple[Any, ...], List[Target]] = {}
+
+    def get_targets(self, grid: Grid, crs: Optional[str] = None) -> List[Target]:
+        """Returns the cells of the geometries that are in a grid.
+
+        Args:
+            grid (Grid): The grid
+            crs (str): The CRS of the grid (e.g. ``EPSG:3857`` or WKT),
+                None for geographic coordinates
+
+        Returns:
+            List[Target]: The windows (and masks) of the geometries, geometries
+            outside of the grid are left out
+        """
+        key = (tuple(grid.shape), tuple(grid.transform), crs)
+        targets = self.targets.get(key)
+        if targets is None:
+            targets = self.targets[key] = compute_targets(self.geometries, grid, crs)
+        return targets
+
+    def extract_item(self, item: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Extracts the values of the geometries from the asset of an Item.
+
+        Args:
+            item (Dict[str, Any]): The Item as dict, e.g. parsed from JSON
+
+        Returns:
+            List[Dict[str, Any]]: A row (see :data:`COLUMNS`) per geometry in
+            the grid of the Item
+
+        Raises:
+            ValueError: If neither the file nor the metadata define the CRS
+        """
+        asset = item.get("assets", {}).get(self.asset)
+        if asset is None:
+            return []
+        properties = item["properties"]
+        grid = Grid(shape=asset["proj:shape"], transform=asset["proj:transform"])
+
+        band = asset.get("raster:bands", [{}])[0]
+        scale = band.get("scale", 1)
+        offset = band.get("offset", 0)
+        base = {
+            "item": item["id"],
+            "datetime": properties["datetime"],
+            "region": properties.get(constants.EXT_REGION),
+            "period": properties.get(constants.EXT_PERIOD),
+            "pass": properties.get(constants.EXT_PASS),
+        }
+
+        rows = []
+        href = resolve_href(asset["href"], item)
+        with instrumentation.stage("extract", href=href) as event:
+            with rasterio.open(href) as dataset:
+                if dataset.crs is not None:
+                    crs = dataset.crs.to_wkt()
+                else:
+                    crs = metadata_crs(asset, properties)
+                if crs is None:
+                    raise ValueError(f"The CRS of {href} is unknown")
+                for target in self.get_targets(grid, crs):
+                    data = dataset.read(1, window=target.window)
+                    event.bytes_decoded += data.nbytes
+                    valid = data >= 0
+                    if dataset.nodata is not None:
+                        valid &= data != dataset.nodata
+                    if target.mask is not None:
+                        valid &= target.mask
+                    values = data[valid].astype("float64") * scale + offset
+                    row = dict(base, geometry=target.id, count=len(values))
+                    if len(values) > 0:
+                        row["mean"] = float(values.mean())
+                        row["minimum"] = float(values.min())
+                        row["maximum"] = float(values.max())
+                    rows.append(row)
+        return rows
+
+    def extract(self, items: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Extracts the values of the geometries from many Items.
+
+        The Items are read by the thread pool, the rows are yielded in the
+        order of the Items. Only a few Items are processed ahead, so the
+        memory usage doesn't depend on the number of Items. Items that fail
+        (e.g. a missing file) are logged and skipped.
+
+        Args:
+            items (Iterable[Dict[str, Any]]): The Items as dicts,
+                e.g. from :func:`aggregate.read_items`
+
+        Returns:
+            Iterator[Dict[str, Any]]: The rows, see :meth:`extract_item`
+        """
+
+        def collect(id: str, future: Future[List[Dict[str, Any]]]) -> List[Any]:
+            try:
+                return future.result()
+            except Exception:
+                logger.exception(f"Failed to extract the values of item {id}")
+                return []
+
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            running: Deque[Tuple[str, Future[List[Dict[str, Any]]]]] = deque()
+            for item in items:
+                running.append((item["id"], executor.submit(self.extract_item, item)))
+                if len(running) >= self.threads * 2:
+                    yield from collect(*running.popleft())
+            while running:
+                yield from collect(*running.popleft())
+
+
+def metadata_crs(asset: Dict[str, Any], properties: Dict[str, Any]) -> Optional[str]:
+    """Returns the CRS from the projection metadata of an asset or its Item.
+
+    Args:
+        asset (Dict[str, Any]): The asset as dict
+        properties (Dict[str, Any]): The properties of the Item
+
+    Returns:
+        Optional[str]: The CRS (``EPSG:<code>``, WKT2 or PROJJSON), None if
+        neither the asset nor the Item define it
+    """
+    for metadata in [asset, properties]:
+        if metadata.get("proj:epsg") is not None:
+            return f"EPSG:{metadata['proj:epsg']}"
+        if metadata.get("proj:wkt2") is not None:
+            return str(metadata["proj:wkt2"])
+        if metadata.get("proj:projjson") is not None:
+            return json.dumps(metadata["proj:projjson"])
+    return None
+
+
+def compute_targets(
+    geometries: Dict[str, Dict[str, Any]], grid: Grid, crs: Optional[str] = None
+) -> List[Target]:
+    """Computes the windows (and masks) of the geometries in a grid.
+
+    See :meth:`Extractor.get_targets` for the parameters.
+    """
+    width, height = grid.shape
+    transform = Affine(*grid.transform)
+    target_crs = None if crs is None else CRS.from_user_input(crs)
+    targets = []
+    for id, geometry in geometries.items():
+        # The geometries are in geographic coordinates, like the original grids
+        if target_crs is not None and not target_crs.is_geographic:
+            geometry = transform_geom("EPSG:4326", target_crs, geometry)
+
+        if geometry["type"] == "Point":
+            x, y = geometry["coordinates"][0:2]
+            row, col = rowcol(transform, x, y, op=math.floor)
+            if 0 <= col < width and 0 <= row < height:
+                targets.append(Target(id, Window(col, row, 1, 1)))
+            continue
+
+        left, bottom, right, top = bounds(geometry)
+        window = from_bounds(left, bottom, right, top, transform)
+        col_off = max(int(np.floor(window.col_off)), 0)
+        row_off = max(int(np.floor(window.row_off)), 0)
+        col_end = min(int(np.ceil(window.col_off + window.width)), width)
+        row_end = min(int(np.ceil(window.row_off + window.height)), height)
+        if col_end <= col_off or row_end <= row_off:
+            continue
+        window = Window(col_off, row_off, col_end - col_off, row_end - row_off)
+        mask = geometry_mask(
+            [geometry],
+            out_shape=(int(window.height), int(window.width)),
+            transform=window_transform(window, transform),
+            invert=True,
+        )
+        if mask.any():
+            targets.append(Target(id, window, mask))
+    return targets
+
+
+def bounds(geometry: Dict[str, Any]) -> Tuple[float, float, float, float]:
+    """Returns the bounding box of a GeoJSON geometry."""
+    coordinates = np.array(list(flatten(geometry["coordinates"])))
+    minimum = coordinates.min(axis=0)
+    maximum = coordinates.max(axis=0)
+    return (minimum[0], minimum[1], maximum[0], maximum[1])
+
+
+def flatten(coordinates: Any) -> Iterator[Tuple[float, float]]:
+    """Yields the positions of nested GeoJSON coordinates."""
+    if len(coordinates) > 0 and isinstance(coordinates[0], (int, float)):
+        yield (coordinates[0], coordinates[1])
+    else:
+        for part in coordinates:
+            yield from flatten(part)
+
+
+def resolve_href(href: str, item: Dict[str, Any]) -> str:
+    """Resolves a relative asset HREF against the self link of the Item, if any."""
+    if os.path.isabs(href) or "://" in href:
+        return href
+    for link in item.get("links", []):
+        if link["rel"] == "self":
+            return os.path.join(os.path.dirname(link["href"]), href)
+    return href
+
+
+def read_geometries(path: str) -> Dict[str, Dict[str, Any]]:
+    """Reads the geometries from a GeoJSON file.
+
+    Args:
+        path (str): A GeoJSON FeatureCollection, Feature or geometry with
+            points, polygons or multipolygons in WGS 84
+
+    Returns:
+        Dict[str, Dict[str, Any]]: The geometries by the ids of the features,
+        features without id are numbered
+    """
+    with open(path) as f:
+        data = json.load(f)
+    if data["type"] == "FeatureCollection":
+        features = data["features"]
+    elif data["type"] == "Feature":
+        features = [data]
+    else:
+        features = [{"type": "Feature", "geometry": data}]
+
+    geometries = {}
+    for index, feature in enumerate(features):
+        id = str(feature.get("id", index))
+        geometry = feature["geometry"]
+        if geometry["type"] not in ["Point", "Polygon", "MultiPolygon"]:
+            raise ValueError(f"Geometry type is not supported: {geometry['type']}")
+        geometries[id] = geometry
+    return geometries
+
+
+def write_csv(rows: Iterable[Dict[str, Any]], file: IO[str]) -> int:
+    """Streams the rows to a CSV file.
+
+    Args:
+        rows (Iterable[Dict[str, Any]]): The rows, see :data:`COLUMNS`
+        file (IO[str]): The opened file
+
+    Returns:
+        int: The number of rows
+    """
+    writer = csv.DictWriter(file, fieldnames=COLUMNS, lineterminator="\n")
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
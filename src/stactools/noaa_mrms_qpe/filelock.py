@@ -0,0 +1,23 @@
+import os
+from contextlib import contextmanager
+from typing import Iterator
+
+
+@contextmanager
+def lock(path: str) -> Iterator[None]:
+    """Locks a file or directory exclusively, also for other processes.
+
+    The lock is an advisory lock (flock) on ``<path>.lock``, so it only
+    excludes the processes that lock the path as well.
+    """
+    import fcntl
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(f"{path}.lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
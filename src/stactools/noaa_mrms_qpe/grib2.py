@@ -0,0 +1,282 @@
+import struct
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import IO, Iterator, Optional, Tuple
+
+import fsspec
+
+from . import constants, instrumentation
+
+# Length of the indicator section (section 0)
+INDICATOR_LENGTH = 16
+# Value of a 4 octet integer that is missing
+MISSING = 0xFFFFFFFF
+# Hours per unit of time range (code table 4.4): minute, hour, day
+TIME_UNITS = {0: 1 / 60, 1: 1, 2: 24}
+
+
+@dataclass
+class GridDefinition:
+    """Class to represent a regular latitude/longitude grid of a GRIB2 file
+    (grid definition template 3.0)."""
+
+    columns: int
+    rows: int
+    lat1: float
+    lon1: float
+    lat2: float
+    lon2: float
+    di: float
+    dj: float
+    scanning_mode: int
+
+    @property
+    def origin(self) -> Tuple[float, float]:
+        """The longitude (-180 to 180) and latitude of the first cell."""
+        lon = self.lon1 - 360 if self.lon1 > 180 else self.lon1
+        return lon, self.lat1
+
+
+@dataclass
+class ProductDefinition:
+    """Class to represent the product definition section of a GRIB2 file
+    (templates 4.0 and 4.8)."""
+
+    template: int
+    category: int
+    number: int
+    forecast_time: int
+    time_unit: int
+    period: Optional[int] = None
+    pass_no: Optional[int] = None
+
+
+@dataclass
+class DataRepresentation:
+    """Class to represent the data representation section of a GRIB2 file
+    (templates 5.0, 5.40 and 5.41, i.e. simple, JPEG 2000 and PNG packing)."""
+
+    template: int
+    count: int
+    reference_value: float
+    binary_scale: int
+    decimal_scale: int
+    bits: int
+
+
+@dataclass
+class Message:
+    """Class to represent the metadata (sections 0 to 5) of a GRIB2 message."""
+
+    discipline: int
+    length: int
+    centre: int
+    reference_time: datetime
+    grid: GridDefinition
+    product: ProductDefinition
+    data: DataRepresentation
+
+
+def open_file(href: str) -> IO[bytes]:
+    """Opens a (gzipped) GRIB2 file, the data is decompressed while reading."""
+    compression = "gzip" if href.endswith(".gz") else None
+    file: IO[bytes] = fsspec.open(href, "rb", compression=compression).open()
+    return file
+
+
+def read_sections(file: IO[bytes], href: str) -> Iterator[Tuple[int, bytes]]:
+    """Reads the sections of the first message of a GRIB2 file one by one.
+
+    Args:
+        file (IO[bytes]): The file, positioned at the start of the message
+        href (str): The HREF of the file, for error messages
+
+    Returns:
+        Iterator[Tuple[int, bytes]]: The numbers and content of the sections,
+        starting with the indicator section (section 0)
+    """
+    indicator = file.read(INDICATOR_LENGTH)
+    if len(indicator) < INDICATOR_LENGTH or indicator[0:4] != b"GRIB":
+        raise ValueError(f"Not a GRIB file: {href}")
+    if indicator[7] != 2:
+        raise ValueError(f"GRIB edition {indicator[7]} is not supported: {href}")
+    yield 0, indicator
+
+    while True:
+        header = file.read(5)
+        if len(header) < 5 or header[0:4] == b"7777":
+            return
+        length, number = struct.unpack(">IB", header)
+        yield number, header + file.read(length - 5)
+
+
+def read_grid_definition(href: str) -> GridDefinition:
+    """Reads the grid definition section (section 3) of a GRIB2 file.
+
+    Only the first sections of the file are read (and decompressed for
+    gzipped files), the data is not decoded.
+
+    Args:
+        href (str): The HREF of the (gzipped) GRIB2 file
+
+    Returns:
+        GridDefinition: The grid of the first message in the file
+    """
+    with open_file(href) as file:
+        for number, section in read_sections(file, href):
+            if number == 3:
+                return parse_grid_definition(section)
+    raise ValueError(f"No grid definition section found: {href}")
+
+
+def read_message(href: str) -> Message:
+    """Reads the metadata of the first message of a GRIB2 file.
+
+    Sections 0 to 5 are parsed directly from the byte stream, reading stops
+    before the bitmap and data sections. This way, only a few hundred bytes
+    of the file are read (and decompressed for gzipped files).
+
+    Args:
+        href (str): The HREF of the (gzipped) GRIB2 file
+
+    Returns:
+        Message: The metadata of the first message in the file
+    """
+    with instrumentation.stage("read_header", href=href) as event:
+        sections = {}
+        with open_file(href) as file:
+            for number, section in read_sections(file, href):
+                sections[number] = section
+                if number == 5:
+                    break
+            event.bytes_read = file.tell()
+
+        missing = [n for n in range(6) if n != 2 and n not in sections]
+        if len(missing) > 0:
+            raise ValueError(f"Sections {missing} not found: {href}")
+
+        identification = sections[1]
+        year, month, day, hour, minute, second = struct.unpack_from(
+            ">HBBBBB", identification, 12
+        )
+        return Message(
+            discipline=sections[0][6],
+            length=struct.unpack_from(">Q", sections[0], 8)[0],
+            centre=struct.unpack_from(">H", identification, 5)[0],
+            reference_time=datetime(
+                year, month, day, hour, minute, second, tzinfo=timezone.utc
+            ),
+            grid=parse_grid_definition(sections[3]),
+            product=parse_product_definition(sections[4], sections[0][6]),
+            data=parse_data_representation(sections[5]),
+        )
+
+
+def parse_grid_definition(section: bytes) -> GridDefinition:
+    """Parses a grid definition section (section 3) with template 3.0."""
+    template = struct.unpack_from(">H", section, 12)[0]
+    if template != 0:
+        raise ValueError(f"Grid definition template 3.{template} is not supported")
+
+    columns, rows, basic_angle, subdivisions = struct.unpack_from(">IIII", section, 30)
+    # Angles are given in micro degrees unless a basic angle is given
+    unit = 1e-6
+    if basic_angle not in [0, MISSING] and subdivisions not in [0, MISSING]:
+        unit = basic_angle / subdivisions
+
+    lat1, lon1 = struct.unpack_from(">II", section, 46)
+    lat2, lon2, di, dj = struct.unpack_from(">IIII", section, 55)
+    return GridDefinition(
+        columns=columns,
+        rows=rows,
+        lat1=signed(lat1) * unit,
+        lon1=signed(lon1) * unit,
+        lat2=signed(lat2) * unit,
+        lon2=signed(lon2) * unit,
+        di=di * unit,
+        dj=dj * unit,
+        scanning_mode=section[71],
+    )
+
+
+def parse_product_definition(section: bytes, discipline: int) -> ProductDefinition:
+    """Parses a product definition section (section 4) with template 4.0 or 4.8.
+
+    MRMS uses template 4.0 and a local parameter table, the accumulation period
+    and pass are derived from the parameter. For template 4.8, the accumulation
+    period is read from the statistical processing.
+    """
+    template, category, number = struct.unpack_from(">HBB", section, 7)
+    if template not in [0, 8]:
+        raise ValueError(f"Product definition template 4.{template} is not supported")
+
+    time_unit = section[17]
+    forecast_time = signed(struct.unpack_from(">I", section, 18)[0])
+    product = ProductDefinition(template, category, number, forecast_time, time_unit)
+
+    parameter = (discipline, category, number)
+    if parameter in constants.GRIB2_PARAMETERS:
+        product.period, product.pass_no = constants.GRIB2_PARAMETERS[parameter]
+    if template == 8 and section[48] in TIME_UNITS:
+        length = struct.unpack_from(">I", section, 49)[0]
+        product.period = round(length * TIME_UNITS[section[48]])
+    return product
+
+
+def parse_data_representation(section: bytes) -> DataRepresentation:
+    """Parses a data representation section (section 5) with template 5.0,
+    5.40 or 5.41, which share the packing parameters."""
+    count, template = struct.unpack_from(">IH", section, 5)
+    if template not in [0, 40, 41]:
+        raise ValueError(f"Data representation template 5.{template} is not supported")
+
+    reference_value = struct.unpack_from(">f", section, 11)[0]
+    binary_scale, decimal_scale = struct.unpack_from(">HH", section, 15)
+    return DataRepresentation(
+        template=template,
+        count=count,
+        reference_value=reference_value,
+        binary_scale=signed(binary_scale, 16),
+        decimal_scale=signed(decimal_scale, 16),
+        bits=section[19],
+    )
+
+
+def signed(value: int, bits: int = 32) -> int:
+    """Converts an integer in GRIB2 sign and magnitude notation."""
+    sign = 1 << (bits - 1)
+    if value & sign:
+        return -(value & (sign - 1))
+    return value
+
+
+def match_aoi(grid: GridDefinition) -> constants.AOI:
+    """Returns the AOI whose grid has the same shape and first cell as the grid."""
+    lon, lat = grid.origin
+    for aoi, (columns, rows, aoi_lon, aoi_lat) in constants.GRIDS.items():
+        if (
+            (grid.columns, grid.rows) == (columns, rows)
+            and abs(lon - aoi_lon) < constants.GRID_TOLERANCE
+            and abs(lat - aoi_lat) < constants.GRID_TOLERANCE
+        ):
+            return aoi
+    raise ValueError(
+        f"The grid ({grid.columns} x {grid.rows} cells from {lon}, {lat}) "
+        "doesn't match the grid of any AOI"
+    )
+
+
+def detect_aoi(href: str) -> constants.AOI:
+    """Detects the AOI of a file from the grid definition in its header.
+
+    This is cheap enough to run for every file, as only the first few hundred
+    bytes of the file are read and no data is decoded.
+
+    Args:
+        href (str): The HREF of the (gzipped) GRIB2 file
+
+    Returns:
+        AOI: The area of interest of the file
+    """
+    with instrumentation.stage("detect_aoi", href=href):
+        return match_aoi(read_grid_definition(href))
@@ -0,0 +1,149 @@
+import json
+import os
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional, Set
+
+from . import constants
+from .fileinfo import FileInfo
+from .filelock import lock
+
+if TYPE_CHECKING:
+    from rasterio.io import DatasetReader
+
+    from .grib2 import GridDefinition
+
+# Tolerance in degrees for the comparison of a cached grid with the AOI extent
+TOLERANCE = 0.1
+
+
+@dataclass
+class Grid:
+    """Class to represent the geometry of a raster grid."""
+
+    shape: List[int]
+    transform: List[float]
+
+    @classmethod
+    def from_dataset(cls, dataset: "DatasetReader") -> "Grid":
+        return cls(
+            shape=[dataset.shape[1], dataset.shape[0]],
+            transform=list(dataset.transform)[0:6],
+        )
+
+    @classmethod
+    def from_grid_definition(cls, definition: "GridDefinition") -> "Grid":
+        """Creates the grid from the grid definition in a GRIB2 header.
+
+        The cell size is derived from the first and last cell like GDAL does.
+        """
+        dx = (definition.lon2 - definition.lon1) / (definition.columns - 1)
+        dy = (definition.lat1 - definition.lat2) / (definition.rows - 1)
+        lon, lat = definition.origin
+        return cls(
+            shape=[definition.columns, definition.rows],
+            transform=[dx, 0.0, lon - dx / 2, 0.0, -dy, lat + dy / 2],
+        )
+
+    def bounds(self) -> List[float]:
+        left = self.transform[2]
+        top = self.transform[5]
+        right = left + self.transform[0] * self.shape[0]
+        bottom = top + self.transform[4] * self.shape[1]
+        return [min(left, right), min(top, bottom), max(left, right), max(top, bottom)]
+
+
+class GridCache:
+    """Class to cache the grid geometry per AOI, product and projection.
+
+    The grids of the MRMS products are fixed per AOI, so once a grid has been
+    seen, items can be created without opening the raster files.
+    The cache is stored as a JSON file, if a path is given. Processes that use
+    the same file share their grids: A grid that is not in memory is looked up
+    in the file, and the grids are merged with the file when it's saved.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path
+        self.grids: Dict[str, Grid] = self.read()
+        # Invalid grids, which are removed from the file when it's saved
+        self.removed: Set[str] = set()
+
+    @staticmethod
+    def key(aoi: constants.AOI, info: FileInfo, crs: Optional[str] = None) -> str:
+        """Returns the cache key for a file.
+
+        Args:
+            aoi (AOI): The area of interest
+            info (FileInfo): The information extracted from the file name
+            crs (str): The CRS of the grid, e.g. 'epsg:3857', None for the
+                original grid
+
+        Returns:
+            str: The key
+        """
+        region = aoi.value if isinstance(aoi, constants.AOI) else str(aoi)
+        product = f"{info.period:02d}H_Pass{info.pass_no}"
+        return f"{region}/{product}/{crs or 'native'}"
+
+    def get(self, key: str) -> Optional[Grid]:
+        """Returns the grid for the key, if cached and valid.
+
+        Grids in the original projection are validated against the extent of
+        the AOI, invalid grids are removed from the cache.
+        """
+        if key not in self.grids and key not in self.removed:
+            # Another process may have added it in the meantime
+            self.grids.update(self.read())
+        grid = self.grids.get(key)
+        if grid is not None and not self.is_valid(key, grid):
+            del self.grids[key]
+            self.removed.add(key)
+            self.save()
+            return None
+        return grid
+
+    def put(self, key: str, grid: Grid) -> None:
+        """Adds the grid for the key to the cache, if it is not cached yet."""
+        if self.grids.get(key) != grid:
+            self.grids[key] = grid
+            self.removed.discard(key)
+            self.save()
+
+    def is_valid(self, key: str, grid: Grid) -> bool:
+        region, _, crs = key.split("/")
+        if len(grid.shape) != 2 or len(grid.transform) != 6:
+            return False
+        if crs != "native" or region not in constants.EXTENTS:
+            return True
+
+        extent = constants.EXTENTS[region]
+        bounds = grid.bounds()
+        return all(abs(a - b) <= TOLERANCE for a, b in zip(bounds, extent))
+
+    def read(self) -> Dict[str, Grid]:
+        """Reads the grids from the file, if any."""
+        if self.path is None or not os.path.exists(self.path):
+            return {}
+        with open(self.path) as f:
+            data = json.load(f)
+        return {key: Grid(**grid) for key, grid in data.items()}
+
+    def save(self) -> None:
+        """Saves the grids, merged with the grids other processes have saved.
+
+        The file is locked while it's merged and replaced, so that concurrent
+        saves don't drop each other's grids.
+        """
+        if self.path is None:
+            return
+
+        with lock(self.path):
+            grids = self.read()
+            grids.update(self.grids)
+            for key in self.removed:
+                grids.pop(key, None)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({key: asdict(grid) for key, grid in grids.items()}, f)
+            os.replace(tmp_path, self.path)
+        self.grids = grids
@@ -0,0 +1,324 @@
+import json
+import logging
+import os
+import sys
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StageEvent:
+    """Class to represent a measurement of a stage of the item creation.
+
+    Stages can be nested, e.g. the ``open`` stage of a gzipped file contains
+    the ``decompress`` stage, so the durations don't necessarily add up.
+
+    ``peak_rss`` is the peak resident set size of the process *so far* (at
+    the end of the stage), not of the stage itself, as the operating system
+    only reports the maximum over the lifetime of the process.
+    ``peak_rss_increase`` is how much the stage raised that maximum, i.e. it
+    is 0 for stages that needed less memory than the stages before them.
+
+    ``bytes_read`` is the size of the (compressed) files the stage read,
+    ``bytes_decoded`` the size of the decoded raster data it processed.
+    """
+
+    stage: str
+    duration: float = 0.0
+    bytes_read: int = 0
+    bytes_decoded: int = 0
+    bytes_written: int = 0
+    peak_rss: Optional[int] = None
+    peak_rss_increase: Optional[int] = None
+    labels: Dict[str, str] = field(default_factory=dict)
+    error: Optional[str] = None
+    timestamp: float = field(default_factory=time.time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class Sink(ABC):
+    """Base class for the destinations of the stage measurements."""
+
+    @abstractmethod
+    def emit(self, event: StageEvent) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class LoggingSink(Sink):
+    """Logs the stage measurements with the logging module."""
+
+    def __init__(self, level: int = logging.INFO) -> None:
+        self.level = level
+
+    def emit(self, event: StageEvent) -> None:
+        labels = " ".join(f"{k}={v}" for k, v in sorted(event.labels.items()))
+        logger.log(
+            self.level,
+            f"{event.stage}: {event.duration:.3f} s, "
+            f"{event.bytes_read} bytes read, {event.bytes_decoded} bytes decoded, "
+            f"{event.bytes_written} bytes written, "
+            f"peak RSS {event.peak_rss} bytes "
+            f"(+{event.peak_rss_increase} bytes in the stage)"
+            + (f", failed: {event.error}" if event.error else "")
+            + (f" ({labels})" if labels else ""),
+        )
+
+
+class JsonLinesSink(Sink):
+    """Appends the stage measurements to a file, one JSON object per line.
+
+    The file is kept open until the sink is closed. It's line buffered, so
+    each measurement is written right away.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.file: Optional[IO[str]] = None
+
+    def emit(self, event: StageEvent) -> None:
+        if self.file is None:
+            self.file = open(self.path, "a", buffering=1)
+        self.file.write(json.dumps(event.to_dict()) + "\n")
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class PrometheusTextfileSink(Sink):
+    """Writes aggregated stage measurements in the Prometheus text format.
+
+    The file is meant to be picked up by the textfile collector of the
+    node exporter. It's replaced atomically after each measurement and
+    contains, per stage and labels, the number of runs and failures, the
+    total duration, the bytes read, decoded and written, the maximum peak RSS of the
+    process and the maximum increase of the peak RSS in the stage.
+    Labels that identify single files (``href``) are left out to keep the
+    number of time series bounded.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        prefix: str = "noaa_mrms_qpe_stage",
+        exclude: Tuple[str, ...] = ("href",),
+    ) -> None:
+        self.path = path
+        self.prefix = prefix
+        self.exclude = exclude
+        self.metrics: Dict[Tuple[Tuple[str, str], ...], Dict[str, float]] = {}
+
+    def emit(self, event: StageEvent) -> None:
+        labels = {k: v for k, v in event.labels.items() if k not in self.exclude}
+        key = tuple(sorted({**labels, "stage": event.stage}.items()))
+        metrics = self.metrics.setdefault(
+            key,
+            {
+                "runs_total": 0,
+                "failures_total": 0,
+                "duration_seconds_total": 0.0,
+                "bytes_read_total": 0,
+                "bytes_decoded_total": 0,
+                "bytes_written_total": 0,
+                "peak_rss_bytes": 0,
+                "peak_rss_increase_bytes": 0,
+            },
+        )
+        metrics["runs_total"] += 1
+        if event.error is not None:
+            metrics["failures_total"] += 1
+        metrics["duration_seconds_total"] += event.duration
+        metrics["bytes_read_total"] += event.bytes_read
+        metrics["bytes_decoded_total"] += event.bytes_decoded
+        metrics["bytes_written_total"] += event.bytes_written
+        if event.peak_rss is not None:
+            metrics["peak_rss_bytes"] = max(metrics["peak_rss_bytes"], event.peak_rss)
+        if event.peak_rss_increase is not None:
+            metrics["peak_rss_increase_bytes"] = max(
+                metrics["peak_rss_increase_bytes"], event.peak_rss_increase
+            )
+        self.write()
+
+    def write(self) -> None:
+        lines = []
+        names = sorted({name for metrics in self.metrics.values() for name in metrics})
+        for name in names:
+            metric = f"{self.prefix}_{name}"
+            kind = "gauge" if name.startswith("peak_rss") else "counter"
+            lines.append(f"# TYPE {metric} {kind}")
+            for key, metrics in sorted(self.metrics.items()):
+                labels = ",".join(f'{k}="{escape_label(v)}"' for k, v in key)
+                lines.append(f"{metric}{{{labels}}} {metrics[name]}")
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.path)
+
+
+sink: Optional[Sink] = None
+labels_var: ContextVar[Dict[str, str]] = ContextVar("labels", default={})
+collector_var: ContextVar[Optional[List[StageEvent]]] = ContextVar(
+    "collector", default=None
+)
+
+
+def set_sink(new_sink: Optional[Sink]) -> Optional[Sink]:
+    """Sets the sink for the stage measurements of the current process.
+
+    Args:
+        new_sink (Sink): The sink, None disables the instrumentation
+
+    Returns:
+        Sink: The previous sink
+    """
+    global sink
+    previous = sink
+    sink = new_sink
+    return previous
+
+
+def create_sink(spec: str) -> Sink:
+    """Creates a sink from a specification given on the command line.
+
+    Args:
+        spec (str): Either 'log' to log the measurements, the path of a
+            Prometheus textfile (``.prom``) or the path of a JSON lines file
+
+    Returns:
+        Sink: The sink
+    """
+    if spec == "log":
+        return LoggingSink()
+    elif spec.endswith(".prom"):
+        return PrometheusTextfileSink(spec)
+    else:
+        return JsonLinesSink(spec)
+
+
+def emit(event: StageEvent) -> None:
+    """Passes a measurement to the collector or the sink, if any."""
+    collector = collector_var.get()
+    if collector is not None:
+        collector.append(event)
+    elif sink is not None:
+        sink.emit(event)
+
+
+@contextmanager
+def stage(name: str, **labels: Any) -> Iterator[StageEvent]:
+    """Measures a stage of the item creation.
+
+    The yielded event can be used to set the bytes read, decoded and written.
+    The labels are added to the labels of the enclosing :func:`labelled` blocks.
+    Exceptions are recorded in the event and re-raised.
+
+    Args:
+        name (str): The name of the stage, e.g. 'cogify'
+        labels: Additional labels for the measurement
+
+    Returns:
+        StageEvent: The measurement, to be used as a context manager
+    """
+    event = StageEvent(name, labels=current_labels(**labels))
+    start_rss = peak_rss()
+    start = time.perf_counter()
+    try:
+        yield event
+    except BaseException as e:
+        event.error = type(e).__name__
+        raise
+    finally:
+        event.duration = time.perf_counter() - start
+        event.peak_rss = peak_rss()
+        if event.peak_rss is not None and start_rss is not None:
+            event.peak_rss_increase = event.peak_rss - start_rss
+        emit(event)
+
+
+def record(name: str, duration: float, bytes_decoded: int = 0, **labels: Any) -> None:
+    """Records a stage that has been measured by the caller.
+
+    This is used for work that is interleaved with another stage, e.g. the
+    statistics that are computed while writing a COG.
+    """
+    emit(
+        StageEvent(
+            name,
+            duration=duration,
+            bytes_decoded=bytes_decoded,
+            peak_rss=peak_rss(),
+            labels=current_labels(**labels),
+        )
+    )
+
+
+@contextmanager
+def labelled(**labels: Any) -> Iterator[None]:
+    """Adds labels to all measurements in the block, e.g. the AOI."""
+    token = labels_var.set(current_labels(**labels))
+    try:
+        yield
+    finally:
+        labels_var.reset(token)
+
+
+@contextmanager
+def collect() -> Iterator[List[StageEvent]]:
+    """Collects the measurements in the block instead of passing them to the sink.
+
+    This is used to send the measurements of worker processes back to the
+    main process.
+    """
+    events: List[StageEvent] = []
+    token = collector_var.set(events)
+    try:
+        yield events
+    finally:
+        collector_var.reset(token)
+
+
+def current_labels(**labels: Any) -> Dict[str, str]:
+    """Returns the labels of the enclosing blocks merged with the given labels."""
+    return {**labels_var.get(), **{k: str(v) for k, v in labels.items()}}
+
+
+def peak_rss() -> Optional[int]:
+    """Returns the peak resident set size of the current process in bytes.
+
+    This is the maximum since the start of the process (``ru_maxrss``).
+    """
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return int(rss if sys.platform == "darwin" else rss * 1024)
+
+
+def file_size(path: str) -> int:
+    """Returns the size of a local file or 0 if it can't be determined."""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,43 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pystac import Item
+
+from .constants import AOI
+from .instrumentation import StageEvent
+
+
+@dataclass
+class ItemResult:
+    """Class to represent the outcome of creating an Item for a file."""
+
+    href: str
+    item: Optional[Item] = None
+    error: Optional[str] = None
+    duration: float = 0.0
+    skipped: bool = False
+    events: List[StageEvent] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return self.item is not None
+
+
+@dataclass
+class TimestampResult:
+    """Class to represent the outcome of creating the Items of all regions
+    for one product and timestamp."""
+
+    id: str
+    datetime: datetime
+    results: Dict[AOI, ItemResult] = field(default_factory=dict)
+    duration: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return all(result.ok for result in self.results.values())
+
+    @property
+    def items(self) -> List[Item]:
+        return [r.item for r in self.results.values() if r.item is not None]
@@ -1,179 +1,67 @@
+import glob
 import logging
 import os
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, as_completed
+from contextlib import ExitStack
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional, Union
+from functools import partial
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
-import numpy as np
 import rasterio
-from dateutil.parser import isoparse
-from pystac import (
-    Asset,
-    CatalogType,
-    Collection,
-    Extent,
-    Item,
-    MediaType,
-    SpatialExtent,
-    Summaries,
-    TemporalExtent,
-)
-from pystac.extensions.item_assets import AssetDefinition, ItemAssetsExtension
+import stactools.core
+from pystac import Asset, Collection, Item, MediaType
+from pystac.extensions.file import FileExtension
 from pystac.extensions.projection import ProjectionExtension
-from pystac.extensions.raster import DataType
-
-from . import cog, constants
+from rasterio.io import DatasetReader
+
+from . import cog, constants, grib2, instrumentation, statistics
+from .checksum import Digest
+from .cogcache import CogCache
+from .collection import create_band
+from .collection import create_collection as create_collection  # noqa: F401
+from .cube import append_to_cube, cube_path
 from .fileinfo import FileInfo
+from .gridcache import Grid, GridCache
+from .itemresult import ItemResult, TimestampResult
+from .state import StateStore
 
 logger = logging.getLogger(__name__)
 
+stactools.core.use_fsspec()
 
-def create_collection(
-    period: int,
-    pass_no: int,
-    thumbnail: str = "",
-    nocog: bool = False,
-    nogrib: bool = False,
-    start_time: Optional[str] = None,
-) -> Collection:
-    """Create a STAC Collection for NOAA MRMS QPE sub-products.
-
-    Args:
-        period (int): The time period the sub-product is for (either 1, 3, 6, 12, 24, 48, or 72)
-        pass_no (int): The pass number of the sub-product (either 1 or 2)
-        thumbnail (str): URL for the PNG or JPEG collection thumbnail asset (none if empty)
-        nocog (bool): If set to True, the collections does not include the COG-related metadata
-        nogrib (bool): If set to True, the collections does not include the GRIB2-related metadata
-        start_time (str): The start timestamp for the temporal extent, default to now.
-            Timestamps consist of a date and time in UTC and must follow RFC 3339, section 5.6.
-
-    Returns:
-        Collection: STAC Collection object
-    """
-    # Time must be in UTC
-    if start_time is None:
-        start_datetime = datetime.now(tz=timezone.utc)
-    else:
-        start_datetime = isoparse(start_time)
-
-    spatial_extents = list(constants.EXTENTS.values())
-    extent = Extent(
-        SpatialExtent(spatial_extents),
-        TemporalExtent([[start_datetime, None]]),
-    )
-
-    keywords = [
-        "NOAA",
-        "MRMS",
-        "QPE",
-        "multi-radar",
-        "multi-sensor",
-        "precipitation",
-        "{t}-hour".format(t=period),
-    ]
-    if not nogrib:
-        keywords.append("GRIB2")
-    if not nocog:
-        keywords.append("COG")
-
-    description = (
-        "The Multi-Radar Multi-Sensor (MRMS) quantitative precipitation estimation "
-        "(QPE) product is generated fully automatically from multiple sources to generate "
-        "seamless, hourly 1 km mosaics over the US.\n\n"
-        "**Note:** The data for Guam and the Caribbean Islands are [not multi-sensor products]"
-        "(https://vlab.noaa.gov/documents/96675/666999/MS_DomainDiffernces.png) yet."
-    )
-    if pass_no == 1:
-        description += (
-            "\n\nThis is the {t}-hour pass 1 product with less latency (60 min), "
-            "but less gauges (60-65 %)."
-        )
-    elif pass_no == 2:
-        description += (
-            "\n\nThis is the {t}-hour pass 2 product with more latency (120 min), "
-            "but more gauges (99 %)."
-        )
-
-    summaries = Summaries({})
-    summaries.add(constants.EXT_PASS, [pass_no])
-    summaries.add(constants.EXT_PERIOD, [period])
-    summaries.add(constants.EXT_REGION, [e.value for e in constants.AOI])
-
-    collection = Collection(
-        stac_extensions=[constants.EXTENSION],
-        id="noaa-mrms-qpe-{t}h-pass{p}".format(t=period, p=pass_no),
-        title="NOAA MRMS QPE {t}-hour Pass {p}".format(t=period, p=pass_no),
-        description=description.format(t=period),
-        keywords=keywords,
-        license="proprietary",
-        providers=constants.PROVIDERS,
-        extent=extent,
-        summaries=summaries,
-        catalog_type=CatalogType.RELATIVE_PUBLISHED,
-    )
-
-    collection.add_link(constants.LINK_LICENSE)
-    collection.add_link(constants.LINK_MRMS_HOME)
-    collection.add_link(constants.LINK_MRMS_TECH_GUIDE)
-
-    if len(thumbnail) > 0:
-        if thumbnail.endswith(".png"):
-            media_type = MediaType.PNG
-        else:
-            media_type = MediaType.JPEG
-
-        collection.add_asset(
-            "thumbnail",
-            Asset(
-                href=thumbnail,
-                title="Preview",
-                roles=["thumbnail"],
-                media_type=media_type,
-            ),
-        )
-
-    item_assets = {}
-
-    # it seems the raster extension can't be added to an AssetDefintion
-    # via RasterExtension.ext(data_asset, add_if_missing=True).
-    # So RasterBand.create() etc. are not usable here
-    collection.stac_extensions.append(constants.RASTER_EXTENSION_V11)
-
-    def create_asset(media_type: str, roles: List[str], title: str) -> Dict[str, Any]:
-        asset: Dict[str, Any] = {
-            "roles": roles,
-            "type": media_type,
-            "raster:bands": [create_band()],
-            "title": title,
-        }
-        return asset
-
-    if not nocog:
-        asset = create_asset(
-            MediaType.COG, constants.COG_ROLES, constants.ASSET_COG_TITLE
-        )
-        item_assets[constants.ASSET_COG_KEY] = AssetDefinition(asset)
-
-    if not nogrib:
-        asset = create_asset(
-            constants.GRIB2_MEDIATYPE,
-            constants.GRIB2_ROLES,
-            constants.ASSET_GRIB2_TITLE,
-        )
-        item_assets[constants.ASSET_GRIB2_KEY] = AssetDefinition(asset)
-
-    item_assets_attrs = ItemAssetsExtension.ext(collection, add_if_missing=True)
-    item_assets_attrs.item_assets = item_assets
-
-    return collection
+T = TypeVar("T")
+R = TypeVar("R")
 
 
 def create_item(
     asset_href: str,
-    aoi: constants.AOI,
+    aoi: Optional[constants.AOI] = None,
     collection: Optional[Collection] = None,
     nocog: bool = False,
     nogrib: bool = False,
     epsg: int = 0,
+    nostats: bool = False,
+    grid_cache: Optional[GridCache] = None,
+    resampling: str = constants.COG_RESAMPLING,
+    compression: str = constants.COG_COMPRESSION,
+    encoding: str = constants.COG_ENCODING,
+    checksum: bool = False,
+    cog_cache: Optional[CogCache] = None,
+    cube: Optional[str] = None,
 ) -> Item:
     """Create a STAC Item
 
@@ -185,18 +73,42 @@ def create_item(
     Args:
         asset_href (str): The HREF pointing to an asset associated with the item
         aoi (AOI): The area of interest, either 'ALASKA', 'CONUS' (continental US),
-            'CARIB' (Caribbean islands), 'GUAM' or 'HAWAII'
+            'CARIB' (Caribbean islands), 'GUAM' or 'HAWAII'.
+            Detected from the grid definition of the file if not given.
         collection (pystac.Collection): HREF to an existing collection
         nocog (bool): If set to True, no COG file is generated for the Item
         nogrib (bool): If set to True, the GRIB2 file is not added to the Item
         epsg (int): Converts the COG files to the given EPSG Code (e.g. 3857),
             doesn't reproject by default.
+        nostats (bool): If set to True, no statistics and classes are computed
+            for the assets
+        grid_cache (GridCache): A cache for the grid geometries. Together with
+            `nocog` and `nostats`, the GRIB2 file doesn't need to be opened.
+            Without a cache, only the header of the GRIB2 file is read.
+        resampling (str): The resampling method for the COG overviews,
+            either 'average' (default), 'max', 'mode' or 'nearest'.
+        compression (str): The compression profile for the COG, either 'lzw' (default),
+            'fast-write', 'balanced' or 'max-compression'.
+        encoding (str): The data encoding of the COG, either 'float64' (default),
+            'float32', 'int16' or 'uint16' (scaled to 0.1 mm).
+        checksum (bool): If set to True, the checksum (SHA2-256 multihash) and size
+            of the files are added to the assets (file extension). They are computed
+            while the files are read and written anyway, unless the GRIB2 file
+            doesn't need to be opened.
+        cog_cache (CogCache): A cache for the COGs. If a COG has been created
+            for a file with the same content and options before, it's reused
+            instead of converting the file again.
+        cube (str): A directory for time series cubes. If given, the data is
+            written to the Zarr store of the region, period and pass in the
+            directory, which is added to the Item as an asset.
 
     Returns:
         Item: STAC Item object
     """
 
     basics = parse_filename(asset_href)
+    if aoi is None:
+        aoi = grib2.detect_aoi(asset_href)
     id = aoi + "_" + basics.id
 
     bbox = constants.EXTENTS[aoi]
@@ -226,6 +138,8 @@ def create_item(
     item.stac_extensions.append(constants.RASTER_EXTENSION_V11)
     # Classification extension v1.1 not supported by PySTAC
     item.stac_extensions.append(constants.CLASSIFICATION_EXTENSION_V11)
+    if checksum:
+        item.stac_extensions.append(FileExtension.get_schema_uri())
 
     # Projection extension for assets
     proj_attrs = ProjectionExtension.ext(item, add_if_missing=True)
@@ -247,39 +161,35 @@ def create_item(
         band: Dict[str, Any],
         crs: Union[Dict[str, Any], int],
         title: str,
+        grid: Grid,
+        stats: Optional[statistics.Statistics] = None,
+        digest: Optional[Digest] = None,
     ) -> Asset:
         asset = Asset(href=href, media_type=media_type, roles=roles, title=title)
 
-        isGRIB2 = media_type == constants.GRIB2_MEDIATYPE
+        if digest is not None:
+            file_attrs = FileExtension.ext(asset)
+            file_attrs.checksum = digest.checksum
+            file_attrs.size = digest.size
 
-        shape = None
-        transform = None
-        with rasterio.open(href) as dataset:
-            if dataset.transform:
-                transform = list(dataset.transform)[0:6]
-
-            if len(dataset.shape) == 2:
-                shape = [dataset.shape[1], dataset.shape[0]]
-
-            data = dataset.read()
-            valid_data = np.ma.masked_array(data, mask=(data < 0))  # type: ignore
+        isGRIB2 = media_type in [
+            constants.GRIB2_MEDIATYPE,
+            constants.GRIB2_GZIP_MEDIATYPE,
+        ]
 
-            band["statistics"] = {
-                "minimum": float(np.nanmin(valid_data)),
-                "maximum": float(np.nanmax(valid_data)),
-            }
+        if stats is not None:
+            if stats.minimum is not None and stats.maximum is not None:
+                band["statistics"] = {
+                    "minimum": stats.minimum,
+                    "maximum": stats.maximum,
+                }
 
-            classes = []
+            # some old files contain -999 as nodata value
             if isGRIB2:
-                if np.any(data == -1.0):
-                    classes.append(constants.GRIB2_CLASSIFICATION[0])
-                if np.any(data == -3.0):
-                    classes.append(constants.GRIB2_CLASSIFICATION[1])
-                # some old files contain -999 as nodata value
-                if np.any(data == -999.0):
-                    classes.append(constants.GRIB2_CLASSIFICATION[2])
-            elif np.any(data == -1.0):
-                classes.append(constants.COG_CLASSIFICATION)
+                classification = constants.GRIB2_CLASSIFICATION
+            else:
+                classification = [dict(constants.COG_CLASSIFICATION, value=cog_nodata)]
+            classes = [c for c in classification if stats.has(c["value"])]
 
             if len(classes) > 0:
                 band["classification:classes"] = classes
@@ -290,11 +200,8 @@ def create_item(
                 band["nodata"] = band["classification:classes"][0]["value"]
 
         proj_attrs = ProjectionExtension.ext(asset, add_if_missing=False)
-        if shape:
-            proj_attrs.shape = shape
-
-        if transform:
-            proj_attrs.transform = transform
+        proj_attrs.shape = grid.shape
+        proj_attrs.transform = grid.transform
 
         if epsg > 0 and not nogrib and not nocog:
             if isinstance(crs, int):
@@ -307,40 +214,544 @@ def create_item(
 
         return asset
 
-    if basics.gzip:
-        asset_href = cog.decompress(asset_href)
+    grib_nodata = [c["value"] for c in constants.GRIB2_CLASSIFICATION]
+    cog_nodata = constants.COG_ENCODINGS[encoding]["nodata"]
+
+    # The source is decoded only once: The statistics for the COG and
+    # (if not reprojected) the GRIB2 file are computed while writing the COG.
+    # The source is not opened at all for GRIB2-only items without statistics
+    # if the grid is cached.
+    with ExitStack() as stack:
+        stack.enter_context(
+            instrumentation.labelled(
+                aoi=aoi.value,
+                period=basics.period,
+                pass_no=basics.pass_no,
+                href=asset_href,
+            )
+        )
+        source: Optional[DatasetReader] = None
+        # The checksum of the GRIB2 file (which is also the key of the COG
+        # cache) is computed while it's opened
+        grib_digest = Digest() if checksum and not nogrib else None
+        source_digest = grib_digest
+        if source_digest is None and cog_cache is not None and not nocog:
+            source_digest = Digest()
+
+        def open_source() -> DatasetReader:
+            nonlocal source
+            if source is None:
+                source = stack.enter_context(
+                    cog.open_dataset(asset_href, source_digest)
+                )
+            return source
+
+        grib_stats = None
+        if not nocog:
+            epsg_string = "epsg:" + str(epsg) if epsg > 0 else None
+            crs: Union[Dict[str, Any], int] = epsg if epsg > 0 else constants.PROJJSON
+            cog_href = cog.cog_path(asset_href)
+
+            cog_stats = statistics.Statistics([cog_nodata])
+            if not nogrib and epsg_string is None and not nostats:
+                grib_stats = statistics.Statistics(grib_nodata)
+
+            stats_duration = 0.0
+            stats_bytes = 0
+
+            def update_stats(data: Any, clamped: Any) -> None:
+                nonlocal stats_duration, stats_bytes
+                start = time.perf_counter()
+                if grib_stats is not None:
+                    grib_stats.update(data)
+                    stats_bytes += data.nbytes
+                cog_stats.update(clamped)
+                stats_bytes += clamped.nbytes
+                stats_duration += time.perf_counter() - start
+
+            cog_grid_key = GridCache.key(aoi, basics, epsg_string)
+            cog_grid = None if grid_cache is None else grid_cache.get(cog_grid_key)
+
+            cached = None
+            cache_key: Optional[str] = None
+            if cog_cache is not None and source_digest is not None:
+                # The checksum is complete once the file has been read
+                open_source()
+                cache_key = CogCache.key(
+                    source_digest.checksum,
+                    epsg_string,
+                    resampling,
+                    compression,
+                    encoding,
+                )
+                with instrumentation.stage("cog_cache") as event:
+                    # COGs cached without statistics can't be used if needed
+                    require = [] if nostats else ["cog_statistics"]
+                    cached = cog_cache.get(cache_key, cog_href, require)
+                    event.labels["result"] = "miss" if cached is None else "hit"
+
+            if cached is not None:
+                # Only the metadata is rebuilt from the cached COG
+                cog_digest = None
+                if checksum:
+                    cog_digest = Digest(cached["checksum"], cached["size"])
+                if not nostats:
+                    cog_stats = statistics.Statistics.from_dict(
+                        cached["cog_statistics"]
+                    )
+                    if grib_stats is not None:
+                        if cached["grib_statistics"] is None:
+                            grib_stats = None
+                        else:
+                            grib_stats = statistics.Statistics.from_dict(
+                                cached["grib_statistics"]
+                            )
+            else:
+                # The checksum of the COG is always needed for the cache
+                cog_digest = Digest() if checksum or cog_cache is not None else None
+                cog.cogify_dataset(
+                    open_source(),
+                    cog_href,
+                    epsg_string,
+                    None if nostats else update_stats,
+                    resampling,
+                    compression,
+                    encoding,
+                    cog_digest,
+                    cog_grid,
+                )
+                if not nostats:
+                    # Interleaved with (and included in) the cogify stage
+                    instrumentation.record("statistics", stats_duration, stats_bytes)
+                if (
+                    cog_cache is not None
+                    and cache_key is not None
+                    and cog_digest is not None
+                ):
+                    cog_cache.put(
+                        cache_key,
+                        cog_href,
+                        {
+                            "cog_statistics": None if nostats else cog_stats.to_dict(),
+                            "grib_statistics": (
+                                None if grib_stats is None else grib_stats.to_dict()
+                            ),
+                            "checksum": cog_digest.checksum,
+                            "size": cog_digest.size,
+                        },
+                    )
+                if not checksum:
+                    cog_digest = None
+
+            if cog_grid is None:
+                with rasterio.open(cog_href) as cog_dataset:
+                    cog_grid = Grid.from_dataset(cog_dataset)
+                if grid_cache is not None:
+                    grid_cache.put(cog_grid_key, cog_grid)
+
+            band = create_band(encoding)
+
+            asset = create_asset(
+                cog_href,
+                MediaType.COG,
+                constants.COG_ROLES,
+                band,
+                crs,
+                constants.ASSET_COG_TITLE,
+                cog_grid,
+                None if nostats else cog_stats,
+                cog_digest,
+            )
+            item.add_asset(constants.ASSET_COG_KEY, asset)
+
+        grib_grid: Optional[Grid] = None
+        if not nogrib:
+            grib_key = GridCache.key(aoi, basics)
+            if grid_cache is not None and source is None:
+                grib_grid = grid_cache.get(grib_key)
+            if (
+                grib_grid is None
+                and source is None
+                and (nostats or grib_stats is not None)
+            ):
+                # Metadata only (or the statistics are cached): The grid is read
+                # from the header of the file without decoding the data
+                message = grib2.read_message(asset_href)
+                grib_grid = Grid.from_grid_definition(message.grid)
+            if grib_grid is None:
+                grib_grid = Grid.from_dataset(open_source())
+                if grid_cache is not None:
+                    grid_cache.put(grib_key, grib_grid)
+
+            if grib_stats is None and not nostats:
+                grib_stats = statistics.compute(open_source(), grib_nodata)
+
+            if grib_digest is not None and source is None:
+                # The file hasn't been opened, so it's read for the checksum only
+                grib_digest = Digest.from_file(asset_href)
+
+            band = create_band()
+
+            asset = create_asset(
+                asset_href,
+                (
+                    constants.GRIB2_GZIP_MEDIATYPE
+                    if basics.gzip
+                    else constants.GRIB2_MEDIATYPE
+                ),
+                constants.GRIB2_ROLES,
+                band,
+                constants.PROJJSON,
+                constants.ASSET_GRIB2_TITLE,
+                grib_grid,
+                grib_stats,
+                grib_digest,
+            )
+            item.add_asset(constants.ASSET_GRIB2_KEY, asset)
+
+        if cube is not None:
+            cube_href = cube_path(cube, aoi, basics)
+            dataset = open_source()
+            if grib_grid is None:
+                grib_grid = Grid.from_dataset(dataset)
+            append_to_cube(cube_href, dataset, aoi, basics, grib_grid)
+            asset = Asset(
+                href=cube_href,
+                media_type=constants.CUBE_MEDIATYPE,
+                roles=constants.CUBE_ROLES,
+                title=constants.ASSET_CUBE_TITLE,
+            )
+            asset.extra_fields["xarray:open_kwargs"] = {"engine": "zarr"}
+            item.add_asset(constants.ASSET_CUBE_KEY, asset)
+            item.stac_extensions.append(constants.XARRAY_EXTENSION)
 
-    if not nocog:
-        epsg_string = "epsg:" + str(epsg) if epsg > 0 else None
-        crs: Union[Dict[str, Any], int] = epsg if epsg > 0 else constants.PROJJSON
-        cog_href = cog.convert(asset_href, reproject_to=epsg_string)
+    return item
 
-        band = create_band()
 
-        asset = create_asset(
-            cog_href,
-            MediaType.COG,
-            constants.COG_ROLES,
-            band,
-            crs,
-            constants.ASSET_COG_TITLE,
-        )
-        item.add_asset(constants.ASSET_COG_KEY, asset)
+def create_items(
+    hrefs: Iterable[str],
+    aoi: Optional[constants.AOI] = None,
+    collection: Optional[Collection] = None,
+    nocog: bool = False,
+    nogrib: bool = False,
+    epsg: int = 0,
+    processes: int = 1,
+    state: Optional[StateStore] = None,
+    nostats: bool = False,
+    grid_cache: Optional[GridCache] = None,
+    resampling: str = constants.COG_RESAMPLING,
+    compression: str = constants.COG_COMPRESSION,
+    encoding: str = constants.COG_ENCODING,
+    checksum: bool = False,
+    cog_cache: Optional[CogCache] = None,
+    cube: Optional[str] = None,
+) -> Iterator[ItemResult]:
+    """Create STAC Items for many files in parallel.
+
+    The files are converted by a pool of worker processes. The results are
+    returned in the order of the given files. A file that fails doesn't abort
+    the other files, the error is reported in its result instead.
+    Successfully processed files are recorded in the state store, if given.
+    The measurements of the stages are passed to the sink of the current
+    process (see :func:`instrumentation.set_sink`).
+
+    Args:
+        hrefs (Iterable[str]): The HREFs of the (gzipped) GRIB2 files
+        aoi (AOI): The area of interest, either 'ALASKA', 'CONUS' (continental US),
+            'CARIB' (Caribbean islands), 'GUAM' or 'HAWAII'.
+            Detected per file from its grid definition if not given.
+        collection (pystac.Collection): An existing collection, loaded once for all files
+        nocog (bool): If set to True, no COG file is generated for the Items
+        nogrib (bool): If set to True, the GRIB2 files are not added to the Items
+        epsg (int): Converts the COG files to the given EPSG Code (e.g. 3857),
+            doesn't reproject by default.
+        processes (int): The number of worker processes, 1 processes the
+            files in the current process.
+        state (StateStore): If given, files that have already been processed
+            with the same options and haven't changed since are skipped.
+        nostats (bool): If set to True, no statistics and classes are computed
+        grid_cache (GridCache): A cache for the grid geometries, the worker
+            processes share the grids through its file
+        resampling (str): The resampling method for the COG overviews
+        compression (str): The compression profile for the COGs
+        encoding (str): The data encoding of the COGs
+        checksum (bool): If set to True, the checksums and sizes of the files
+            are added to the assets
+        cog_cache (CogCache): A cache for the COGs, shared with the worker processes
+        cube (str): A directory for time series cubes (Zarr), the worker processes
+            append to the cubes one after another
 
-    if not nogrib:
-        band = create_band()
+    Returns:
+        Iterator[ItemResult]: The results, in the order of the given files
+    """
+    options: Dict[str, Any] = {
+        "nocog": nocog,
+        "nogrib": nogrib,
+        "epsg": epsg,
+        "nostats": nostats,
+        "resampling": resampling,
+        "compression": compression,
+        "encoding": encoding,
+        "checksum": checksum,
+        "cube": cube,
+    }
+    create = partial(
+        create_item_result,
+        aoi=aoi,
+        grid_cache=grid_cache,
+        cog_cache=cog_cache,
+        **options,
+    )
 
-        asset = create_asset(
-            asset_href,
-            constants.GRIB2_MEDIATYPE,
-            constants.GRIB2_ROLES,
-            band,
-            constants.PROJJSON,
-            constants.ASSET_GRIB2_TITLE,
+    # The region is part of the state, a file can be processed for another region
+    state_options = dict(options, aoi=aoi.value if aoi is not None else None)
+    hrefs = list(hrefs)
+    todo = hrefs
+    if state is not None:
+        todo = [href for href in hrefs if not state.is_processed(href, state_options)]
+
+    with ExitStack() as stack:
+        if processes > 1:
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=processes))
+            results: Iterator[ItemResult] = map_bounded(
+                executor, create, todo, 2 * processes
+            )
+        else:
+            results = map(create, todo)
+
+        remaining = set(todo)
+        for href in hrefs:
+            if href not in remaining:
+                yield ItemResult(href, skipped=True)
+                continue
+
+            result = add_collection(next(results), collection)
+            for event in result.events:
+                instrumentation.emit(event)
+            yield result
+            # Record after the caller has handled (e.g. stored) the result
+            if state is not None and result.item is not None:
+                state.record(href, state_options, result.item.id)
+
+
+def map_bounded(
+    executor: Executor, fn: Callable[[T], R], items: Iterable[T], window: int
+) -> Iterator[R]:
+    """Maps a function over items with an executor, returning the results in order.
+
+    Unlike ``Executor.map``, which submits all items at once, at most ``window``
+    items are submitted ahead of the results that have been consumed. So the
+    pending futures and their results don't pile up for many items.
+
+    Args:
+        executor (Executor): The pool of workers
+        fn (Callable): The function, called with each item
+        items (Iterable): The items
+        window (int): The maximum number of submitted items without a consumed
+            result, at least 1
+
+    Returns:
+        Iterator: The results, in the order of the items
+    """
+    pending: Deque[Future[R]] = deque()
+    try:
+        for item in items:
+            pending.append(executor.submit(fn, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        # The caller stopped early, don't process the remaining items
+        for future in pending:
+            future.cancel()
+
+
+def create_timestamp_items(
+    hrefs: Dict[constants.AOI, str],
+    collection: Optional[Collection] = None,
+    nocog: bool = False,
+    nogrib: bool = False,
+    epsg: int = 0,
+    processes: int = 0,
+    nostats: bool = False,
+    grid_cache: Optional[GridCache] = None,
+    resampling: str = constants.COG_RESAMPLING,
+    compression: str = constants.COG_COMPRESSION,
+    encoding: str = constants.COG_ENCODING,
+    checksum: bool = False,
+    cog_cache: Optional[CogCache] = None,
+    cube: Optional[str] = None,
+    executor: Optional[Executor] = None,
+    callback: Optional[Callable[[constants.AOI, ItemResult], None]] = None,
+) -> TimestampResult:
+    """Create the STAC Items of all regions for one product and timestamp.
+
+    MRMS publishes each product and timestamp for several regions. The files
+    of the regions are converted concurrently, the largest regions first, so
+    that the whole timestamp takes about as long as the slowest region
+    (usually CONUS) instead of the sum of all regions.
+    The callback is called in the current process as soon as a region is done,
+    e.g. to store its Item. The function returns once all regions are done.
+
+    Args:
+        hrefs (Dict[AOI, str]): The HREFs of the (gzipped) GRIB2 files by region,
+            all files must be of the same product and timestamp
+        collection (pystac.Collection): An existing collection, loaded once for all files
+        nocog (bool): If set to True, no COG file is generated for the Items
+        nogrib (bool): If set to True, the GRIB2 files are not added to the Items
+        epsg (int): Converts the COG files to the given EPSG Code (e.g. 3857),
+            doesn't reproject by default.
+        processes (int): The number of worker processes, 0 (default) uses a
+            process per region, 1 processes the files in the current process.
+            Ignored if an executor is given.
+        nostats (bool): If set to True, no statistics and classes are computed
+        grid_cache (GridCache): A cache for the grid geometries, the worker
+            processes share the grids through its file
+        resampling (str): The resampling method for the COG overviews
+        compression (str): The compression profile for the COGs
+        encoding (str): The data encoding of the COGs
+        checksum (bool): If set to True, the checksums and sizes of the files
+            are added to the assets
+        cog_cache (CogCache): A cache for the COGs, shared with the worker processes
+        cube (str): A directory for time series cubes (Zarr), a cube per region
+        executor (Executor): An existing pool of worker processes, e.g. to share
+            it between consecutive timestamps
+        callback (Callable): A function that is called with the region and the
+            result as soon as a region is done
+
+    Returns:
+        TimestampResult: The results of all regions, in the order of the given files
+    """
+    if len(hrefs) == 0:
+        raise ValueError("No files given")
+    infos = {aoi: parse_filename(href) for aoi, href in hrefs.items()}
+    ids = sorted({info.id for info in infos.values()})
+    if len(ids) > 1:
+        raise ValueError(
+            f"The files are not of the same product and timestamp: {', '.join(ids)}"
         )
-        item.add_asset(constants.ASSET_GRIB2_KEY, asset)
+    basics = next(iter(infos.values()))
+
+    create = partial(
+        create_item_result,
+        grid_cache=grid_cache,
+        nocog=nocog,
+        nogrib=nogrib,
+        epsg=epsg,
+        nostats=nostats,
+        resampling=resampling,
+        compression=compression,
+        encoding=encoding,
+        checksum=checksum,
+        cog_cache=cog_cache,
+        cube=cube,
+    )
 
-    return item
+    # The largest regions take the longest, so they are started first
+    aois = sorted(hrefs, key=lambda aoi: -bbox_area(constants.EXTENTS[aoi]))
+
+    start = time.perf_counter()
+    results: Dict[constants.AOI, ItemResult] = {}
+    with ExitStack() as stack:
+        if executor is None and processes != 1:
+            workers = processes if processes > 0 else len(hrefs)
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+
+        completed: Iterator[Tuple[constants.AOI, ItemResult]]
+        if executor is None:
+            completed = ((aoi, create(hrefs[aoi], aoi)) for aoi in aois)
+        else:
+            futures: Dict[Future[ItemResult], constants.AOI] = {
+                executor.submit(create, hrefs[aoi], aoi): aoi for aoi in aois
+            }
+            completed = ((futures[f], f.result()) for f in as_completed(futures))
+
+        for aoi, result in completed:
+            result = add_collection(result, collection)
+            for event in result.events:
+                instrumentation.emit(event)
+            results[aoi] = result
+            if callback is not None:
+                callback(aoi, result)
+
+    duration = time.perf_counter() - start
+    instrumentation.record(
+        "timestamp", duration, period=basics.period, pass_no=basics.pass_no
+    )
+    return TimestampResult(
+        id=basics.id,
+        datetime=basics.datetime,
+        results={aoi: results[aoi] for aoi in hrefs},
+        duration=duration,
+    )
+
+
+def create_item_result(
+    href: str, aoi: Optional[constants.AOI] = None, **kwargs: Any
+) -> ItemResult:
+    """Create a STAC Item and capture any error instead of raising it.
+
+    See :func:`create_item` for the parameters, except for the collection.
+
+    The measurements of the stages are returned in the result instead of
+    being passed to the sink, so that they can be sent back from worker
+    processes.
+
+    Returns:
+        ItemResult: The created Item or the error, the time it took and the
+        measurements of the stages
+    """
+    start = time.perf_counter()
+    with instrumentation.collect() as events:
+        try:
+            if aoi is None:
+                aoi = grib2.detect_aoi(href)
+            with instrumentation.stage("create_item", aoi=aoi.value, href=href):
+                item = create_item(href, aoi, **kwargs)
+            return ItemResult(
+                href, item=item, duration=time.perf_counter() - start, events=events
+            )
+        except Exception as e:
+            logger.exception(f"Failed to create item for {href}")
+            error = f"{type(e).__name__}: {e}"
+            return ItemResult(
+                href, error=error, duration=time.perf_counter() - start, events=events
+            )
+
+
+def add_collection(result: ItemResult, collection: Optional[Collection]) -> ItemResult:
+    if result.item is not None and collection is not None:
+        result.item.set_collection(collection)
+    return result
+
+
+def find_files(source: str) -> List[str]:
+    """Find the MRMS QPE files for batch processing.
+
+    Args:
+        source (str): Either a directory that is searched recursively for
+            files that match the MRMS QPE file name pattern, a manifest file
+            that lists one HREF per line, or a glob pattern.
+
+    Returns:
+        List[str]: The HREFs of the files found
+    """
+    if os.path.isdir(source):
+        files = []
+        for root, _, filenames in os.walk(source):
+            for filename in filenames:
+                if constants.FILENAME_PATTERN.match(filename):
+                    files.append(os.path.join(root, filename))
+        return sorted(files)
+    elif os.path.isfile(source) and not constants.FILENAME_PATTERN.match(
+        os.path.basename(source)
+    ):
+        with open(source) as f:
+            lines = [line.strip() for line in f]
+        return [line for line in lines if len(line) > 0 and not line.startswith("#")]
+    else:
+        return sorted(glob.glob(source, recursive=True))
 
 
 def parse_filename(path: str) -> FileInfo:
@@ -375,9 +786,5 @@ def bbox_to_polygon(b: List[float]) -> Dict[str, Any]:
     }
 
 
-def create_band() -> Dict[str, Any]:
-    band: Dict[str, Any] = {}
-    band["spatial_resolution"] = constants.RESOLUTION_M
-    band["unit"] = constants.UNIT
-    band["data_type"] = DataType.FLOAT64
-    return band
+def bbox_area(b: List[float]) -> float:
+    return (b[2] - b[0]) * (b[3] - b[1])
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import datetime, timezone
+from types import TracebackType
+from typing import Any, Dict, Optional, Tuple, Type
+
+
+class StateStore:
+    """Class to remember which files have already been processed.
+
+    The state is stored in a SQLite database. A file is identified by its
+    absolute path and the options it was processed with. It's considered
+    unchanged if its size and its modification time (or, if enabled, its
+    SHA-256 hash) are the same as when it was processed.
+
+    A hash that has been computed to check a file is reused when the file is
+    recorded, so that each file is only read once.
+    """
+
+    def __init__(self, path: str, use_hash: bool = False) -> None:
+        self.path = path
+        self.use_hash = use_hash
+        # The hashes computed by is_processed, by path, with size and mtime
+        self.hashes: Dict[str, Tuple[int, float, str]] = {}
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS processed ("
+                "path TEXT NOT NULL, "
+                "options TEXT NOT NULL, "
+                "size INTEGER NOT NULL, "
+                "mtime REAL NOT NULL, "
+                "hash TEXT, "
+                "item_id TEXT, "
+                "processed_at TEXT NOT NULL, "
+                "PRIMARY KEY (path, options))"
+            )
+
+    def is_processed(self, href: str, options: Dict[str, Any]) -> bool:
+        """Checks whether a file has been processed with the given options
+        and hasn't changed since then.
+
+        Args:
+            href (str): The path of the file
+            options (dict): The options the file is processed with
+
+        Returns:
+            bool: True if the file can be skipped, False otherwise (also if
+            the file can't be read, so that the error is reported when it's
+            processed)
+        """
+        path = os.path.abspath(href)
+        row = self.connection.execute(
+            "SELECT size, mtime, hash FROM processed WHERE path = ? AND options = ?",
+            (path, self.serialize(options)),
+        ).fetchone()
+        if row is None:
+            return False
+
+        try:
+            stat = os.stat(href)
+            if row[0] != stat.st_size:
+                return False
+            if self.use_hash:
+                hash = file_hash(href)
+                self.hashes[path] = (stat.st_size, stat.st_mtime, hash)
+                return bool(row[2] == hash)
+        except OSError:
+            return False
+        return bool(row[1] == stat.st_mtime)
+
+    def record(
+        self, href: str, options: Dict[str, Any], item_id: Optional[str] = None
+    ) -> None:
+        """Records that a file has been processed with the given options.
+
+        Args:
+            href (str): The path of the file
+            options (dict): The options the file was processed with
+            item_id (str): The ID of the created Item
+        """
+        path = os.path.abspath(href)
+        stat = os.stat(href)
+        hash = None
+        if self.use_hash:
+            known = self.hashes.pop(path, None)
+            if known is not None and known[0:2] == (stat.st_size, stat.st_mtime):
+                hash = known[2]
+            else:
+                hash = file_hash(href)
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO processed VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    path,
+                    self.serialize(options),
+                    stat.st_size,
+                    stat.st_mtime,
+                    hash,
+                    item_id,
+                    datetime.now(tz=timezone.utc).isoformat(),
+                ),
+            )
+
+    def serialize(self, options: Dict[str, Any]) -> str:
+        return json.dumps(options, sort_keys=True, default=str)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> "StateStore":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_val: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+
+def file_hash(href: str) -> str:
+    """Computes the SHA-256 hash of a file."""
+    sha256 = hashlib.sha256()
+    with open(href, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
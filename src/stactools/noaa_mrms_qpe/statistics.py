@@ -0,0 +1,93 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+import numpy as np
+from rasterio.io import DatasetReader
+
+from . import constants, instrumentation
+from .cog import source_size, strips
+
+
+@dataclass
+class Statistics:
+    """Class to accumulate the statistics of a raster band block by block.
+
+    Negative values and the given nodata values are not considered to be
+    valid data. For the given nodata values, it's tracked whether they occur
+    in the band.
+    """
+
+    nodata: List[float]
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+    found: Set[float] = field(default_factory=set)
+
+    def update(self, data: Any) -> None:
+        """Updates the statistics with a block of data (numpy array)."""
+        valid = data >= 0
+        for value in self.nodata:
+            # e.g. the nodata value of unsigned integer encodings
+            if value >= 0:
+                valid &= data != value
+        if valid.any():
+            if np.issubdtype(data.dtype, np.integer):
+                info = np.iinfo(data.dtype)
+                highest, lowest = float(info.max), float(info.min)
+            else:
+                highest, lowest = np.inf, -np.inf
+            minimum = float(np.min(data, where=valid, initial=highest))
+            maximum = float(np.max(data, where=valid, initial=lowest))
+            if self.minimum is None or minimum < self.minimum:
+                self.minimum = minimum
+            if self.maximum is None or maximum > self.maximum:
+                self.maximum = maximum
+
+        if not valid.all():
+            invalid = data[~valid]
+            for value in self.nodata:
+                if value not in self.found and np.any(invalid == value):
+                    self.found.add(value)
+
+    def has(self, value: float) -> bool:
+        """Returns whether the given nodata value occurs in the band."""
+        return value in self.found
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "nodata": self.nodata,
+            "minimum": self.minimum,
+            "maximum": self.maximum,
+            "found": sorted(self.found),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Statistics":
+        return cls(
+            nodata=data["nodata"],
+            minimum=data["minimum"],
+            maximum=data["maximum"],
+            found=set(data["found"]),
+        )
+
+
+def compute(dataset: DatasetReader, nodata: List[float]) -> Statistics:
+    """Computes the statistics of the first band of a dataset in a single pass.
+
+    The band is read in strips so that the memory usage is bounded by the
+    block size instead of the size of the grid.
+
+    Args:
+        dataset (DatasetReader): The opened dataset
+        nodata (List[float]): The nodata values to look for
+
+    Returns:
+        Statistics: The statistics of the band
+    """
+    stats = Statistics(nodata)
+    with instrumentation.stage("statistics") as event:
+        event.bytes_read = source_size(dataset)
+        for window in strips(dataset.width, dataset.height, constants.COG_BLOCKSIZE):
+            data = dataset.read(1, window=window)
+            stats.update(data)
+            event.bytes_decoded += data.nbytes
+    return stats
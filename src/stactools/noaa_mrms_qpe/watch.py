@@ -0,0 +1,340 @@
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+import pystac
+from pystac import Catalog, CatalogType, Collection, Item, Link, MediaType, RelType
+
+from . import constants, instrumentation, stac
+from .cogcache import CogCache
+from .gridcache import GridCache
+from .itemresult import ItemResult
+from .state import StateStore
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Listing:
+    """Class to represent the contents of a directory when it was listed."""
+
+    # The modification time of the directory in nanoseconds
+    mtime: int
+    # The time of the listing
+    listed: float
+    directories: List[str]
+    # The files that match the MRMS QPE file name pattern
+    files: List[str]
+
+
+def list_directory(path: str) -> Listing:
+    """Lists the subdirectories and the MRMS QPE files of a directory."""
+    listed = time.time()
+    mtime = os.stat(path).st_mtime_ns
+    directories = []
+    files = []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                directories.append(entry.path)
+            elif constants.FILENAME_PATTERN.match(entry.name):
+                files.append(entry.path)
+    return Listing(mtime, listed, directories, files)
+
+
+class Watcher:
+    """Class to create STAC Items for files as soon as they arrive in directories.
+
+    The directories are polled for files that match the MRMS QPE file name
+    pattern. A file is considered to be complete once its size and
+    modification time haven't changed between two polls and it hasn't been
+    modified for the settle time, so partially written files are not picked
+    up. The files are converted by a bounded pool of worker processes.
+
+    Polls are incremental: only directories whose modification time changed
+    (i.e. files have been added, removed or renamed) are listed again, and
+    files that have been queued are only checked again if their directory
+    changed. Files that are modified in place after they have been queued
+    are therefore not processed again.
+
+    The Items are stored as ``{id}.json`` next to the target catalog (a
+    Catalog or Collection JSON file, which is created if it doesn't exist)
+    and linked from it. Only the links are kept in memory, not the Items, and
+    the catalog is written once for all Items that have been finished since
+    it was written last, at most every ``catalog_interval`` seconds.
+    The catalog links all Items that have ever been published to it, so it
+    (and the time to write it) grows with every file: for long-running
+    watches, switch to a new target catalog regularly, e.g. one per day.
+    """
+
+    def __init__(
+        self,
+        directories: List[str],
+        aoi: Optional[constants.AOI],
+        catalog_href: str,
+        processes: int = 1,
+        settle: float = 1.0,
+        state: Optional[StateStore] = None,
+        grid_cache: Optional[GridCache] = None,
+        cog_cache: Optional[CogCache] = None,
+        catalog_interval: float = 0.0,
+        **options: Any,
+    ) -> None:
+        """
+        Args:
+            directories (List[str]): The directories to watch (recursively)
+            aoi (AOI): The area of interest of the files, detected per file
+                from its grid definition if None
+            catalog_href (str): The path of the target Catalog or Collection JSON
+            processes (int): The maximum number of files converted at the same time
+            settle (float): The number of seconds a file must not have been
+                modified before it's processed
+            state (StateStore): If given, files that have been processed with
+                the same options before (e.g. before a restart) are skipped
+            grid_cache (GridCache): A cache for the grid geometries
+            cog_cache (CogCache): A cache for the COGs
+            catalog_interval (float): The minimum number of seconds between two
+                writes of the catalog, 0 writes it after each poll with new Items
+            options: The options for :func:`stac.create_item`, e.g. ``epsg``
+        """
+        self.directories = directories
+        self.aoi = aoi
+        self.processes = processes
+        self.settle = settle
+        self.state = state
+        # The options identify the processed files in the state, with the region
+        self.options = dict(options, aoi=aoi.value if aoi is not None else None)
+        self.create = partial(
+            stac.create_item_result,
+            aoi=aoi,
+            grid_cache=grid_cache,
+            cog_cache=cog_cache,
+            **options,
+        )
+
+        self.catalog_href = catalog_href
+        self.catalog_interval = catalog_interval
+        if os.path.exists(catalog_href):
+            catalog = pystac.read_file(catalog_href)
+            if not isinstance(catalog, Catalog):
+                raise ValueError(
+                    f"Target must be a Catalog or Collection: {catalog_href}"
+                )
+            self.catalog = catalog
+        else:
+            self.catalog = Catalog(
+                id="noaa-mrms-qpe",
+                description="NOAA MRMS QPE items",
+                catalog_type=CatalogType.SELF_CONTAINED,
+            )
+            self.catalog.set_self_href(catalog_href)
+            self.catalog.save_object()
+        # The absolute HREFs of the linked Items, to link republished Items once
+        self.item_hrefs = {
+            os.path.abspath(link.get_absolute_href() or "")
+            for link in self.catalog.get_links(RelType.ITEM)
+        }
+        # Whether Items have been linked since the catalog was written
+        self.modified = False
+        self.saved = 0.0
+
+        # The listings of the (sub)directories in the previous poll
+        self.listings: Dict[str, Listing] = {}
+        # size and modification time of the files in the previous poll
+        self.candidates: Dict[str, Tuple[int, float]] = {}
+        # size and modification time of the files that have been queued
+        self.done: Dict[str, Tuple[int, float]] = {}
+        self.queue: Deque[str] = deque()
+        self.running: Set[Future[ItemResult]] = set()
+        self.stopped = False
+
+    def poll(self) -> List[str]:
+        """Scans the directories and queues the files that are complete.
+
+        Returns:
+            List[str]: The files that have been queued
+        """
+        now = time.time()
+        files, listed = self.scan()
+        found = {}
+        for href in files:
+            # Queued files are only checked again if their directory changed
+            if href in self.done and href not in listed:
+                found[href] = self.done[href]
+                continue
+            try:
+                stat = os.stat(href)
+            except FileNotFoundError:
+                continue
+            found[href] = (stat.st_size, stat.st_mtime)
+
+        ready = []
+        for href, signature in sorted(found.items()):
+            if self.done.get(href) == signature:
+                continue
+            stable = self.candidates.get(href) == signature
+            if stable and now - signature[1] >= self.settle:
+                self.done[href] = signature
+                if self.state is None or not self.state.is_processed(
+                    href, self.options
+                ):
+                    ready.append(href)
+
+        self.candidates = found
+        # Forget files that have been removed to bound the memory usage
+        for href in list(self.done):
+            if href not in found:
+                del self.done[href]
+        self.queue.extend(ready)
+        return ready
+
+    def scan(self) -> Tuple[List[str], Set[str]]:
+        """Finds the MRMS QPE files in the directories.
+
+        Directories that haven't been modified since the previous scan are
+        not listed again, only their subdirectories are checked.
+
+        Returns:
+            Tuple[List[str], Set[str]]: All files, and the files of the
+            directories that have been listed in this scan
+        """
+        files: List[str] = []
+        listed: Set[str] = set()
+        listings = {}
+        pending = list(self.directories)
+        while pending:
+            directory = pending.pop()
+            listing = self.listings.get(directory)
+            try:
+                mtime = os.stat(directory).st_mtime_ns
+                # Directories modified within a second before they were listed
+                # are listed again, as their modification time may be coarse
+                if (
+                    listing is None
+                    or listing.mtime != mtime
+                    or listing.listed - mtime / 1e9 < 1.0
+                ):
+                    listing = list_directory(directory)
+                    listed.update(listing.files)
+            except FileNotFoundError:
+                continue
+            listings[directory] = listing
+            pending.extend(listing.directories)
+            files.extend(listing.files)
+        # Removed directories are forgotten
+        self.listings = listings
+        return files, listed
+
+    def step(self, executor: Executor) -> List[ItemResult]:
+        """Publishes the finished files, polls and submits queued files.
+
+        Args:
+            executor (Executor): The pool to convert the files with
+
+        Returns:
+            List[ItemResult]: The results of the files that have been finished
+        """
+        results = self.collect()
+        self.poll()
+        while self.queue and len(self.running) < self.processes:
+            self.running.add(executor.submit(self.create, self.queue.popleft()))
+        return results
+
+    def collect(self, wait: bool = False) -> List[ItemResult]:
+        """Publishes the results of the finished (or, if wait is set, all) files.
+
+        The catalog is written afterwards, if the catalog interval has passed
+        (or if wait is set).
+        """
+        results = []
+        for future in list(self.running):
+            if wait or future.done():
+                self.running.remove(future)
+                results.append(self.publish(future.result()))
+        if wait or time.time() - self.saved >= self.catalog_interval:
+            self.save_catalog()
+        return results
+
+    def save_catalog(self) -> None:
+        """Writes the target catalog if Items have been linked since the last write."""
+        if not self.modified:
+            return
+        with instrumentation.stage("serialize", href=self.catalog_href):
+            self.catalog.save_object()
+        self.modified = False
+        self.saved = time.time()
+
+    def publish(self, result: ItemResult) -> ItemResult:
+        """Stores the Item of a result and links it from the target catalog.
+
+        The catalog itself is written by :meth:`collect`.
+        """
+        for event in result.events:
+            instrumentation.emit(event)
+        if result.item is None:
+            logger.error(f"Failed: {result.href}: {result.error}")
+            return result
+
+        item = result.item
+        if isinstance(self.catalog, Collection):
+            item.set_collection(self.catalog)
+        dest_href = os.path.join(
+            os.path.dirname(os.path.abspath(self.catalog_href)), f"{item.id}.json"
+        )
+        aoi = item.properties[constants.EXT_REGION]
+        with instrumentation.stage("serialize", aoi=aoi, href=result.href):
+            self.link_item(item, dest_href)
+            item.save_object(include_self_link=False)
+        if self.state is not None:
+            self.state.record(result.href, self.options, item.id)
+
+        mtime = self.done.get(result.href, (0, time.time()))[1]
+        latency = time.time() - mtime
+        instrumentation.record("latency", latency, aoi=aoi, href=result.href)
+        logger.info(f"Published {item.id} {latency:.1f} s after the file arrived")
+        return result
+
+    def link_item(self, item: Item, dest_href: str) -> None:
+        """Links an Item and the target catalog in both directions.
+
+        Unlike ``Catalog.add_item`` (and ``Item.set_root``, which caches the
+        Item in the root), the catalog only links to the HREF of the Item, so
+        that the Item doesn't stay in memory.
+        """
+        item.remove_links(RelType.ROOT)
+        item.add_link(Link.root(self.catalog))
+        item.set_parent(self.catalog)
+        item.set_self_href(dest_href)
+        if dest_href not in self.item_hrefs:
+            self.item_hrefs.add(dest_href)
+            self.catalog.add_link(
+                Link(RelType.ITEM, dest_href, MediaType.JSON, item.id)
+            )
+            self.modified = True
+
+    def run(
+        self, interval: float = 1.0, until: Optional[Callable[[], bool]] = None
+    ) -> None:
+        """Watches the directories until :meth:`stop` is called.
+
+        Args:
+            interval (float): The number of seconds between two polls
+            until (Callable): Optionally, a function that is called after each
+                poll and stops watching if it returns True
+        """
+        with ProcessPoolExecutor(max_workers=self.processes) as executor:
+            while not self.stopped:
+                self.step(executor)
+                if until is not None and until():
+                    break
+                time.sleep(interval)
+            self.collect(wait=True)
+
+    def stop(self) -> None:
+        """Stops watching after the current poll, e.g. from a signal handler."""
+        self.stopped = True
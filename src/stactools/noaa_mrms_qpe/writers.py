@@ -0,0 +1,178 @@
+import json
+import os
+import shutil
+import uuid
+from abc import ABC, abstractmethod
+from tempfile import mkdtemp
+from types import TracebackType
+from typing import IO, Dict, Optional, Tuple, Type
+
+from pystac import Item
+
+from . import constants
+
+# The properties that the items are partitioned by in the GeoParquet output
+PARTITIONS: Dict[str, str] = {
+    "region": constants.EXT_REGION,
+    "period": constants.EXT_PERIOD,
+    "pass": constants.EXT_PASS,
+}
+
+FORMATS = ["json", "ndjson", "geoparquet"]
+
+
+class ItemWriter(ABC):
+    """Base class for writing STAC Items in bulk.
+
+    Writers are used as context managers, the output is complete once the
+    writer has been closed.
+    """
+
+    @abstractmethod
+    def write(self, item: Item) -> int:
+        """Writes an Item.
+
+        Args:
+            item (Item): The Item
+
+        Returns:
+            int: The number of bytes written
+        """
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "ItemWriter":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+
+class JsonItemWriter(ItemWriter):
+    """Writes each Item to a JSON file ``{id}.json`` in a directory."""
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+
+    def write(self, item: Item) -> int:
+        dest_href = os.path.join(self.directory, f"{item.id}.json")
+        item.save_object(dest_href=dest_href)
+        return os.path.getsize(dest_href)
+
+
+class NdjsonItemWriter(ItemWriter):
+    """Streams the Items to a newline-delimited JSON file, one Item per line.
+
+    By default, an existing file is replaced. In append mode, the Items are
+    appended to it instead, e.g. if only the new files are processed in
+    each run (see :class:`state.StateStore`).
+    """
+
+    def __init__(self, path: str, append: bool = False) -> None:
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file: IO[str] = open(path, "a" if append else "w")
+
+    def write(self, item: Item) -> int:
+        line = json.dumps(item.to_dict(include_self_link=False)) + "\n"
+        self.file.write(line)
+        return len(line)
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class GeoparquetItemWriter(ItemWriter):
+    """Writes the Items to stac-geoparquet files, partitioned by region, period and pass.
+
+    The files are stored in Hive-style directories, e.g.
+    ``region=CONUS/period=1/pass=2/part-<uuid>.parquet``, so that they can be
+    read as a dataset with pyarrow, DuckDB etc. Each writer adds a new part
+    file to the partitions, so files from previous runs are kept.
+    The Items are streamed to a newline-delimited JSON file per partition
+    first, which is converted to GeoParquet in chunks when the writer is
+    closed. This way, the memory usage doesn't depend on the number of Items
+    and the schema is inferred from all Items of a partition.
+
+    Requires the optional dependency ``stac-geoparquet``, install it with
+    ``pip install stactools-noaa-mrms-qpe[geoparquet]``.
+    """
+
+    def __init__(self, directory: str, chunk_size: int = 8192) -> None:
+        try:
+            import stac_geoparquet.arrow  # noqa: F401
+        except ImportError as e:
+            raise ImportError(
+                "The GeoParquet output requires stac-geoparquet, install it with "
+                "`pip install stactools-noaa-mrms-qpe[geoparquet]`"
+            ) from e
+
+        self.directory = directory
+        self.chunk_size = chunk_size
+        os.makedirs(directory, exist_ok=True)
+        self.tmp_dir = mkdtemp(prefix=".ndjson-", dir=directory)
+        self.files: Dict[Tuple[str, ...], IO[str]] = {}
+
+    def write(self, item: Item) -> int:
+        partition = tuple(
+            f"{key}={item.properties[prop]}" for key, prop in PARTITIONS.items()
+        )
+        file = self.files.get(partition)
+        if file is None:
+            path = os.path.join(self.tmp_dir, "-".join(partition) + ".ndjson")
+            file = self.files[partition] = open(path, "w")
+        line = json.dumps(item.to_dict(include_self_link=False)) + "\n"
+        file.write(line)
+        return len(line)
+
+    def close(self) -> None:
+        from stac_geoparquet.arrow import parse_stac_ndjson_to_parquet
+
+        try:
+            name = f"part-{uuid.uuid4().hex}.parquet"
+            for partition, file in self.files.items():
+                file.close()
+                output_dir = os.path.join(self.directory, *partition)
+                os.makedirs(output_dir, exist_ok=True)
+                parse_stac_ndjson_to_parquet(
+                    file.name,
+                    os.path.join(output_dir, name),
+                    chunk_size=self.chunk_size,
+                )
+        finally:
+            for file in self.files.values():
+                file.close()
+            self.files = {}
+            shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+
+def create_writer(format: str, destination: str, append: bool = False) -> ItemWriter:
+    """Creates a writer for the Items.
+
+    Args:
+        format (str): Either 'json' (a file per Item), 'ndjson' or 'geoparquet'
+        destination (str): A directory for 'json' and 'geoparquet',
+            the path of the file for 'ndjson'
+        append (bool): If set to True, the Items are appended to an existing
+            'ndjson' file instead of replacing it. The other formats never
+            remove the Items of previous runs.
+
+    Returns:
+        ItemWriter: The writer
+    """
+    if format == "json":
+        return JsonItemWriter(destination)
+    elif format == "ndjson":
+        return NdjsonItemWriter(destination, append)
+    elif format == "geoparquet":
+        return GeoparquetItemWriter(destination)
+    else:
+        raise ValueError(f"Format is not supported: {format}")
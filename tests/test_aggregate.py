@@ -0,0 +1,135 @@
+import copy
+import json
+import os.path
+import unittest
+from datetime import datetime, timezone
+from tempfile import TemporaryDirectory
+from typing import Any, Dict, List
+
+from pystac import Catalog, CatalogType, Item
+from pystac.extensions.item_assets import ItemAssetsExtension
+
+from stactools.noaa_mrms_qpe import stac
+from stactools.noaa_mrms_qpe.aggregate import Aggregate, read_items, update_collection
+
+ITEM_FILE = "./tests/data-files/GUAM/MRMS_MultiSensor_QPE_01H_Pass1_00.00_20220601-120000.json"  # noqa: E501
+
+
+def create_items() -> List[Dict[str, Any]]:
+    with open(ITEM_FILE) as f:
+        item = json.load(f)
+
+    items = []
+    for i, (region, period, maximum) in enumerate(
+        [("GUAM", 1, 9.1), ("HAWAII", 24, 52.0), ("GUAM", 1, 3.0)]
+    ):
+        data = copy.deepcopy(item)
+        data["id"] = f"item{i}"
+        data["properties"]["noaa_mrms_qpe:region"] = region
+        data["properties"]["noaa_mrms_qpe:period"] = period
+        data["properties"]["datetime"] = f"2022-06-0{i + 1}T12:00:00Z"
+        for asset in data["assets"].values():
+            asset["raster:bands"][0]["statistics"]["maximum"] = maximum
+        items.append(data)
+    return items
+
+
+class AggregateTest(unittest.TestCase):
+    def test_aggregate(self) -> None:
+        items = create_items()
+        aggregate = Aggregate()
+        for item in items:
+            aggregate.update(item)
+
+        self.assertEqual(aggregate.count, 3)
+        self.assertEqual(aggregate.start, datetime(2022, 6, 1, 12, tzinfo=timezone.utc))
+        self.assertEqual(aggregate.end, datetime(2022, 6, 3, 12, tzinfo=timezone.utc))
+        self.assertEqual(aggregate.regions, {"GUAM", "HAWAII"})
+        self.assertEqual(aggregate.periods, {1, 24})
+        self.assertEqual(aggregate.passes, {1})
+        self.assertEqual(aggregate.statistics["cog"]["maximum"], 52.0)
+        self.assertEqual(aggregate.precipitation(), [0.0, 52.0])
+
+        # Merging the aggregates of parts gives the same result
+        merged = Aggregate()
+        merged.update(items[0])
+        previous = Aggregate()
+        for item in items[1:]:
+            previous.update(item)
+        merged.merge(previous)
+        self.assertEqual(merged, aggregate)
+
+        # Only the number of Items is kept, so they are counted again
+        merged.merge(previous)
+        self.assertEqual(merged.count, 5)
+        self.assertEqual(merged.start, aggregate.start)
+        self.assertEqual(merged.statistics, aggregate.statistics)
+
+        with TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "aggregate.json")
+            aggregate.save(path)
+            self.assertEqual(Aggregate.load(path), aggregate)
+
+    def test_scaled_statistics(self) -> None:
+        item = create_items()[1]
+        band = item["assets"]["cog"]["raster:bands"][0]
+        band.update({"scale": 0.1, "offset": 0})
+        band["statistics"]["maximum"] = 1000
+        aggregate = Aggregate()
+        aggregate.update(item)
+        self.assertEqual(aggregate.precipitation(), [0.0, 100.0])
+
+    def test_read_items(self) -> None:
+        items = create_items()
+        with TemporaryDirectory() as tmp_dir:
+            ndjson = os.path.join(tmp_dir, "items.ndjson")
+            with open(ndjson, "w") as f:
+                for item in items:
+                    f.write(json.dumps(item) + "\n")
+
+            catalog = Catalog("test", "test", catalog_type=CatalogType.SELF_CONTAINED)
+            child = Catalog("child", "child")
+            catalog.add_child(child)
+            catalog.add_item(Item.from_dict(items[0]))
+            for item in items[1:]:
+                child.add_item(Item.from_dict(item))
+            catalog.normalize_and_save(os.path.join(tmp_dir, "catalog"))
+
+            for source in [
+                ndjson,
+                os.path.join(tmp_dir, "catalog"),
+                os.path.join(tmp_dir, "catalog", "catalog.json"),
+            ]:
+                with self.subTest(source=source):
+                    ids = sorted(item["id"] for item in read_items(source))
+                    self.assertEqual(ids, ["item0", "item1", "item2"])
+
+    def test_update_collection(self) -> None:
+        aggregate = Aggregate()
+        for item in create_items():
+            aggregate.update(item)
+
+        collection = stac.create_collection(1, 1)
+        update_collection(collection, aggregate)
+
+        self.assertEqual(
+            collection.extent.temporal.intervals,
+            [[aggregate.start, aggregate.end]],
+        )
+        self.assertEqual(
+            collection.extent.spatial.bboxes,
+            [
+                [-164.0, 9.0, 150.0, 26.0],
+                [140.0, 9.0, 150.0, 18.0],
+                [-164.0, 15.0, -151.0, 26.0],
+            ],
+        )
+        self.assertEqual(
+            collection.summaries.get_list("noaa_mrms_qpe:region"), ["GUAM", "HAWAII"]
+        )
+        self.assertEqual(collection.summaries.get_list("noaa_mrms_qpe:period"), [1, 24])
+        item_assets = ItemAssetsExtension.ext(collection).item_assets
+        self.assertEqual(
+            item_assets["cog"].properties["raster:bands"][0]["statistics"],
+            {"minimum": 0.0, "maximum": 52.0},
+        )
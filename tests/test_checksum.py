@@ -0,0 +1,57 @@
+import gzip
+import hashlib
+import os.path
+import unittest
+from tempfile import TemporaryDirectory
+
+from stactools.noaa_mrms_qpe import cog
+from stactools.noaa_mrms_qpe.checksum import Digest, DigestReader
+
+SRC_FILE = "./tests/data-files/GUAM/MRMS_MultiSensor_QPE_01H_Pass1_00.00_20220601-120000.grib2.gz"  # noqa: E501
+
+
+class ChecksumTest(unittest.TestCase):
+    def test_digest(self) -> None:
+        digest = Digest()
+        self.assertEqual(digest.checksum, "1220" + hashlib.sha256().hexdigest())
+        digest.update(b"abc")
+        digest.update(memoryview(b"def"))
+        self.assertEqual(digest.size, 6)
+        self.assertEqual(
+            digest.checksum, "1220" + hashlib.sha256(b"abcdef").hexdigest()
+        )
+
+        digest = Digest()
+        with open(SRC_FILE, "rb") as f:
+            with gzip.GzipFile(fileobj=DigestReader(f, digest), mode="rb") as g:
+                data = g.read()
+        self.assertGreater(len(data), digest.size)
+        self.assertEqual(digest.size, os.path.getsize(SRC_FILE))
+        self.assertEqual(digest.checksum, Digest.from_file(SRC_FILE).checksum)
+
+    def test_decompress(self) -> None:
+        expected = Digest.from_file(SRC_FILE)
+        with TemporaryDirectory() as tmp_dir:
+            digest = Digest()
+            cog.decompress(SRC_FILE, os.path.join(tmp_dir, "test.grib2"), digest)
+        self.assertEqual(digest.checksum, expected.checksum)
+        self.assertEqual(digest.size, expected.size)
+
+    def test_cogify(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            for resampling in ["average", "max"]:
+                with self.subTest(resampling=resampling):
+                    grib_digest = Digest()
+                    cog_digest = Digest()
+                    cog_file = os.path.join(tmp_dir, f"{resampling}.tif")
+                    with cog.open_dataset(SRC_FILE, grib_digest) as src:
+                        cog.cogify_dataset(
+                            src, cog_file, resampling=resampling, digest=cog_digest
+                        )
+                    self.assertEqual(
+                        grib_digest.checksum, Digest.from_file(SRC_FILE).checksum
+                    )
+                    self.assertEqual(
+                        cog_digest.checksum, Digest.from_file(cog_file).checksum
+                    )
+                    self.assertEqual(cog_digest.size, os.path.getsize(cog_file))
@@ -0,0 +1,242 @@
+import os.path
+import shutil
+import unittest
+from tempfile import TemporaryDirectory
+
+import numpy as np
+import rasterio
+
+from stactools.noaa_mrms_qpe import cog, constants
+
+SRC_FILE = "./tests/data-files/HAWAII/MRMS_MultiSensor_QPE_72H_Pass2_00.00_20220601-230000.grib2"
+
+
+class CogTest(unittest.TestCase):
+    def test_cogify(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            dest_file = os.path.join(tmp_dir, "test.tif")
+            href = cog.cogify(SRC_FILE, dest_file)
+            self.assertEqual(href, dest_file)
+
+            with rasterio.open(SRC_FILE) as src:
+                source = src.read(1)
+                src_transform = src.transform
+
+            with rasterio.open(dest_file) as dataset:
+                self.assertEqual(dataset.count, 1)
+                self.assertEqual(dataset.nodata, constants.COG_NODATA)
+                self.assertEqual(dataset.dtypes[0], "float64")
+                self.assertEqual(dataset.transform, src_transform)
+                self.assertEqual(
+                    dataset.block_shapes[0],
+                    (constants.COG_BLOCKSIZE, constants.COG_BLOCKSIZE),
+                )
+                self.assertEqual(dataset.compression.value, constants.COG_COMPRESS)
+                data = dataset.read(1)
+
+        np.testing.assert_array_equal(data, np.maximum(source, constants.COG_NODATA))
+
+    def test_cogify_clamps_nodata(self) -> None:
+        src_file = "./tests/data-files/CARIB/MRMS_MultiSensor_QPE_24H_Pass2_00.00_20220602-030000.grib2.gz"  # noqa: E501
+        with TemporaryDirectory() as tmp_dir:
+            grib_file = cog.decompress(src_file, os.path.join(tmp_dir, "test.grib2"))
+            dest_file = cog.cogify(grib_file, os.path.join(tmp_dir, "test.tif"))
+
+            with rasterio.open(dest_file) as dataset:
+                data = dataset.read(1)
+
+        self.assertEqual(data.min(), constants.COG_NODATA)
+        self.assertTrue(np.any(data == constants.COG_NODATA))
+
+    def test_cogify_reproject(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            dest_file = os.path.join(tmp_dir, "test.tif")
+            cog.cogify(SRC_FILE, dest_file, "epsg:3857")
+
+            with rasterio.open(dest_file) as dataset:
+                self.assertEqual(dataset.crs.to_epsg(), 3857)
+                self.assertEqual(dataset.nodata, constants.COG_NODATA)
+                data = dataset.read(1)
+
+        self.assertGreaterEqual(data.min(), constants.COG_NODATA)
+        self.assertGreater(data.max(), 0)
+
+    def test_convert(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            src_file = os.path.join(tmp_dir, os.path.basename(SRC_FILE))
+            shutil.copyfile(SRC_FILE, src_file)
+
+            href = cog.convert(src_file, reproject_to="epsg:3857")
+
+            self.assertEqual(os.path.splitext(src_file)[0] + ".tif", href)
+            self.assertEqual(
+                sorted(os.listdir(tmp_dir)),
+                sorted([os.path.basename(src_file), os.path.basename(href)]),
+            )
+
+    def test_open_dataset_gzip(self) -> None:
+        src_file = "./tests/data-files/GUAM/MRMS_MultiSensor_QPE_01H_Pass1_00.00_20220601-120000.grib2.gz"  # noqa: E501
+        with TemporaryDirectory() as tmp_dir:
+            gz_file = os.path.join(tmp_dir, os.path.basename(src_file))
+            shutil.copyfile(src_file, gz_file)
+
+            with cog.open_dataset(gz_file) as dataset:
+                self.assertEqual(dataset.driver, "GRIB")
+                self.assertEqual(dataset.shape, (1800, 2000))
+
+            href = cog.convert(gz_file)
+
+            self.assertEqual(
+                href,
+                os.path.join(
+                    tmp_dir, "MRMS_MultiSensor_QPE_01H_Pass1_00.00_20220601-120000.tif"
+                ),
+            )
+            self.assertEqual(
+                sorted(os.listdir(tmp_dir)),
+                sorted([os.path.basename(gz_file), os.path.basename(href)]),
+            )
+
+    def test_cogify_dataset_callback(self) -> None:
+        blocks = []
+        with TemporaryDirectory() as tmp_dir:
+            dest_file = os.path.join(tmp_dir, "test.tif")
+            with rasterio.open(SRC_FILE) as src:
+                cog.cogify_dataset(
+                    src, dest_file, callback=lambda d, c: blocks.append((d, c))
+                )
+                height = src.height
+
+        self.assertEqual(sum(data.shape[0] for data, _ in blocks), height)
+        for data, clamped in blocks:
+            np.testing.assert_array_equal(
+                clamped, np.maximum(data, constants.COG_NODATA)
+            )
+
+    def test_cogify_overviews(self) -> None:
+        for resampling in constants.COG_RESAMPLING_METHODS:
+            with self.subTest(resampling=resampling):
+                with TemporaryDirectory() as tmp_dir:
+                    dest_file = os.path.join(tmp_dir, "test.tif")
+                    cog.cogify(SRC_FILE, dest_file, resampling=resampling)
+
+                    with rasterio.open(dest_file) as dataset:
+                        layout = dataset.tags(ns="IMAGE_STRUCTURE")["LAYOUT"]
+                        self.assertEqual(layout, "COG")
+                        self.assertEqual(dataset.overviews(1), [2, 4, 8, 16])
+                        self.assertEqual(dataset.nodata, constants.COG_NODATA)
+                        full = dataset.read(1)
+                        overview = dataset.read(
+                            1, out_shape=(dataset.height // 2, dataset.width // 2)
+                        )
+
+                if resampling == "max":
+                    # The maximum is retained, nodata only if all pixels are nodata
+                    self.assertEqual(overview.max(), full.max())
+                    expected = full[0::2, 0::2]
+                    for y, x in [(0, 1), (1, 0), (1, 1)]:
+                        expected = np.maximum(expected, full[y::2, x::2])
+                    np.testing.assert_array_equal(overview, expected)
+
+    def test_cogify_unsupported_resampling(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            with self.assertRaises(ValueError):
+                cog.cogify(SRC_FILE, os.path.join(tmp_dir, "test.tif"), resampling="x")
+
+    def test_cogify_compression(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            dest_file = os.path.join(tmp_dir, "test.tif")
+            cog.cogify(SRC_FILE, dest_file, compression="fast-write")
+
+            with rasterio.open(dest_file) as dataset:
+                self.assertEqual(dataset.compression.value, "ZSTD")
+                data = dataset.read(1)
+
+            with rasterio.open(SRC_FILE) as src:
+                source = src.read(1)
+
+        np.testing.assert_array_equal(data, np.maximum(source, constants.COG_NODATA))
+
+        with TemporaryDirectory() as tmp_dir:
+            with self.assertRaises(ValueError):
+                cog.cogify(SRC_FILE, os.path.join(tmp_dir, "test.tif"), compression="x")
+
+    def test_cogify_encoding(self) -> None:
+        with rasterio.open(SRC_FILE) as src:
+            source = np.maximum(src.read(1), constants.COG_NODATA)
+
+        for encoding, options in constants.COG_ENCODINGS.items():
+            with self.subTest(encoding=encoding):
+                with TemporaryDirectory() as tmp_dir:
+                    dest_file = os.path.join(tmp_dir, "test.tif")
+                    cog.cogify(SRC_FILE, dest_file, encoding=encoding, resampling="max")
+
+                    with rasterio.open(dest_file) as dataset:
+                        self.assertEqual(dataset.dtypes[0], options["dtype"])
+                        self.assertEqual(dataset.nodata, options["nodata"])
+                        data = dataset.read(1)
+                        overview = dataset.read(
+                            1, out_shape=(dataset.height // 2, dataset.width // 2)
+                        )
+
+                values = np.where(
+                    data == options["nodata"],
+                    constants.COG_NODATA,
+                    data * options["scale"] + options["offset"],
+                )
+                np.testing.assert_allclose(values, source, atol=0.05)
+                # nodata is ignored for the maximum
+                self.assertEqual(
+                    overview[overview != options["nodata"]].max(),
+                    data[data != options["nodata"]].max(),
+                )
+
+        with TemporaryDirectory() as tmp_dir:
+            with self.assertRaises(ValueError):
+                cog.cogify(SRC_FILE, os.path.join(tmp_dir, "test.tif"), encoding="x")
+
+    def test_encode_nan(self) -> None:
+        data = np.array([[np.nan, -3.0, 0.0, 1.26]])
+        for encoding, options in constants.COG_ENCODINGS.items():
+            with self.subTest(encoding=encoding):
+                encoded = cog.encode(data, encoding)
+                self.assertEqual(encoded.dtype, np.dtype(options["dtype"]))
+                self.assertEqual(encoded[0, 0], options["nodata"])
+                self.assertEqual(encoded[0, 1], options["nodata"])
+                self.assertAlmostEqual(
+                    encoded[0, 3] * options["scale"] + options["offset"], 1.26, 1
+                )
+
+    def test_cogify_sparse(self) -> None:
+        src_file = "./tests/data-files/CARIB/MRMS_MultiSensor_QPE_24H_Pass2_00.00_20220602-030000.grib2.gz"  # noqa: E501
+        size = constants.COG_BLOCKSIZE
+        for resampling in ["average", "max"]:
+            with self.subTest(resampling=resampling):
+                with TemporaryDirectory() as tmp_dir:
+                    dest_file = os.path.join(tmp_dir, "test.tif")
+                    cog.cogify(src_file, dest_file, resampling=resampling)
+
+                    with rasterio.open(dest_file) as dataset:
+                        tiles = cog.empty_tiles(dataset)
+                        assert tiles is not None
+                        data = dataset.read(1)
+                        offsets = {
+                            (row, column): dataset.get_tag_item(
+                                f"BLOCK_OFFSET_{column}_{row}", "TIFF", bidx=1
+                            )
+                            for row in range(tiles.shape[0])
+                            for column in range(tiles.shape[1])
+                        }
+
+                self.assertEqual(tiles.shape, (6, 12))
+                self.assertTrue(tiles.any())
+                for (row, column), offset in offsets.items():
+                    rows = slice(row * size, (row + 1) * size)
+                    columns = slice(column * size, (column + 1) * size)
+                    empty = bool(np.all(data[rows, columns] == constants.COG_NODATA))
+                    self.assertEqual(tiles[row, column], empty)
+                    # Empty tiles are not stored
+                    self.assertEqual(offset is None, empty)
+
+        with rasterio.open(SRC_FILE) as dataset:
+            self.assertIsNone(cog.empty_tiles(dataset))
@@ -0,0 +1,109 @@
+import os.path
+import shutil
+import time
+import unittest
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from stactools.noaa_mrms_qpe import cog, stac
+from stactools.noaa_mrms_qpe.checksum import Digest
+from stactools.noaa_mrms_qpe.cogcache import CogCache
+
+SRC_FILE = "./tests/data-files/GUAM/MRMS_MultiSensor_QPE_01H_Pass1_00.00_20220601-120000.grib2.gz"  # noqa: E501
+
+
+class CogCacheTest(unittest.TestCase):
+    def test_key(self) -> None:
+        key = CogCache.key("1220abc")
+        self.assertEqual(len(key), 64)
+        self.assertEqual(key, CogCache.key("1220abc"))
+        self.assertNotEqual(key, CogCache.key("1220abd"))
+        self.assertNotEqual(key, CogCache.key("1220abc", "epsg:3857"))
+        self.assertNotEqual(key, CogCache.key("1220abc", resampling="max"))
+        self.assertNotEqual(key, CogCache.key("1220abc", compression="fast-write"))
+        self.assertNotEqual(key, CogCache.key("1220abc", encoding="int16"))
+
+    def test_get_put(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            cache = CogCache(os.path.join(tmp_dir, "cache"))
+            src = os.path.join(tmp_dir, "src.tif")
+            dst = os.path.join(tmp_dir, "dst.tif")
+            with open(src, "wb") as f:
+                f.write(b"cog")
+
+            self.assertIsNone(cache.get("ab12", dst))
+            self.assertFalse(os.path.exists(dst))
+
+            cache.put("ab12", src, {"size": 3})
+            self.assertEqual(cache.get("ab12", dst), {"size": 3})
+            with open(dst, "rb") as f:
+                self.assertEqual(f.read(), b"cog")
+            self.assertEqual(cache.stats(), {"hits": 1, "misses": 1, "evictions": 0})
+
+            # A COG that lacks required metadata is a miss and isn't copied
+            os.remove(dst)
+            self.assertIsNone(cache.get("ab12", dst, ["cog_statistics"]))
+            self.assertFalse(os.path.exists(dst))
+            self.assertEqual(cache.stats(), {"hits": 1, "misses": 2, "evictions": 0})
+
+            # A COG without metadata (e.g. an interrupted put) is not used
+            os.remove(cache.paths("ab12")[1])
+            self.assertIsNone(cache.get("ab12", dst))
+
+    def test_evict(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            cache = CogCache(os.path.join(tmp_dir, "cache"), max_size=2500)
+            src = os.path.join(tmp_dir, "src.tif")
+            with open(src, "wb") as f:
+                f.write(b"0" * 1000)
+
+            now = time.time()
+            for i, key in enumerate(["aa", "bb"]):
+                cache.put(key, src, {})
+                for path in cache.paths(key):
+                    os.utime(path, (now - 100 + i, now - 100 + i))
+            # Using 'aa' makes 'bb' the least recently used COG
+            self.assertIsNotNone(cache.get("aa", os.path.join(tmp_dir, "a.tif")))
+
+            cache.put("cc", src, {})
+            self.assertEqual(cache.evictions, 1)
+            self.assertFalse(os.path.exists(cache.paths("bb")[0]))
+            self.assertTrue(os.path.exists(cache.paths("aa")[0]))
+            self.assertTrue(os.path.exists(cache.paths("cc")[0]))
+            self.assertEqual(cache.size, sum(size for _, size, _ in cache.entries()))
+            self.assertLessEqual(cache.size or 0, 2500)
+
+    def test_create_item(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            cache = CogCache(os.path.join(tmp_dir, "cache"))
+            src_file = shutil.copy(SRC_FILE, tmp_dir)
+            # The key is computed from the checksum of the file while it's decompressed
+            with mock.patch.object(
+                Digest, "from_file", side_effect=AssertionError("read twice")
+            ):
+                item = stac.create_item(src_file, checksum=True, cog_cache=cache)
+            cog_file = cog.cog_path(src_file)
+            self.assertEqual(cache.stats()["misses"], 1)
+            os.remove(cog_file)
+
+            # The cached COG is reused without decoding the GRIB2 file again
+            with mock.patch.object(
+                cog, "write_cog", side_effect=AssertionError("decoded")
+            ):
+                cached = stac.create_item(src_file, checksum=True, cog_cache=cache)
+            self.assertEqual(cache.stats()["hits"], 1)
+            self.assertTrue(os.path.exists(cog_file))
+            self.assertEqual(cached.to_dict(), item.to_dict())
+            self.assertEqual(
+                cached.assets["cog"].extra_fields["file:checksum"],
+                Digest.from_file(cog_file).checksum,
+            )
+
+            # Other options require a new COG
+            stac.create_item(src_file, encoding="int16", cog_cache=cache)
+            self.assertEqual(cache.stats()["misses"], 2)
+
+            # COGs cached without statistics are misses if the statistics are needed
+            stac.create_item(src_file, encoding="uint16", nostats=True, cog_cache=cache)
+            stac.create_item(src_file, encoding="uint16", cog_cache=cache)
+            self.assertEqual(cache.stats(), {"hits": 1, "misses": 4, "evictions": 0})
@@ -93,3 +93,127 @@ class CommandsTest(CliTestCase):
                 ],
             )
             self.assertEqual(diff, {})
+
+    def test_create_items(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            src_folder = "./tests/data-files/ALASKA"
+            data_dir = os.path.join(tmp_dir, "data")
+            dest_dir = os.path.join(tmp_dir, "items")
+            shutil.copytree(src_folder, data_dir)
+
+            state = os.path.join(tmp_dir, "state.sqlite")
+
+            cmd = (
+                f"noaa-mrms-qpe create-items {data_dir} {dest_dir} --aoi ALASKA "
+                f"--nocog TRUE --processes 2 --state {state}"
+            )
+            result = self.run_command(cmd)
+            self.assertEqual(result.exit_code, 0, msg="\n{}".format(result.output))
+            self.assertIn("Processed 2 files (0 failed, 0 skipped)", result.output)
+
+            result = self.run_command(cmd)
+            self.assertEqual(result.exit_code, 0, msg="\n{}".format(result.output))
+            self.assertIn("Processed 2 files (0 failed, 2 skipped)", result.output)
+
+            # The region is part of the state
+            result = self.run_command(cmd.replace(" --aoi ALASKA", ""))
+            self.assertEqual(result.exit_code, 0, msg="\n{}".format(result.output))
+            self.assertIn("Processed 2 files (0 failed, 0 skipped)", result.output)
+
+            jsons = sorted(os.listdir(dest_dir))
+            self.assertEqual(
+                jsons,
+                [
+                    "ALASKA_MRMS_MultiSensor_QPE_01H_Pass1_00.00_20221024-015800.json",
+                    "ALASKA_MRMS_MultiSensor_QPE_12H_Pass2_00.00_20220602-000000.json",
+                ],
+            )
+
+    def test_create_items_ndjson_state(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            data_dir = os.path.join(tmp_dir, "data")
+            shutil.copytree("./tests/data-files/ALASKA", data_dir)
+            dest_file = os.path.join(tmp_dir, "items.ndjson")
+            state = os.path.join(tmp_dir, "state.sqlite")
+
+            cmd = (
+                f"noaa-mrms-qpe create-items {data_dir} {dest_file} --aoi ALASKA "
+                f"--nocog TRUE --nostats TRUE --format ndjson --state {state}"
+            )
+            result = self.run_command(cmd)
+            self.assertEqual(result.exit_code, 0, msg="\n{}".format(result.output))
+
+            # A re-run skips all files and keeps the items of the first run
+            result = self.run_command(cmd)
+            self.assertEqual(result.exit_code, 0, msg="\n{}".format(result.output))
+            self.assertIn("Processed 2 files (0 failed, 2 skipped)", result.output)
+            with open(dest_file) as f:
+                self.assertEqual(len(f.readlines()), 2)
+
+    def test_create_timestamp(self) -> None:
+        filename = "MRMS_MultiSensor_QPE_01H_Pass1_00.00_20220601-120000.grib2.gz"
+        with TemporaryDirectory() as tmp_dir:
+            dest_file = os.path.join(tmp_dir, "items.ndjson")
+            sources = []
+            for aoi in ["GUAM", "HAWAII"]:
+                os.mkdir(os.path.join(tmp_dir, aoi))
+                href = os.path.join(tmp_dir, aoi, filename)
+                shutil.copyfile(f"./tests/data-files/GUAM/{filename}", href)
+                sources.append(f"--source {aoi} {href}")
+
+            cmd = (
+                f"noaa-mrms-qpe create-timestamp {dest_file} {' '.join(sources)} "
+                "--nocog TRUE --format ndjson"
+            )
+            result = self.run_command(cmd)
+            self.assertEqual(result.exit_code, 0, msg="\n{}".format(result.output))
+            self.assertIn("for 2 regions (0 failed)", result.output)
+
+            with open(dest_file) as f:
+                ids = sorted(json.loads(line)["id"] for line in f)
+            self.assertEqual(
+                ids, [f"{aoi}_{filename[:-9]}" for aoi in ["GUAM", "HAWAII"]]
+            )
+
+    def test_extract(self) -> None:
+        filename = "MRMS_MultiSensor_QPE_01H_Pass1_00.00_20220601-120000.grib2.gz"
+        with TemporaryDirectory() as tmp_dir:
+            shutil.copy(f"./tests/data-files/GUAM/{filename}", tmp_dir)
+            items_file = os.path.join(tmp_dir, "items.ndjson")
+            cmd = (
+                f"noaa-mrms-qpe create-items {tmp_dir} {items_file} "
+                "--nostats TRUE --format ndjson"
+            )
+            result = self.run_command(cmd)
+            self.assertEqual(result.exit_code, 0, msg="\n{}".format(result.output))
+
+            geometries_file = os.path.join(tmp_dir, "gauges.geojson")
+            with open(geometries_file, "w") as f:
+                json.dump(
+                    {
+                        "type": "FeatureCollection",
+                        "features": [
+                            {
+                                "type": "Feature",
+                                "id": "guam",
+                                "geometry": {
+                                    "type": "Point",
+                                    "coordinates": [144.75, 13.45],
+                                },
+                                "properties": {},
+                            }
+                        ],
+                    },
+                    f,
+                )
+
+            dest_file = os.path.join(tmp_dir, "values.csv")
+            cmd = f"noaa-mrms-qpe extract {items_file} {geometries_file} {dest_file}"
+            result = self.run_command(cmd)
+            self.assertEqual(result.exit_code, 0, msg="\n{}".format(result.output))
+
+            with open(dest_file) as f:
+                lines = f.read().splitlines()
+            self.assertEqual(len(lines), 2)
+            self.assertTrue(lines[0].startswith("geometry,item,datetime"))
+            self.assertTrue(lines[1].startswith(f"guam,GUAM_{filename[:-9]},"))
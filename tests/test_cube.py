@@ -0,0 +1,105 @@
+import importlib.util
+import os.path
+import shutil
+import unittest
+from datetime import datetime, timezone
+from tempfile import TemporaryDirectory
+from typing import TYPE_CHECKING, Any, cast
+
+import numpy as np
+
+from stactools.noaa_mrms_qpe import cog, constants, cube, stac
+
+if TYPE_CHECKING:
+    import zarr
+
+SRC_FILE = "./tests/data-files/GUAM/MRMS_MultiSensor_QPE_01H_Pass1_00.00_20220601-120000.grib2.gz"  # noqa: E501
+ALASKA_FILE = "./tests/data-files/ALASKA/MRMS_MultiSensor_QPE_01H_Pass1_00.00_20221024-015800.grib2.gz"  # noqa: E501
+
+
+def read_array(group: "zarr.Group", name: str) -> Any:
+    """Reads a whole array of a Zarr group into memory."""
+    return np.asarray(cast("zarr.Array[Any]", group[name]))
+
+
+class CubeTest(unittest.TestCase):
+    def test_time_value(self) -> None:
+        self.assertEqual(cube.time_value(constants.CUBE_EPOCH), 0)
+        self.assertEqual(
+            cube.time_value(datetime(2000, 1, 2, 1, tzinfo=timezone.utc)), 25
+        )
+        # Timestamps are snapped to the nearest full hour
+        self.assertEqual(
+            cube.time_value(datetime(2000, 1, 2, 0, 58, tzinfo=timezone.utc)), 25
+        )
+        self.assertEqual(
+            cube.time_value(datetime(2000, 1, 2, 1, 29, 59, tzinfo=timezone.utc)), 25
+        )
+        with self.assertRaises(ValueError):
+            cube.time_value(datetime(1999, 12, 31, 23, tzinfo=timezone.utc))
+
+    @unittest.skipUnless(importlib.util.find_spec("zarr"), "zarr is not installed")
+    def test_create_items(self) -> None:
+        import zarr
+
+        with TemporaryDirectory() as tmp_dir:
+            # Two time steps of the same file, the later one arrives first
+            hrefs = []
+            for time in ["20220601-150000", "20220601-120000"]:
+                name = f"MRMS_MultiSensor_QPE_01H_Pass1_00.00_{time}.grib2.gz"
+                hrefs.append(shutil.copy(SRC_FILE, os.path.join(tmp_dir, name)))
+            cube_dir = os.path.join(tmp_dir, "cubes")
+
+            items = [
+                stac.create_item(href, nocog=True, nostats=True, cube=cube_dir)
+                for href in hrefs
+            ]
+
+            path = os.path.join(cube_dir, "GUAM_01H_Pass1.zarr")
+            for item in items:
+                asset = item.assets[constants.ASSET_CUBE_KEY]
+                self.assertEqual(asset.href, path)
+                self.assertEqual(asset.media_type, constants.CUBE_MEDIATYPE)
+                self.assertIn(constants.XARRAY_EXTENSION, item.stac_extensions)
+
+            group = zarr.open_group(path, mode="r")
+            self.assertEqual(group.attrs[constants.EXT_REGION], "GUAM")
+            data = cast("zarr.Array[Any]", group[constants.CUBE_VARIABLE])
+            # The store starts at the first file, the earlier file is prepended
+            first = cube.time_value(datetime(2022, 6, 1, 12, tzinfo=timezone.utc))
+            self.assertEqual(group.attrs["time_origin"], first)
+            self.assertEqual(data.shape, (4, 1800, 2000))
+            self.assertEqual(data.chunks, constants.CUBE_CHUNKS)
+            np.testing.assert_array_equal(
+                read_array(group, "time"), np.arange(first, first + 4)
+            )
+
+            with cog.open_dataset(SRC_FILE) as dataset:
+                expected = dataset.read(1).astype("float32")
+            expected[expected < 0] = np.nan
+            for index in [0, 3]:
+                np.testing.assert_array_equal(np.asarray(data[index]), expected)
+            # Time steps in between are not written
+            self.assertTrue(np.isnan(np.asarray(data[1])).all())
+            _, _, lon, lat = constants.GRIDS[constants.AOI.GUAM]
+            self.assertAlmostEqual(float(read_array(group, "x")[0]), lon, places=3)
+            self.assertAlmostEqual(float(read_array(group, "y")[0]), lat, places=3)
+
+    @unittest.skipUnless(importlib.util.find_spec("zarr"), "zarr is not installed")
+    def test_create_item_off_the_hour(self) -> None:
+        import zarr
+
+        with TemporaryDirectory() as tmp_dir:
+            cube_dir = os.path.join(tmp_dir, "cubes")
+            href = shutil.copy(ALASKA_FILE, tmp_dir)
+            stac.create_item(href, nocog=True, nostats=True, cube=cube_dir)
+
+            # 01:58 is stored in the time step of 02:00
+            group = zarr.open_group(
+                os.path.join(cube_dir, "ALASKA_01H_Pass1.zarr"), mode="r"
+            )
+            value = cube.time_value(datetime(2022, 10, 24, 2, tzinfo=timezone.utc))
+            data = cast("zarr.Array[Any]", group[constants.CUBE_VARIABLE])
+            self.assertEqual(data.shape, (1, 2200, 5000))
+            self.assertEqual(read_array(group, "time")[0], value)
+            self.assertFalse(np.isnan(np.asarray(data[0])).all())
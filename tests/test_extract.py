@@ -0,0 +1,177 @@
+import os.path
+import shutil
+import unittest
+from tempfile import TemporaryDirectory
+from typing import Any, Dict, List
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin, xy
+from rasterio.warp import transform
+
+from stactools.noaa_mrms_qpe import stac
+from stactools.noaa_mrms_qpe.extract import Extractor, compute_targets
+from stactools.noaa_mrms_qpe.gridcache import Grid
+
+SRC_FILE = "./tests/data-files/GUAM/MRMS_MultiSensor_QPE_01H_Pass1_00.00_20220601-120000.grib2.gz"  # noqa: E501
+
+
+def create_items(tmp_dir: str, **options: Any) -> List[Dict[str, Any]]:
+    os.makedirs(tmp_dir, exist_ok=True)
+    items = []
+    for time in ["20220601-120000", "20220601-130000"]:
+        name = f"MRMS_MultiSensor_QPE_01H_Pass1_00.00_{time}.grib2.gz"
+        href = shutil.copy(SRC_FILE, os.path.join(tmp_dir, name))
+        items.append(stac.create_item(href, **options).to_dict())
+    return items
+
+
+class ExtractTest(unittest.TestCase):
+    def test_compute_targets(self) -> None:
+        grid = Grid(shape=[10, 5], transform=[1.0, 0.0, 0.0, 0.0, -1.0, 5.0])
+        geometries: Dict[str, Dict[str, Any]] = {
+            "point": {"type": "Point", "coordinates": [2.5, 3.5]},
+            "outside": {"type": "Point", "coordinates": [20, 3]},
+            "polygon": {
+                "type": "Polygon",
+                "coordinates": [[[1, 1], [4, 1], [4, 3], [1, 3], [1, 1]]],
+            },
+        }
+        targets = compute_targets(geometries, grid)
+        self.assertEqual([t.id for t in targets], ["point", "polygon"])
+        point, polygon = targets
+        self.assertEqual(
+            (point.window.col_off, point.window.row_off, point.window.width), (2, 1, 1)
+        )
+        self.assertIsNone(point.mask)
+        self.assertEqual((polygon.window.col_off, polygon.window.row_off), (1, 2))
+        mask = polygon.mask
+        assert mask is not None
+        self.assertEqual(mask.shape, (2, 3))
+        self.assertTrue(mask.all())
+
+    def test_extract(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            items = create_items(tmp_dir)
+            cog_href = items[0]["assets"]["cog"]["href"]
+            with rasterio.open(cog_href) as dataset:
+                data = dataset.read(1)
+                transform = dataset.transform
+            row, col = np.unravel_index(np.argmax(data), data.shape)
+            lon, lat = xy(transform, row, col)
+            # A polygon around the wettest cell, 5 x 5 cells
+            left, top = xy(transform, row - 2, col - 2, offset="ul")
+            right, bottom = xy(transform, row + 3, col + 3, offset="ul")
+            geometries = {
+                "gauge": {"type": "Point", "coordinates": [lon, lat]},
+                "basin": {
+                    "type": "Polygon",
+                    "coordinates": [
+                        [
+                            [left, bottom],
+                            [right, bottom],
+                            [right, top],
+                            [left, top],
+                            [left, bottom],
+                        ]
+                    ],
+                },
+                "elsewhere": {"type": "Point", "coordinates": [-100, 40]},
+            }
+
+            extractor = Extractor(geometries, threads=2)
+            rows = list(extractor.extract(items))
+            self.assertEqual(len(extractor.targets), 1)
+            self.assertEqual(
+                [(r["item"], r["geometry"]) for r in rows],
+                [(item["id"], id) for item in items for id in ["gauge", "basin"]],
+            )
+
+            gauge, basin = rows[0:2]
+            self.assertEqual(gauge["count"], 1)
+            self.assertEqual(gauge["mean"], data.max())
+            self.assertEqual(gauge["region"], "GUAM")
+            self.assertEqual(gauge["datetime"], items[0]["properties"]["datetime"])
+
+            cells = data[row - 2 : row + 3, col - 2 : col + 3]  # noqa: E203
+            cells = cells[cells >= 0]
+            self.assertEqual(basin["count"], len(cells))
+            self.assertAlmostEqual(basin["mean"], cells.mean())
+            self.assertEqual(basin["maximum"], data.max())
+
+    def test_extract_scaled(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            items = create_items(
+                os.path.join(tmp_dir, "uint16"), encoding="uint16", nostats=True
+            )
+            expected = create_items(os.path.join(tmp_dir, "float64"), nostats=True)
+            with rasterio.open(expected[0]["assets"]["cog"]["href"]) as dataset:
+                data = dataset.read(1)
+                row, col = np.unravel_index(np.argmax(data), data.shape)
+                lon, lat = xy(dataset.transform, row, col)
+            geometries = {"gauge": {"type": "Point", "coordinates": [lon, lat]}}
+
+            rows = list(Extractor(geometries).extract(items))
+            self.assertEqual(len(rows), 2)
+            for result in rows:
+                self.assertAlmostEqual(result["mean"], data.max(), places=5)
+
+    def test_extract_missing_file(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            items = create_items(tmp_dir, nostats=True)
+            os.remove(items[0]["assets"]["cog"]["href"])
+            geometries = {"gauge": {"type": "Point", "coordinates": [144.75, 13.45]}}
+            with self.assertLogs("stactools.noaa_mrms_qpe.extract", "ERROR"):
+                rows = list(Extractor(geometries).extract(items))
+            self.assertEqual([r["item"] for r in rows], [items[1]["id"]])
+
+    def test_extract_reprojected(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            # The projection metadata of the Item describes the GRIB2 file
+            items = create_items(tmp_dir, epsg=3857, nogrib=True, nostats=True)
+            with rasterio.open(items[0]["assets"]["cog"]["href"]) as dataset:
+                data = dataset.read(1)
+                row, col = np.unravel_index(np.argmax(data), data.shape)
+                x, y = xy(dataset.transform, row, col)
+                lons, lats = transform(dataset.crs, "EPSG:4326", [x], [y])
+            geometries = {"gauge": {"type": "Point", "coordinates": [lons[0], lats[0]]}}
+
+            rows = list(Extractor(geometries).extract(items))
+            self.assertEqual(len(rows), 2)
+            for result in rows:
+                self.assertEqual(result["mean"], data.max())
+
+    def test_extract_unknown_crs(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            href = os.path.join(tmp_dir, "nocrs.tif")
+            with rasterio.open(
+                href,
+                "w",
+                driver="GTiff",
+                width=2,
+                height=2,
+                count=1,
+                dtype="float32",
+                transform=from_origin(144, 14, 1, 1),
+            ) as dataset:
+                dataset.write(np.ones((1, 2, 2), dtype="float32"))
+            item: Dict[str, Any] = {
+                "id": "nocrs",
+                "properties": {"datetime": "2022-06-01T12:00:00Z"},
+                "assets": {
+                    "cog": {
+                        "href": href,
+                        "proj:shape": [2, 2],
+                        "proj:transform": [1.0, 0.0, 144.0, 0.0, -1.0, 14.0],
+                    }
+                },
+            }
+            geometries = {"gauge": {"type": "Point", "coordinates": [144.5, 13.5]}}
+            extractor = Extractor(geometries)
+            with self.assertRaises(ValueError):
+                extractor.extract_item(item)
+
+            # The CRS is taken from the metadata if the file doesn't define it
+            item["properties"]["proj:epsg"] = 4326
+            rows = extractor.extract_item(item)
+            self.assertEqual([(r["geometry"], r["mean"]) for r in rows], [("gauge", 1)])
@@ -0,0 +1,103 @@
+import gzip
+import os.path
+import shutil
+import unittest
+from datetime import datetime, timezone
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from stactools.noaa_mrms_qpe import cog, constants, grib2, stac
+from stactools.noaa_mrms_qpe.gridcache import Grid
+
+
+class Grib2Test(unittest.TestCase):
+    def test_read_grid_definition(self) -> None:
+        grid = grib2.read_grid_definition(
+            "./tests/data-files/CONUS/MRMS_MultiSensor_QPE_01H_Pass2_00.00_20220602-120000.grib2.gz"  # noqa: E501
+        )
+        self.assertEqual((grid.columns, grid.rows), (7000, 3500))
+        self.assertAlmostEqual(grid.lat1, 54.995)
+        self.assertAlmostEqual(grid.lon1, 230.005)
+        self.assertAlmostEqual(grid.di, 0.01)
+        self.assertAlmostEqual(grid.dj, 0.01)
+        self.assertAlmostEqual(grid.origin[0], -129.995)
+
+    def test_read_message(self) -> None:
+        message = grib2.read_message(
+            "./tests/data-files/CARIB/MRMS_MultiSensor_QPE_24H_Pass2_00.00_20220602-030000.grib2.gz"  # noqa: E501
+        )
+        self.assertEqual(message.discipline, 209)
+        self.assertEqual(message.centre, 161)
+        self.assertEqual(message.length, 186040)
+        self.assertEqual(
+            message.reference_time, datetime(2022, 6, 2, 3, tzinfo=timezone.utc)
+        )
+        self.assertEqual((message.grid.columns, message.grid.rows), (3000, 1500))
+        self.assertEqual(message.product.template, 0)
+        self.assertEqual((message.product.category, message.product.number), (6, 41))
+        self.assertEqual((message.product.period, message.product.pass_no), (24, 2))
+        self.assertEqual(message.data.template, 41)
+        self.assertEqual(message.data.count, 3000 * 1500)
+        self.assertEqual(message.data.reference_value, -9990.0)
+        self.assertEqual(message.data.decimal_scale, 1)
+        self.assertEqual(message.data.bits, 16)
+
+        # The header matches the file name and the grid read by GDAL
+        for href in stac.find_files("./tests/data-files"):
+            with self.subTest(href=href):
+                message = grib2.read_message(href)
+                info = stac.parse_filename(href)
+                self.assertEqual(message.reference_time, info.datetime)
+                self.assertEqual(message.product.period, info.period)
+                self.assertEqual(message.product.pass_no, info.pass_no)
+
+                grid = Grid.from_grid_definition(message.grid)
+                with cog.open_dataset(href) as dataset:
+                    expected = Grid.from_dataset(dataset)
+                self.assertEqual(grid.shape, expected.shape)
+                for value, expected_value in zip(grid.transform, expected.transform):
+                    self.assertAlmostEqual(value, expected_value, places=12)
+
+    def test_create_item_metadata_only(self) -> None:
+        src_file = "./tests/data-files/ALASKA/MRMS_MultiSensor_QPE_12H_Pass2_00.00_20220602-000000.grib2.gz"  # noqa: E501
+        with patch.object(cog, "open_dataset", side_effect=AssertionError):
+            item = stac.create_item(src_file, nocog=True, nostats=True)
+        self.assertEqual(item.properties[constants.EXT_REGION], "ALASKA")
+        self.assertEqual(item.assets["grib2"].extra_fields["proj:shape"], [5000, 2200])
+
+    def test_detect_aoi(self) -> None:
+        hrefs = stac.find_files("./tests/data-files")
+        self.assertEqual(len(hrefs), 6)
+        for href in hrefs:
+            with self.subTest(href=href):
+                aoi = grib2.detect_aoi(href)
+                self.assertEqual(aoi.value, os.path.basename(os.path.dirname(href)))
+
+    def test_detect_aoi_invalid(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            invalid = os.path.join(tmp_dir, "invalid.grib2")
+            with open(invalid, "w") as f:
+                f.write("invalid")
+            with self.assertRaises(ValueError):
+                grib2.detect_aoi(invalid)
+
+            # Move the first cell of the Hawaii grid to another latitude
+            src = "./tests/data-files/HAWAII/MRMS_MultiSensor_QPE_72H_Pass2_00.00_20220601-230000.grib2"  # noqa: E501
+            with open(src, "rb") as f:
+                data = bytearray(f.read())
+            offset = grib2.INDICATOR_LENGTH + 21 + 46
+            data[slice(offset, offset + 4)] = (1000000).to_bytes(4, "big")
+            unknown = os.path.join(tmp_dir, "unknown.grib2.gz")
+            with gzip.open(unknown, "wb") as f:
+                f.write(data)
+            with self.assertRaises(ValueError):
+                grib2.detect_aoi(unknown)
+
+    def test_create_items_without_aoi(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            for aoi in ["ALASKA", "GUAM"]:
+                shutil.copytree(f"./tests/data-files/{aoi}", os.path.join(tmp_dir, aoi))
+            results = list(stac.create_items(stac.find_files(tmp_dir), nocog=True))
+
+        regions = [r.item.properties[constants.EXT_REGION] for r in results if r.item]
+        self.assertEqual(regions, ["ALASKA", "ALASKA", "GUAM"])
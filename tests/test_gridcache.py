@@ -0,0 +1,70 @@
+import os.path
+import unittest
+from datetime import datetime, timezone
+from tempfile import TemporaryDirectory
+
+from stactools.noaa_mrms_qpe import constants
+from stactools.noaa_mrms_qpe.fileinfo import FileInfo
+from stactools.noaa_mrms_qpe.gridcache import Grid, GridCache
+
+INFO = FileInfo(
+    id="MRMS_MultiSensor_QPE_01H_Pass1_00.00_20220601-120000",
+    period=1,
+    pass_no=1,
+    datetime=datetime(2022, 6, 1, 12, tzinfo=timezone.utc),
+)
+GUAM_GRID = Grid(
+    shape=[2000, 1800],
+    transform=[0.005, 0.0, 140.0005, 0.0, -0.005, 18.0005],
+)
+
+
+class GridCacheTest(unittest.TestCase):
+    def test_key(self) -> None:
+        self.assertEqual(
+            GridCache.key(constants.AOI.GUAM, INFO), "GUAM/01H_Pass1/native"
+        )
+        self.assertEqual(
+            GridCache.key(constants.AOI.GUAM, INFO, "epsg:3857"),
+            "GUAM/01H_Pass1/epsg:3857",
+        )
+
+    def test_persistence(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "grids.json")
+            key = GridCache.key(constants.AOI.GUAM, INFO)
+
+            cache = GridCache(path)
+            self.assertIsNone(cache.get(key))
+            cache.put(key, GUAM_GRID)
+            self.assertEqual(cache.get(key), GUAM_GRID)
+
+            self.assertEqual(GridCache(path).get(key), GUAM_GRID)
+
+    def test_shared_file(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "grids.json")
+            guam = GridCache.key(constants.AOI.GUAM, INFO)
+            projected = GridCache.key(constants.AOI.GUAM, INFO, "epsg:3857")
+
+            # Two processes with a cache on the same file
+            cache1 = GridCache(path)
+            cache2 = GridCache(path)
+            cache1.put(guam, GUAM_GRID)
+            # Grids saved by the other process are found
+            self.assertEqual(cache2.get(guam), GUAM_GRID)
+            # Saving merges the grids with the file instead of replacing them
+            cache2.put(projected, GUAM_GRID)
+            cache1.put(projected, GUAM_GRID)
+
+            self.assertEqual(
+                GridCache(path).grids, {guam: GUAM_GRID, projected: GUAM_GRID}
+            )
+
+    def test_validation(self) -> None:
+        cache = GridCache()
+        # The GUAM grid doesn't match the extent of HAWAII
+        key = GridCache.key(constants.AOI.HAWAII, INFO)
+        cache.put(key, GUAM_GRID)
+        self.assertIsNone(cache.get(key))
+        self.assertNotIn(key, cache.grids)
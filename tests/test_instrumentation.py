@@ -0,0 +1,132 @@
+import json
+import os.path
+import unittest
+from tempfile import TemporaryDirectory
+
+from stactools.noaa_mrms_qpe import cog, constants, instrumentation, stac
+from stactools.noaa_mrms_qpe.instrumentation import (
+    JsonLinesSink,
+    PrometheusTextfileSink,
+    StageEvent,
+)
+
+SRC_FILE = "./tests/data-files/GUAM/MRMS_MultiSensor_QPE_01H_Pass1_00.00_20220601-120000.grib2.gz"  # noqa: E501
+
+
+class InstrumentationTest(unittest.TestCase):
+    def test_stage(self) -> None:
+        with instrumentation.collect() as events:
+            with instrumentation.labelled(aoi="GUAM"):
+                with instrumentation.stage("cogify", period=1) as event:
+                    event.bytes_written = 10
+            with self.assertRaises(ValueError):
+                with instrumentation.stage("open"):
+                    raise ValueError("test")
+
+        self.assertEqual([e.stage for e in events], ["cogify", "open"])
+        self.assertEqual(events[0].labels, {"aoi": "GUAM", "period": "1"})
+        self.assertEqual(events[0].bytes_written, 10)
+        increase = events[0].peak_rss_increase
+        if increase is not None:
+            self.assertGreaterEqual(increase, 0)
+        self.assertGreaterEqual(events[0].duration, 0)
+        self.assertIsNone(events[0].error)
+        self.assertEqual(events[1].labels, {})
+        self.assertEqual(events[1].error, "ValueError")
+
+    def test_sinks(self) -> None:
+        event = StageEvent(
+            "cogify",
+            duration=1.5,
+            bytes_read=100,
+            bytes_decoded=400,
+            bytes_written=10,
+            peak_rss=1000,
+            peak_rss_increase=200,
+            labels={"aoi": "GUAM", "href": "a.grib2"},
+        )
+        with TemporaryDirectory() as tmp_dir:
+            jsonl = os.path.join(tmp_dir, "metrics.jsonl")
+            sink = instrumentation.create_sink(jsonl)
+            self.assertIsInstance(sink, JsonLinesSink)
+            sink.emit(event)
+            sink.emit(event)
+            # Each line is written right away
+            with open(jsonl) as f:
+                lines = [json.loads(line) for line in f]
+            sink.close()
+            self.assertEqual(len(lines), 2)
+            self.assertEqual(lines[0]["stage"], "cogify")
+            self.assertEqual(lines[0]["labels"]["href"], "a.grib2")
+
+            prom = os.path.join(tmp_dir, "metrics.prom")
+            sink = instrumentation.create_sink(prom)
+            self.assertIsInstance(sink, PrometheusTextfileSink)
+            sink.emit(event)
+            sink.emit(event)
+            with open(prom) as f:
+                text = f.read()
+            labels = '{aoi="GUAM",stage="cogify"}'
+            self.assertIn(f"noaa_mrms_qpe_stage_runs_total{labels} 2", text)
+            self.assertIn(
+                f"noaa_mrms_qpe_stage_duration_seconds_total{labels} 3.0", text
+            )
+            self.assertIn(f"noaa_mrms_qpe_stage_bytes_read_total{labels} 200", text)
+            self.assertIn(f"noaa_mrms_qpe_stage_bytes_decoded_total{labels} 800", text)
+            self.assertIn(f"noaa_mrms_qpe_stage_peak_rss_bytes{labels} 1000", text)
+            self.assertIn(
+                f"noaa_mrms_qpe_stage_peak_rss_increase_bytes{labels} 200", text
+            )
+            self.assertNotIn("href", text)
+            self.assertEqual(
+                sorted(os.listdir(tmp_dir)), ["metrics.jsonl", "metrics.prom"]
+            )
+
+    def test_cogify(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            with instrumentation.collect() as events:
+                with cog.open_dataset(SRC_FILE) as src:
+                    cog.cogify_dataset(src, os.path.join(tmp_dir, "cog.tif"))
+            self.assertEqual(cog.MEMORY_FILE_SIZES, {})
+
+        decompress, _, cogify = events
+        # The GRIB2 file in memory is read, the decoded data is much larger
+        self.assertEqual(cogify.bytes_read, decompress.bytes_written)
+        self.assertEqual(cogify.bytes_decoded, 2000 * 1800 * 8)
+        self.assertGreater(cogify.bytes_written, 0)
+
+    def test_create_items(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            jsonl = os.path.join(tmp_dir, "metrics.jsonl")
+            sink = JsonLinesSink(jsonl)
+            previous = instrumentation.set_sink(sink)
+            try:
+                for processes in [1, 2]:
+                    results = list(
+                        stac.create_items(
+                            [SRC_FILE],
+                            constants.AOI.GUAM,
+                            processes=processes,
+                            nocog=True,
+                        )
+                    )
+                    self.assertTrue(results[0].ok)
+            finally:
+                instrumentation.set_sink(previous)
+                sink.close()
+
+            with open(jsonl) as f:
+                events = [json.loads(line) for line in f]
+
+        stages = [e["stage"] for e in events]
+        self.assertEqual(
+            stages, ["decompress", "open", "statistics", "create_item"] * 2
+        )
+        for event in events:
+            self.assertEqual(event["labels"]["aoi"], "GUAM")
+            self.assertEqual(event["labels"]["href"], SRC_FILE)
+        self.assertEqual(events[0]["bytes_read"], os.path.getsize(SRC_FILE))
+        # The statistics read the decompressed file in memory, not the decoded data
+        self.assertEqual(events[2]["bytes_read"], events[0]["bytes_written"])
+        self.assertGreater(events[2]["bytes_decoded"], events[2]["bytes_read"])
+        self.assertEqual(events[1]["labels"]["period"], "1")
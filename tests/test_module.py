@@ -1,3 +1,5 @@
+import subprocess
+import sys
 import unittest
 
 import stactools.noaa_mrms_qpe
@@ -6,3 +8,32 @@ import stactools.noaa_mrms_qpe
 class TestModule(unittest.TestCase):
     def test_version(self) -> None:
         self.assertIsNotNone(stactools.noaa_mrms_qpe.__version__)
+
+    def test_lazy_imports(self) -> None:
+        code = (
+            "import sys\n"
+            "import stactools.noaa_mrms_qpe.commands\n"
+            "print(','.join(m for m in ['numpy', 'rasterio'] if m in sys.modules))"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code], check=True, capture_output=True, text=True
+        ).stdout
+        self.assertEqual(output.strip(), "")
+
+        from stactools.noaa_mrms_qpe import create_item, stac
+
+        self.assertIs(create_item, stac.create_item)
+        with self.assertRaises(AttributeError):
+            stactools.noaa_mrms_qpe.missing
+
+    def test_lazy_collection(self) -> None:
+        code = (
+            "import sys\n"
+            "from stactools.noaa_mrms_qpe import create_collection\n"
+            "create_collection(1, 1)\n"
+            "print(','.join(m for m in ['numpy', 'rasterio'] if m in sys.modules))"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code], check=True, capture_output=True, text=True
+        ).stdout
+        self.assertEqual(output.strip(), "")
@@ -1,19 +1,25 @@
 import os.path
 import shutil
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from tempfile import TemporaryDirectory
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
+from unittest.mock import patch
 
 from pystac import Collection, Item
+from pystac.extensions.file import FileExtension
 
-from stactools.noaa_mrms_qpe import constants, stac
+from stactools.noaa_mrms_qpe import cog, constants, stac
+from stactools.noaa_mrms_qpe.checksum import Digest
+from stactools.noaa_mrms_qpe.gridcache import Grid, GridCache
 
 PERIODS: List[int] = [1, 3, 6, 12, 24, 48, 72]
 PASS_NUMBERS: List[int] = [1, 2]
 
 COG_MEDIATYPE: str = "image/tiff; application=geotiff; profile=cloud-optimized"
 GRIB_MEDIATYPE: str = "application/wmo-GRIB2"
+GRIB_GZIP_MEDIATYPE: str = "application/gzip"
 
 TEST_COLLECTIONS: List[Dict[str, Any]] = []
 for period in PERIODS:
@@ -205,6 +211,10 @@ class StacTest(unittest.TestCase):
                         epsg=epsg,
                     )
 
+                    # gzipped files must not be decompressed to disk
+                    if gzip:
+                        self.assertNotIn(f"{id}.grib2", os.listdir(tmp_dir))
+
                 item.validate()
 
                 self.assertIsNotNone(item)
@@ -282,7 +292,15 @@ class StacTest(unittest.TestCase):
                     self.assertFalse("grib2" in item.assets)
                 else:
                     grib_asset = item.assets["grib2"].to_dict()
-                    self.assertEqual(grib_asset["type"], GRIB_MEDIATYPE)
+                    self.assertTrue(grib_asset["href"].endswith(filename))
+                    self.assertEqual(
+                        grib_asset["type"],
+                        (
+                            GRIB_GZIP_MEDIATYPE
+                            if filename.endswith(".gz")
+                            else GRIB_MEDIATYPE
+                        ),
+                    )
                     self.assertTrue("title" in grib_asset)
                     self.assertEqual(len(grib_asset["roles"]), 2)
                     self.assertEqual(len(grib_asset["proj:shape"]), 2)
@@ -343,3 +361,210 @@ class StacTest(unittest.TestCase):
         self.assertEqual(item_datetime.hour, 1)
         self.assertEqual(item_datetime.minute, 58)
         self.assertEqual(item_datetime.second, 0)
+
+    def test_create_items(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            src_dir = "./tests/data-files/ALASKA"
+            for filename in os.listdir(src_dir):
+                shutil.copyfile(
+                    os.path.join(src_dir, filename), os.path.join(tmp_dir, filename)
+                )
+            invalid_file = os.path.join(
+                tmp_dir, "MRMS_MultiSensor_QPE_01H_Pass1_00.00_20220101-000000.grib2"
+            )
+            with open(invalid_file, "w") as f:
+                f.write("invalid")
+
+            hrefs = stac.find_files(tmp_dir)
+            self.assertEqual(len(hrefs), 3)
+
+            collection = Collection.from_file("./tests/data-files/collection-1-1.json")
+            results = list(
+                stac.create_items(
+                    hrefs,
+                    aoi=constants.AOI.ALASKA,
+                    collection=collection,
+                    nocog=True,
+                    processes=2,
+                )
+            )
+
+        self.assertEqual([r.href for r in results], hrefs)
+        self.assertEqual([r.ok for r in results], [False, True, True])
+        self.assertIsNotNone(results[0].error)
+        for result in results[1:]:
+            assert result.item is not None
+            self.assertEqual(result.item.collection_id, collection.id)
+            self.assertGreater(result.duration, 0)
+
+    def test_map_bounded(self) -> None:
+        submitted: List[int] = []
+
+        def items() -> Iterator[int]:
+            for i in range(10):
+                submitted.append(i)
+                yield i
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results: List[int] = []
+            for result in stac.map_bounded(executor, lambda i: i * i, items(), 3):
+                # At most 3 items are submitted ahead of the consumed results
+                self.assertLessEqual(len(submitted), len(results) + 3)
+                results.append(result)
+
+        self.assertEqual(results, [i * i for i in range(10)])
+
+    def test_create_timestamp_items(self) -> None:
+        filename = "MRMS_MultiSensor_QPE_01H_Pass1_00.00_20220601-120000.grib2.gz"
+        with TemporaryDirectory() as tmp_dir:
+            hrefs = {}
+            for aoi in [constants.AOI.GUAM, constants.AOI.HAWAII, constants.AOI.CONUS]:
+                os.mkdir(os.path.join(tmp_dir, aoi.value))
+                hrefs[aoi] = os.path.join(tmp_dir, aoi.value, filename)
+                if aoi == constants.AOI.CONUS:
+                    with open(hrefs[aoi], "w") as f:
+                        f.write("invalid")
+                else:
+                    shutil.copyfile(f"./tests/data-files/GUAM/{filename}", hrefs[aoi])
+
+            collection = Collection.from_file("./tests/data-files/collection-1-1.json")
+            for processes in [1, 0]:
+                with self.subTest(processes=processes):
+                    done: List[constants.AOI] = []
+                    timestamp = stac.create_timestamp_items(
+                        hrefs,
+                        collection=collection,
+                        nocog=True,
+                        processes=processes,
+                        callback=lambda aoi, result: done.append(aoi),
+                    )
+                    self.assertEqual(timestamp.id, filename[:-9])
+                    self.assertEqual(
+                        timestamp.datetime,
+                        datetime(2022, 6, 1, 12, tzinfo=timezone.utc),
+                    )
+                    self.assertEqual(list(timestamp.results), list(hrefs))
+                    self.assertEqual(sorted(done), sorted(hrefs))
+                    self.assertFalse(timestamp.ok)
+                    self.assertFalse(timestamp.results[constants.AOI.CONUS].ok)
+                    self.assertEqual(
+                        [item.id for item in timestamp.items],
+                        [f"GUAM_{timestamp.id}", f"HAWAII_{timestamp.id}"],
+                    )
+                    for item in timestamp.items:
+                        self.assertEqual(item.collection_id, collection.id)
+                    if processes == 1:
+                        # The largest region is processed first
+                        self.assertEqual(
+                            done,
+                            [
+                                constants.AOI.CONUS,
+                                constants.AOI.HAWAII,
+                                constants.AOI.GUAM,
+                            ],
+                        )
+
+            hrefs[constants.AOI.CONUS] = os.path.join(
+                tmp_dir, "MRMS_MultiSensor_QPE_01H_Pass2_00.00_20220601-120000.grib2"
+            )
+            with self.assertRaises(ValueError):
+                stac.create_timestamp_items(hrefs, nocog=True)
+
+    def test_find_files(self) -> None:
+        src_dir = "./tests/data-files"
+        files = stac.find_files(src_dir)
+        self.assertEqual(len(files), 6)
+        self.assertEqual(stac.find_files(f"{src_dir}/*/*.gz"), sorted(files[:-1]))
+
+        with TemporaryDirectory() as tmp_dir:
+            manifest = os.path.join(tmp_dir, "files.txt")
+            with open(manifest, "w") as f:
+                f.write("# comment\n" + "\n".join(files[:2]) + "\n\n")
+            self.assertEqual(stac.find_files(manifest), files[:2])
+
+    def test_create_item_grid_cache(self) -> None:
+        src_file = "./tests/data-files/GUAM/MRMS_MultiSensor_QPE_01H_Pass1_00.00_20220601-120000.grib2.gz"  # noqa: E501
+        with TemporaryDirectory() as tmp_dir:
+            grid_cache = GridCache(os.path.join(tmp_dir, "grids.json"))
+            options: Dict[str, Any] = {
+                "aoi": constants.AOI.GUAM,
+                "nocog": True,
+                "nostats": True,
+                "grid_cache": grid_cache,
+            }
+            item1 = stac.create_item(src_file, **options)
+
+            # The file is not opened once the grid is cached
+            with patch.object(cog, "open_dataset", side_effect=AssertionError):
+                item2 = stac.create_item(src_file, **options)
+
+        self.assertEqual(item1.to_dict(), item2.to_dict())
+        band = item2.assets["grib2"].extra_fields["raster:bands"][0]
+        self.assertNotIn("statistics", band)
+        self.assertNotIn("classification:classes", band)
+        self.assertEqual(item2.assets["grib2"].extra_fields["proj:shape"], [2000, 1800])
+
+    def test_create_item_grid_cache_reprojected(self) -> None:
+        src_file = "./tests/data-files/GUAM/MRMS_MultiSensor_QPE_01H_Pass1_00.00_20220601-120000.grib2.gz"  # noqa: E501
+        with TemporaryDirectory() as tmp_dir:
+            href = shutil.copy(src_file, tmp_dir)
+            options: Dict[str, Any] = {
+                "aoi": constants.AOI.GUAM,
+                "nogrib": True,
+                "epsg": 3857,
+                "checksum": True,
+                "grid_cache": GridCache(os.path.join(tmp_dir, "grids.json")),
+            }
+            item1 = stac.create_item(href, **options)
+
+            # The grid of the COG is neither computed nor read from the COG again
+            with patch.object(Grid, "from_dataset", side_effect=AssertionError):
+                item2 = stac.create_item(href, **options)
+
+        self.assertEqual(item1.to_dict(), item2.to_dict())
+
+    def test_create_item_checksum(self) -> None:
+        src_file = "./tests/data-files/HAWAII/MRMS_MultiSensor_QPE_72H_Pass2_00.00_20220601-230000.grib2"  # noqa: E501
+        with TemporaryDirectory() as tmp_dir:
+            tmp_file = shutil.copy(src_file, tmp_dir)
+            variants: List[Dict[str, Any]] = [{}, {"nocog": True, "nostats": True}]
+            for options in variants:
+                with self.subTest(options=options):
+                    item = stac.create_item(
+                        tmp_file, constants.AOI.HAWAII, checksum=True, **options
+                    )
+                    self.assertIn(FileExtension.get_schema_uri(), item.stac_extensions)
+                    self.assertEqual(len(item.assets), 1 if options else 2)
+                    for asset in item.assets.values():
+                        digest = Digest.from_file(asset.href)
+                        file_attrs = FileExtension.ext(asset)
+                        self.assertEqual(file_attrs.checksum, digest.checksum)
+                        self.assertEqual(file_attrs.size, os.path.getsize(asset.href))
+
+            item = stac.create_item(tmp_file, constants.AOI.HAWAII, nocog=True)
+            self.assertNotIn("file:checksum", item.assets["grib2"].extra_fields)
+
+    def test_create_item_encoding(self) -> None:
+        src_file = "./tests/data-files/CARIB/MRMS_MultiSensor_QPE_24H_Pass2_00.00_20220602-030000.grib2.gz"  # noqa: E501
+        with TemporaryDirectory() as tmp_dir:
+            tmp_file = os.path.join(tmp_dir, os.path.basename(src_file))
+            shutil.copyfile(src_file, tmp_file)
+            item = stac.create_item(tmp_file, constants.AOI.CARIB, encoding="uint16")
+
+        band = item.assets["cog"].extra_fields["raster:bands"][0]
+        self.assertEqual(band["data_type"], "uint16")
+        self.assertEqual(band["scale"], 0.1)
+        self.assertEqual(band["offset"], 0)
+        self.assertEqual(band["nodata"], 65535)
+        self.assertEqual(band["classification:classes"][0]["value"], 65535)
+        self.assertLess(band["statistics"]["maximum"], 65535)
+
+        band = item.assets["grib2"].extra_fields["raster:bands"][0]
+        self.assertEqual(band["data_type"], "float64")
+        self.assertNotIn("scale", band)
+        # The statistics are in stored values, i.e. in 0.1 mm
+        grib_max = band["statistics"]["maximum"]
+        self.assertAlmostEqual(
+            item.assets["cog"].extra_fields["raster:bands"][0]["statistics"]["maximum"],
+            round(grib_max * 10),
+        )
@@ -0,0 +1,62 @@
+import os
+import os.path
+import unittest
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from stactools.noaa_mrms_qpe import state as state_module
+from stactools.noaa_mrms_qpe.state import StateStore
+
+OPTIONS = {"nocog": False, "nogrib": False, "epsg": 0}
+
+
+class StateTest(unittest.TestCase):
+    def test_state(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            file = os.path.join(tmp_dir, "test.grib2")
+            with open(file, "w") as f:
+                f.write("data")
+
+            db = os.path.join(tmp_dir, "state.sqlite")
+            with StateStore(db) as state:
+                self.assertFalse(state.is_processed(file, OPTIONS))
+                state.record(file, OPTIONS, "item")
+                self.assertTrue(state.is_processed(file, OPTIONS))
+                self.assertFalse(state.is_processed(file, {**OPTIONS, "epsg": 3857}))
+
+            # The state persists
+            with StateStore(db) as state:
+                self.assertTrue(state.is_processed(file, OPTIONS))
+
+                os.utime(file, (0, 0))
+                self.assertFalse(state.is_processed(file, OPTIONS))
+
+                # A file that can't be read is processed (and fails) again
+                os.remove(file)
+                self.assertFalse(state.is_processed(file, OPTIONS))
+
+    def test_state_hash(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            file = os.path.join(tmp_dir, "test.grib2")
+            with open(file, "w") as f:
+                f.write("data")
+
+            with StateStore(os.path.join(tmp_dir, "state.sqlite"), True) as state:
+                state.record(file, OPTIONS)
+
+                # A new modification time doesn't matter if the content is the same
+                os.utime(file, (0, 0))
+                self.assertTrue(state.is_processed(file, OPTIONS))
+
+                with open(file, "w") as f:
+                    f.write("diff")
+                self.assertFalse(state.is_processed(file, OPTIONS))
+
+                # The hash computed by is_processed is reused by record
+                with mock.patch.object(
+                    state_module, "file_hash", wraps=state_module.file_hash
+                ) as file_hash:
+                    self.assertFalse(state.is_processed(file, OPTIONS))
+                    state.record(file, OPTIONS)
+                    self.assertEqual(file_hash.call_count, 1)
+                self.assertTrue(state.is_processed(file, OPTIONS))
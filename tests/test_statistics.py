@@ -0,0 +1,40 @@
+import unittest
+
+import numpy as np
+import rasterio
+
+from stactools.noaa_mrms_qpe import statistics
+
+SRC_FILE = "./tests/data-files/HAWAII/MRMS_MultiSensor_QPE_72H_Pass2_00.00_20220601-230000.grib2"  # noqa: E501
+
+
+class StatisticsTest(unittest.TestCase):
+    def test_update(self) -> None:
+        stats = statistics.Statistics([-1, -3, -999])
+        stats.update(np.array([[0.5, -3.0], [2.0, 1.0]]))
+        stats.update(np.array([[-3.0, -3.0], [7.5, np.nan]]))
+
+        self.assertEqual(stats.minimum, 0.5)
+        self.assertEqual(stats.maximum, 7.5)
+        self.assertTrue(stats.has(-3))
+        self.assertFalse(stats.has(-1))
+        self.assertFalse(stats.has(-999))
+
+    def test_update_without_valid_data(self) -> None:
+        stats = statistics.Statistics([-1])
+        stats.update(np.full((2, 2), -1.0))
+
+        self.assertIsNone(stats.minimum)
+        self.assertIsNone(stats.maximum)
+        self.assertTrue(stats.has(-1))
+
+    def test_compute(self) -> None:
+        with rasterio.open(SRC_FILE) as dataset:
+            stats = statistics.compute(dataset, [-1, -3])
+            data = dataset.read(1)
+
+        valid = data[data >= 0]
+        self.assertEqual(stats.minimum, float(valid.min()))
+        self.assertEqual(stats.maximum, float(valid.max()))
+        self.assertEqual(stats.has(-1), bool(np.any(data == -1)))
+        self.assertEqual(stats.has(-3), bool(np.any(data == -3)))
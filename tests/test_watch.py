@@ -0,0 +1,175 @@
+import os
+import os.path
+import shutil
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from pystac import Catalog, Collection
+
+from stactools.noaa_mrms_qpe import constants
+from stactools.noaa_mrms_qpe.state import StateStore
+from stactools.noaa_mrms_qpe.watch import Watcher
+
+SRC_FILE = "./tests/data-files/GUAM/MRMS_MultiSensor_QPE_01H_Pass1_00.00_20220601-120000.grib2.gz"  # noqa: E501
+
+
+class WatchTest(unittest.TestCase):
+    def test_poll(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            incoming = os.path.join(tmp_dir, "incoming")
+            os.mkdir(incoming)
+            watcher = Watcher(
+                [incoming],
+                constants.AOI.GUAM,
+                os.path.join(tmp_dir, "catalog.json"),
+                settle=0,
+            )
+            self.assertEqual(watcher.poll(), [])
+
+            # A file is picked up once it hasn't changed between two polls
+            file = os.path.join(incoming, os.path.basename(SRC_FILE))
+            with open(file, "wb") as f:
+                f.write(b"partial")
+            self.assertEqual(watcher.poll(), [])
+            shutil.copyfile(SRC_FILE, file)
+            self.assertEqual(watcher.poll(), [])
+            self.assertEqual(watcher.poll(), [file])
+            self.assertEqual(watcher.poll(), [])
+
+            # Files that don't match the file name pattern are ignored
+            shutil.copyfile(SRC_FILE, file + ".part")
+            self.assertEqual(watcher.poll(), [])
+            self.assertEqual(watcher.poll(), [])
+
+            # Recently modified files are not picked up before the settle time
+            watcher.settle = 3600
+            os.utime(file)
+            self.assertEqual(watcher.poll(), [])
+            self.assertEqual(watcher.poll(), [])
+
+    def test_poll_incremental(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            incoming = os.path.join(tmp_dir, "incoming")
+            os.makedirs(os.path.join(incoming, "GUAM"))
+            file = os.path.join(incoming, "GUAM", os.path.basename(SRC_FILE))
+            shutil.copyfile(SRC_FILE, file)
+            watcher = Watcher(
+                [incoming],
+                constants.AOI.GUAM,
+                os.path.join(tmp_dir, "catalog.json"),
+                settle=0,
+            )
+            watcher.poll()
+            self.assertEqual(watcher.poll(), [file])
+
+            # Unchanged directories are neither listed nor their queued files checked
+            for directory in [incoming, os.path.join(incoming, "GUAM")]:
+                os.utime(directory, (1e9, 1e9))
+            watcher.poll()
+            with patch("os.scandir", side_effect=AssertionError):
+                with patch("os.stat", wraps=os.stat) as stat:
+                    self.assertEqual(watcher.poll(), [])
+            self.assertNotIn(file, [call.args[0] for call in stat.call_args_list])
+
+            # New files change the directory, so it's listed again
+            other = file.replace("120000", "130000")
+            shutil.copyfile(SRC_FILE, other)
+            watcher.poll()
+            self.assertEqual(watcher.poll(), [other])
+
+            # Removed directories and files are forgotten
+            shutil.rmtree(os.path.join(incoming, "GUAM"))
+            self.assertEqual(watcher.poll(), [])
+            self.assertEqual(list(watcher.listings), [incoming])
+            self.assertEqual(watcher.done, {})
+
+    def test_step(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            incoming = os.path.join(tmp_dir, "incoming")
+            os.mkdir(incoming)
+            file = os.path.join(incoming, os.path.basename(SRC_FILE))
+            shutil.copyfile(SRC_FILE, file)
+            catalog_href = os.path.join(tmp_dir, "catalog", "catalog.json")
+
+            with StateStore(os.path.join(tmp_dir, "state.sqlite")) as state:
+                watcher = Watcher(
+                    [incoming],
+                    constants.AOI.GUAM,
+                    catalog_href,
+                    settle=0,
+                    state=state,
+                    nocog=True,
+                )
+                with ThreadPoolExecutor(1) as executor:
+                    watcher.step(executor)
+                    watcher.step(executor)
+                    self.assertEqual(len(watcher.running), 1)
+                    results = watcher.collect(wait=True)
+
+                self.assertEqual(len(results), 1)
+                self.assertTrue(results[0].ok)
+                self.assertTrue(state.is_processed(file, watcher.options))
+
+                # Processed files are skipped after a restart
+                watcher = Watcher(
+                    [incoming],
+                    constants.AOI.GUAM,
+                    catalog_href,
+                    settle=0,
+                    state=state,
+                    nocog=True,
+                )
+                watcher.poll()
+                self.assertEqual(watcher.poll(), [])
+
+            catalog = Catalog.from_file(catalog_href)
+            items = list(catalog.get_all_items())
+            self.assertEqual(
+                [item.id for item in items],
+                ["GUAM_MRMS_MultiSensor_QPE_01H_Pass1_00.00_20220601-120000"],
+            )
+            self.assertTrue(
+                os.path.exists(os.path.join(tmp_dir, "catalog", f"{items[0].id}.json"))
+            )
+
+    def test_collection(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            incoming = os.path.join(tmp_dir, "incoming")
+            os.mkdir(incoming)
+            collection_href = os.path.join(tmp_dir, "collection", "collection.json")
+            os.mkdir(os.path.dirname(collection_href))
+            shutil.copyfile("./tests/data-files/collection-1-1.json", collection_href)
+
+            watcher = Watcher(
+                [incoming],
+                constants.AOI.GUAM,
+                collection_href,
+                processes=2,
+                settle=0,
+                nocog=True,
+            )
+            self.assertIsInstance(watcher.catalog, Collection)
+            for time in ["20220601-120000", "20220601-130000"]:
+                name = f"MRMS_MultiSensor_QPE_01H_Pass1_00.00_{time}.grib2.gz"
+                shutil.copyfile(SRC_FILE, os.path.join(incoming, name))
+            with ThreadPoolExecutor(1) as executor:
+                watcher.step(executor)
+                watcher.step(executor)
+                results = watcher.collect(wait=True)
+            self.assertEqual(len(results), 2)
+            # The Items are linked by HREF, they are not kept in memory
+            links = watcher.catalog.get_links("item")
+            self.assertEqual(len(links), 2)
+            self.assertFalse(any(link.is_resolved() for link in links))
+
+            collection = Collection.from_file(collection_href)
+            items = sorted(collection.get_all_items(), key=lambda item: item.id)
+            self.assertEqual(len(items), 2)
+            for item in items:
+                self.assertEqual(item.collection_id, collection.id)
+                root = item.get_root_link()
+                self.assertIsNotNone(root)
+                if root is not None:
+                    self.assertEqual(root.get_absolute_href(), collection_href)
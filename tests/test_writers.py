@@ -0,0 +1,108 @@
+import glob
+import importlib.util
+import json
+import os.path
+import unittest
+from tempfile import TemporaryDirectory
+from typing import List
+
+from pystac import Item
+
+from stactools.noaa_mrms_qpe import constants, stac, writers
+
+SRC_FILES = [
+    "./tests/data-files/ALASKA/MRMS_MultiSensor_QPE_01H_Pass1_00.00_20221024-015800.grib2.gz",  # noqa: E501
+    "./tests/data-files/ALASKA/MRMS_MultiSensor_QPE_12H_Pass2_00.00_20220602-000000.grib2.gz",  # noqa: E501
+]
+
+
+def create_items() -> List[Item]:
+    return [
+        stac.create_item(href, constants.AOI.ALASKA, nocog=True, nostats=True)
+        for href in SRC_FILES
+    ]
+
+
+class WritersTest(unittest.TestCase):
+    def test_json(self) -> None:
+        items = create_items()
+        with TemporaryDirectory() as tmp_dir:
+            with writers.create_writer("json", tmp_dir) as writer:
+                for item in items:
+                    self.assertGreater(writer.write(item), 0)
+
+            self.assertEqual(
+                sorted(os.listdir(tmp_dir)), sorted(f"{i.id}.json" for i in items)
+            )
+
+    def test_ndjson(self) -> None:
+        items = create_items()
+        with TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "items", "items.ndjson")
+            with writers.create_writer("ndjson", path) as writer:
+                size = sum(writer.write(item) for item in items)
+
+            self.assertEqual(os.path.getsize(path), size)
+            with open(path) as f:
+                lines = [json.loads(line) for line in f]
+
+        self.assertEqual([line["id"] for line in lines], [item.id for item in items])
+        self.assertEqual(
+            Item.from_dict(lines[0]).to_dict(),
+            items[0].to_dict(include_self_link=False),
+        )
+
+    def test_ndjson_append(self) -> None:
+        items = create_items()
+        with TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "items.ndjson")
+            with writers.create_writer("ndjson", path) as writer:
+                writer.write(items[0])
+            with writers.create_writer("ndjson", path, append=True) as writer:
+                writer.write(items[1])
+            with open(path) as f:
+                self.assertEqual(
+                    [json.loads(line)["id"] for line in f], [i.id for i in items]
+                )
+
+            # Without append, the file is replaced
+            with writers.create_writer("ndjson", path) as writer:
+                writer.write(items[1])
+            with open(path) as f:
+                self.assertEqual([json.loads(line)["id"] for line in f], [items[1].id])
+
+    @unittest.skipUnless(
+        importlib.util.find_spec("stac_geoparquet"), "stac-geoparquet is not installed"
+    )
+    def test_geoparquet(self) -> None:
+        import pyarrow.dataset
+
+        items = create_items()
+        with TemporaryDirectory() as tmp_dir:
+            with writers.create_writer("geoparquet", tmp_dir) as writer:
+                for item in items:
+                    writer.write(item)
+
+            files = glob.glob(os.path.join(tmp_dir, "**", "*.parquet"), recursive=True)
+            partitions = sorted(
+                os.path.relpath(os.path.dirname(file), tmp_dir) for file in files
+            )
+            self.assertEqual(
+                partitions,
+                [
+                    os.path.join("region=ALASKA", "period=1", "pass=1"),
+                    os.path.join("region=ALASKA", "period=12", "pass=2"),
+                ],
+            )
+            # The temporary files have been removed
+            self.assertEqual(os.listdir(tmp_dir), ["region=ALASKA"])
+
+            table = pyarrow.dataset.dataset(
+                tmp_dir, format="parquet", partitioning="hive"
+            ).to_table()
+
+        self.assertEqual(sorted(table.column("id").to_pylist()), [i.id for i in items])
+
+    def test_unsupported_format(self) -> None:
+        with self.assertRaises(ValueError):
+            writers.create_writer("csv", "items.csv")